@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""Shared fixtures for `play_requests` benchmarks."""
+
+import json
+import re
+import threading
+import pytest
+
+from tests.conftest import ThreadingHTTPServer
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+
+class BenchmarkHandler(BaseHTTPRequestHandler):
+    """ Cheap keep-alive handler, so benchmarks measure the client:
+
+        * ``GET /items/<n>`` returns a JSON list of ``n`` items
+        * any other call drains the request body and returns its size
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    payloads = {}
+
+    def _reply(self, payload):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def do_GET(self):
+        match = re.match(r'^/items/(\d+)', self.path)
+        if match is None:
+            return self._drain()
+        size = int(match.group(1))
+        payload = self.payloads.get(size)
+        if payload is None:
+            payload = json.dumps([
+                {'id': index, 'name': 'item {0}'.format(index)}
+                for index in range(size)]).encode('utf-8')
+            self.payloads[size] = payload
+        self._reply(payload)
+
+    def _drain(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        remaining = length
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 65536)))
+        self._reply(json.dumps({'size': length}).encode('utf-8'))
+
+    do_OPTIONS = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = _drain
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='session')
+def variables():
+    return {'skins': {'skin1': {'base_url': 'http://', 'credentials': {}}}}
+
+
+@pytest.fixture(scope='session')
+def server_url():
+    """ A local in-process HTTP server shared by all the benchmarks """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BenchmarkHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{0}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def provider(play):
+    from play_requests import providers
+    play.variables = {}
+    provider = providers.RequestsProvider(play)
+    yield provider
+    provider.close()
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""Per command overhead of the `play_requests` provider.
+
+Run with ``make benchmark`` (see the Benchmarks section of the README).
+"""
+
+import json
+
+import pytest
+import requests
+
+
+PAYLOAD_SIZES = {
+    '1KB': 1024,
+    '100KB': 100 * 1024,
+    '1MB': 1024 * 1024,
+}
+
+
+def _document(size):
+    """ A JSON document of about ``size`` bytes """
+    item = {'id': 0, 'name': 'x' * 40, 'tags': ['a', 'b', 'c']}
+    count = max(1, size // len(json.dumps(item)))
+    return {'items': [dict(item, id=index) for index in range(count)]}
+
+
+def _response(items=100):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    response._content = json.dumps([
+        {'id': index, 'name': 'item {0}'.format(index)}
+        for index in range(items)]).encode('utf-8')
+    return response
+
+
+@pytest.mark.parametrize('size', sorted(PAYLOAD_SIZES))
+def test_prepare_request(benchmark, provider, size):
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': 'http://127.0.0.1/items',
+        'parameters': {
+            'headers': {'Accept': 'application/json'},
+            'json': _document(PAYLOAD_SIZES[size]),
+        },
+    }
+    benchmark(provider._prepare_request, command)
+
+
+def test_prepare_files(benchmark, provider, tmpdir):
+    path = tmpdir.join('file.csv')
+    path.write('a,b,c\n' * 1000)
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': 'http://127.0.0.1/upload',
+        'parameters': {
+            'files': {'file': ['file.csv', 'path:{0}'.format(path)]},
+        },
+    }
+
+    def prepare():
+        provider._close_files(provider._prepare_request(command))
+
+    benchmark(prepare)
+
+
+def test_merge_sub_commands(benchmark, provider):
+    provider.engine.variables['play_requests'] = {
+        'parameters': {
+            'headers': {'Authorization': 'Bearer token'},
+            'timeout': 2.5,
+        },
+    }
+    sub_commands = [
+        {'type': 'GET', 'url': 'http://127.0.0.1/items/{0}'.format(index)}
+        for index in range(100)]
+    benchmark(provider._merge_sub_commands, sub_commands)
+
+
+def test_check_response(benchmark, provider):
+    command = {
+        'provider': 'play_requests',
+        'type': 'GET',
+        'url': 'http://127.0.0.1/items/100',
+        'variable': 'first',
+        'variable_expression': 'response.json()[0]["id"]',
+        'assertion': 'len(response.json()) == 100 and '
+                     'response.status_code == 200',
+    }
+    response = _response()
+    benchmark(provider._check_response, command, response)
+
+
+@pytest.mark.parametrize('items', [1, 1000])
+def test_get(benchmark, provider, server_url, items):
+    command = {
+        'provider': 'play_requests',
+        'type': 'GET',
+        'url': '{0}/items/{1}'.format(server_url, items),
+        'assertion': 'len(response.json()) == {0}'.format(items),
+    }
+    benchmark(provider.command_GET, command)
+
+
+@pytest.mark.parametrize('reuse_prepared', [False, True])
+@pytest.mark.parametrize('size', sorted(PAYLOAD_SIZES))
+def test_post_json(benchmark, provider, server_url, size, reuse_prepared):
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': '{0}/items'.format(server_url),
+        'reuse_prepared': reuse_prepared,
+        'parameters': {'json': _document(PAYLOAD_SIZES[size])},
+        'assertion': 'response.status_code == 200',
+    }
+    benchmark(provider.command_POST, command)
+
+
+@pytest.mark.parametrize('stream_files', [False, True])
+@pytest.mark.parametrize('size', ['100KB', '1MB'])
+def test_upload(benchmark, provider, server_url, tmpdir, size,
+                stream_files):
+    path = tmpdir.join('file.bin')
+    path.write_binary(b'x' * PAYLOAD_SIZES[size])
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': '{0}/upload'.format(server_url),
+        'stream_files': stream_files,
+        'parameters': {
+            'files': {'file': ['file.bin', 'path:{0}'.format(path)]},
+        },
+        'assertion': 'response.json()["size"] > {0}'.format(
+            PAYLOAD_SIZES[size]),
+    }
+    benchmark(provider.command_POST, command)
+
+
+@pytest.mark.parametrize('max_workers', [1, 10, 50])
+def test_batch(benchmark, provider, server_url, max_workers):
+    command = {
+        'provider': 'play_requests',
+        'type': 'batch',
+        'max_workers': max_workers,
+        'sub_commands': [
+            {'type': 'GET',
+             'url': '{0}/items/10'.format(server_url),
+             'assertion': 'response.status_code == 200'}
+            for index in range(50)],
+    }
+    benchmark(provider.command_batch, command)
+
+
+def test_execute_command(benchmark, play, server_url):
+    """ A whole pytest-play step, including the engine overhead """
+    if play.get_command_provider('play_requests') is None:
+        pytest.skip('play_requests is not installed')
+    command = {
+        'provider': 'play_requests',
+        'type': 'GET',
+        'url': '{0}/items/10'.format(server_url),
+        'variable': 'first',
+        'variable_expression': 'response.json()[0]["id"]',
+        'assertion': 'response.status_code == 200',
+    }
+    benchmark(play.execute_command, command)
@@ -0,0 +1,355 @@
+import asyncio
+import datetime
+import tempfile
+import threading
+import time
+from email.message import Message
+import requests
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+
+from .logs import log_call
+from .multipart import (
+    CHUNK_SIZE,
+    MultipartEncoder,
+    aiter_chunks,
+)
+from .providers import RequestsProvider
+from .timing import Timing
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+SPOOL_SIZE = 1024 * 1024
+
+
+class AsyncRequestsProvider(RequestsProvider):
+    """ asyncio based requests command provider.
+
+        Same commands and options of
+        :class:`play_requests.providers.RequestsProvider`
+        but HTTP calls are performed by aiohttp on an event loop owned
+        by the provider, so ``batch`` commands can keep thousands of
+        requests in flight without a thread each.
+
+        The event loop runs in a background thread so calls can be
+        submitted from any thread (eg: ``load`` workers).
+
+        Streamed responses (``stream`` option) are always spooled to a
+        temporary file, kept in memory up to ``max_body_bytes``
+        (default 1MB), and ``response.iter_content`` and
+        ``response.iter_lines`` read from it.
+
+        Commands with one of the ``unsupported_options`` raise a
+        ``ValueError`` before any call.
+    """
+
+    name = 'play_requests_async'
+    batch_max_workers = 100
+    unsupported_options = (
+        'cache', 'cassette', 'http2', 'rate_limit', 'reuse_prepared')
+    retry_exceptions = RequestsProvider.retry_exceptions + (
+        asyncio.TimeoutError,) + (
+        (aiohttp.ClientConnectionError,) if aiohttp is not None else ())
+
+    def __init__(self, engine):
+        super(AsyncRequestsProvider, self).__init__(engine)
+        self._loop = None
+        self._thread = None
+
+    @property
+    def loop(self):
+        """ Provider event loop (lazily created) """
+        if aiohttp is None:
+            raise ImportError(
+                'aiohttp is required by {0}, install '
+                'play_requests[aio]'.format(self.name))
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever,
+                name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+        return self._loop
+
+    def _run(self, coroutine):
+        """ Run a coroutine on the provider event loop and
+            wait for its result
+        """
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, self.loop).result()
+
+    def close(self):
+        """ Close all the pooled sessions and the event loop """
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        self.reset()
+        for session in sessions:
+            if aiohttp is None or \
+                    not isinstance(session, aiohttp.ClientSession):
+                session.close()
+            elif self._loop is not None:
+                self._run(session.close())
+        if self._loop is not None:
+            self._run(self._loop.shutdown_default_executor())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    async def _get_async_session(self, command):
+        """ Return a keep-alive aiohttp session for the given command.
+
+            The ``pool`` option is mapped to the aiohttp connector:
+            ``maxsize`` limits the connections per host and
+            ``limit`` the total number of connections.
+        """
+        pool = command.get('pool') or {}
+        key = tuple(sorted(pool.items()))
+        session = self._sessions.get(key)
+        if session is None:
+            connector = aiohttp.TCPConnector(
+                limit=pool.get('limit', 100),
+                limit_per_host=pool.get('maxsize', 10))
+            session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                trace_configs=[self._make_trace_config()])
+            self._sessions[key] = session
+        return session
+
+    def _make_trace_config(self):
+        """ aiohttp tracing feeding the timing record passed as
+            ``trace_request_ctx``.
+
+            aiohttp does not expose the TLS handshake, so ``connect``
+            includes it and ``tls`` is ``None``
+        """
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_dns_start(session, context, params):
+            context.dns_start = time.perf_counter()
+
+        async def on_dns_end(session, context, params):
+            context.trace_request_ctx.dns = \
+                time.perf_counter() - context.dns_start
+
+        async def on_connection_start(session, context, params):
+            context.connection_start = time.perf_counter()
+
+        async def on_connection_end(session, context, params):
+            timing = context.trace_request_ctx
+            timing.connect = time.perf_counter() - \
+                context.connection_start - (timing.dns or 0)
+            timing.reused = False
+
+        async def on_connection_reused(session, context, params):
+            context.trace_request_ctx.reused = True
+
+        async def on_chunk_sent(session, context, params):
+            context.trace_request_ctx.bytes_sent += len(params.chunk)
+
+        trace_config.on_dns_resolvehost_start.append(on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_end)
+        trace_config.on_connection_create_start.append(on_connection_start)
+        trace_config.on_connection_create_end.append(on_connection_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reused)
+        trace_config.on_request_chunk_sent.append(on_chunk_sent)
+        return trace_config
+
+    def _get_session(self, command):
+        """ Sessions are bound to the event loop, see
+            :meth:`_get_async_session`
+        """
+        return self._run(self._get_async_session(command))
+
+    def _get_transport(self, command):
+        self._check_options(command)
+        return self._get_session(command)
+
+    def _check_options(self, command):
+        """ Fail fast on options not available for this provider """
+        unsupported = [
+            option for option in self.unsupported_options
+            if command.get(option)]
+        if unsupported:
+            raise ValueError(
+                'Options not supported by {0}: {1}'.format(
+                    self.name, ', '.join(unsupported)))
+
+    def _make_parameters(self, parameters):
+        """ Translate requests parameters to aiohttp ones """
+        kwargs = {}
+        for key, value in parameters.items():
+            if key == 'params':
+                if isinstance(value, dict):
+                    value = value.items()
+                params = []
+                for name, param in value:
+                    if isinstance(param, (list, tuple)):
+                        params.extend(
+                            (name, str(item)) for item in param)
+                    else:
+                        params.append((name, str(param)))
+                kwargs['params'] = params
+            elif key == 'auth':
+                kwargs['auth'] = aiohttp.BasicAuth(*value)
+            elif key == 'timeout':
+                if isinstance(value, (list, tuple)):
+                    kwargs['timeout'] = aiohttp.ClientTimeout(
+                        sock_connect=value[0], sock_read=value[1])
+                elif value is not None:
+                    kwargs['timeout'] = aiohttp.ClientTimeout(total=value)
+            elif key == 'verify':
+                if not value:
+                    kwargs['ssl'] = False
+            elif key == 'files':
+                continue
+            elif key == 'data' and isinstance(value, MultipartEncoder):
+                kwargs['data'] = aiter_chunks(value)
+                kwargs['headers'] = dict(
+                    parameters.get('headers') or {},
+                    **{'Content-Length': str(len(value))})
+            elif key == 'headers' and 'headers' in kwargs:
+                continue
+            elif key in ('headers', 'cookies', 'json',
+                         'data', 'allow_redirects'):
+                kwargs[key] = value
+            else:
+                raise ValueError('Parameter not supported', key)
+
+        files = parameters.get('files')
+        if files:
+            form = aiohttp.FormData()
+            for name, value in (parameters.get('data') or {}).items():
+                form.add_field(name, str(value))
+            for name, value in files.items():
+                content_type = None
+                if len(value) > 2:
+                    content_type = value[2]
+                    if isinstance(content_type, (list, tuple)):
+                        content_type = content_type[0]
+                form.add_field(
+                    name,
+                    value[1],
+                    filename=value[0],
+                    content_type=content_type)
+            kwargs['data'] = form
+        return kwargs
+
+    async def _fetch(self, method, cmd):
+        """ Perform the HTTP call returning a requests compatible
+            response with the body already read
+        """
+        try:
+            self._check_options(cmd)
+            return await self._fetch_response(method, cmd)
+        finally:
+            self._close_files(cmd)
+
+    async def _fetch_response(self, method, cmd):
+        session = await self._get_async_session(cmd)
+        kwargs = self._make_parameters(cmd['parameters'])
+        timing = Timing()
+        start = datetime.datetime.now()
+        async with session.request(method, cmd['url'],
+                                   trace_request_ctx=timing,
+                                   **kwargs) as resp:
+            timing.ttfb = time.perf_counter() - timing.start
+            response = requests.Response()
+            if cmd.get('stream'):
+                body = tempfile.SpooledTemporaryFile(
+                    max_size=int(cmd.get('max_body_bytes') or SPOOL_SIZE))
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    body.write(chunk)
+                timing.bytes_received = body.tell()
+                body.seek(0)
+                response.raw = body
+                response._content = False
+                response._content_consumed = False
+                if cmd.get('max_body_bytes'):
+                    response.body = body
+            else:
+                response._content = await resp.read()
+                response._content_consumed = True
+                timing.bytes_received = len(response._content)
+            timing.total = time.perf_counter() - timing.start
+            response.status_code = resp.status
+            response.reason = resp.reason
+            response.headers = CaseInsensitiveDict(resp.headers)
+            response.url = str(resp.url)
+            message = Message()
+            message['content-type'] = resp.headers.get('Content-Type', '')
+            response.encoding = message.get_param('charset')
+            cookies = RequestsCookieJar()
+            for name, morsel in resp.cookies.items():
+                cookies.set(name, morsel.value)
+            response.cookies = cookies
+            response.elapsed = datetime.datetime.now() - start
+            response.timing = timing
+        return response
+
+    def _send_request(self, method, cmd):
+        """ Perform the HTTP call on the provider event loop """
+        response = self._run(self._fetch(method, cmd))
+        self._record_timing(cmd, response.timing)
+        log_call(self.logger, method, cmd, response)
+        return response
+
+    async def _fetch_command(self, method, command):
+        """ Prepare and fetch a command with the retry policy and the
+            circuit breaker of :meth:`_send_command`, returning the
+            prepared command and the response
+        """
+        policy, breaker = self._retry_setup(command)
+        attempt = 0
+        while True:
+            attempt += 1
+            # file reads and body serialization block, so they
+            # are performed out of the event loop
+            cmd = await asyncio.get_running_loop().run_in_executor(
+                None, self._prepare_request, command)
+            if breaker:
+                self._before_call(breaker, cmd)
+            try:
+                response = await self._fetch(method, cmd)
+            except Exception as e:
+                delay = self._retry_delay(
+                    policy, breaker, method, command, attempt, exception=e)
+                if delay is None:
+                    raise
+            else:
+                self._record_timing(cmd, response.timing)
+                log_call(self.logger, method, cmd, response)
+                delay = self._retry_delay(
+                    policy, breaker, method, command, attempt,
+                    response=response)
+                if delay is None:
+                    return cmd, response
+            await asyncio.sleep(delay)
+
+    async def _fetch_all(self, commands, max_workers):
+        """ Fetch all the commands with at most ``max_workers``
+            requests in flight
+        """
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(method, command):
+            async with semaphore:
+                return await self._fetch_command(method, command)
+        return await asyncio.gather(
+            *[fetch(method, command) for method, command in commands],
+            return_exceptions=True)
+
+    def _send_batch(self, commands, max_workers):
+        """ Send commands concurrently on the event loop """
+        results = self._run(self._fetch_all(commands, max_workers))
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+            yield result
@@ -0,0 +1,362 @@
+import copy
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from email.utils import (
+    parsedate_tz,
+    mktime_tz,
+)
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+CACHEABLE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+CREDENTIAL_HEADERS = (
+    'authorization', 'proxy-authorization', 'cookie', 'x-api-key')
+
+
+def _parse_date(value):
+    """ Parse an HTTP date returning a timestamp (or None) """
+    parsed = value and parsedate_tz(value)
+    if parsed:
+        return mktime_tz(parsed)
+    return None
+
+
+def parse_cache_control(value):
+    """ Parse a Cache-Control header
+
+        >>> parse_cache_control('max-age=60, no-cache') == {
+        ...     'max-age': '60', 'no-cache': None}
+        True
+    """
+    directives = {}
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, arg = item.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+class CacheEntry(object):
+    """ A cached response plus its caching metadata """
+
+    def __init__(self, response, vary, ttl):
+        self.response = response
+        self.vary = vary
+        self.size = len(response.content or b'')
+        self.refresh(ttl)
+
+    def refresh(self, ttl):
+        """ (Re)compute the freshness lifetime of the entry """
+        headers = self.response.headers
+        self.stored_at = time.time()
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        self.no_cache = 'no-cache' in directives
+        lifetime = None
+        max_age = directives.get('max-age')
+        if max_age is not None:
+            try:
+                lifetime = int(max_age)
+            except ValueError:
+                lifetime = 0
+        else:
+            expires = _parse_date(headers.get('Expires'))
+            if expires is not None:
+                date = _parse_date(headers.get('Date')) or self.stored_at
+                lifetime = expires - date
+        if lifetime is None:
+            lifetime = ttl
+        try:
+            age = int(headers.get('Age', 0))
+        except ValueError:
+            age = 0
+        self.expires_at = self.stored_at + lifetime - age
+
+    @property
+    def fresh(self):
+        return not self.no_cache and time.time() < self.expires_at
+
+    @property
+    def validators(self):
+        """ Conditional request headers for revalidation """
+        headers = {}
+        etag = self.response.headers.get('ETag')
+        if etag:
+            headers['If-None-Match'] = etag
+        last_modified = self.response.headers.get('Last-Modified')
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+
+class MemoryBackend(object):
+    """ In memory LRU storage bounded by number of entries and
+        total body size
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+            self._entries[key] = entry
+            self._size += entry.size
+            while self._entries and (
+                    (self.max_entries and
+                     len(self._entries) > self.max_entries) or
+                    (self.max_bytes and self._size > self.max_bytes)):
+                key, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry.size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskBackend(object):
+    """ On disk storage (one pickle file per entry in ``path``)
+        bounded by number of entries, least recently used entries
+        are evicted first.
+
+        Entries are unpickled, so ``path`` must be a trusted
+        directory only writable by the users running the tests.
+    """
+
+    def __init__(self, path, max_entries=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _file_path(self, key):
+        return os.path.join(
+            self.path,
+            hashlib.sha1(key.encode('utf-8')).hexdigest() + '.cache')
+
+    def get(self, key):
+        file_path = self._file_path(key)
+        try:
+            with open(file_path, 'rb') as file_obj:
+                entry = pickle.load(file_obj)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(file_path, None)
+        return entry
+
+    def set(self, key, entry):
+        file_path = self._file_path(key)
+        tmp_path = '{0}.{1}.tmp'.format(file_path, threading.get_ident())
+        with open(tmp_path, 'wb') as file_obj:
+            pickle.dump(entry, file_obj, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, file_path)
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._file_path(key))
+        except OSError:
+            pass
+
+    def _files(self):
+        return [os.path.join(self.path, name)
+                for name in os.listdir(self.path)
+                if name.endswith('.cache')]
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        with self._lock:
+            files = self._files()
+            if len(files) <= self.max_entries:
+                return
+            files.sort(key=os.path.getmtime)
+            for file_path in files[:len(files) - self.max_entries]:
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+
+    def __len__(self):
+        return len(self._files())
+
+
+class ResponseCache(object):
+    """ HTTP cache for idempotent calls honouring Cache-Control,
+        Expires, ETag and Last-Modified headers.
+
+        Responses without explicit freshness information are fresh
+        for ``ttl`` seconds (default ``0``, always revalidated if
+        possible).
+
+        Responses are never shared across credentials: ``auth``,
+        ``cookies`` and the ``credential_headers`` (default
+        :data:`CREDENTIAL_HEADERS`) request headers are part of the
+        cache key.
+    """
+
+    def __init__(self, backend, ttl=0, credential_headers=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.credential_headers = CREDENTIAL_HEADERS + tuple(
+            name.lower() for name in credential_headers or ())
+
+    def _key(self, method, url, parameters):
+        prepared = requests.Request(
+            method, url, params=parameters.get('params')).prepare()
+        key = '{0} {1}'.format(method, prepared.url)
+        # responses for different credentials are never shared
+        credentials = []
+        auth = parameters.get('auth')
+        if auth:
+            credentials.append(repr(tuple(auth)))
+        cookies = parameters.get('cookies')
+        if cookies:
+            if not isinstance(cookies, dict):
+                cookies = dict(
+                    (cookie.name, cookie.value) for cookie in cookies)
+            credentials.append(repr(sorted(cookies.items())))
+        for name, value in (parameters.get('headers') or {}).items():
+            if name.lower() in self.credential_headers:
+                credentials.append('{0}: {1}'.format(name.lower(), value))
+        if credentials:
+            key += ' ' + hashlib.sha1(
+                repr(sorted(credentials)).encode('utf-8')).hexdigest()
+        return key
+
+    def _vary(self, response, headers):
+        names = response.headers.get('Vary', '')
+        return dict(
+            (name.strip().lower(), headers.get(name.strip().lower()))
+            for name in names.split(',') if name.strip())
+
+    def request(self, send, method, url, parameters):
+        """ Return a response for the given call, from the cache
+            if fresh or revalidated, otherwise calling
+            ``send(parameters)``
+        """
+        headers = dict(
+            (name.lower(), value) for name, value in
+            (parameters.get('headers') or {}).items())
+        request_directives = parse_cache_control(
+            headers.get('cache-control'))
+        key = self._key(method, url, parameters)
+        entry = self.backend.get(key)
+        if entry is not None and \
+                self._vary(entry.response, headers) != entry.vary:
+            entry = None
+        if entry is not None and 'no-cache' not in request_directives:
+            if entry.fresh:
+                return self._cached(entry.response)
+            validators = entry.validators
+            if validators:
+                conditional = dict(parameters)
+                conditional['headers'] = dict(
+                    parameters.get('headers') or {}, **validators)
+                response = send(conditional)
+                if response.status_code == 304:
+                    # cached entries are shared with concurrent
+                    # readers, so a new one replaces them
+                    cached = copy.copy(entry.response)
+                    cached.headers = CaseInsensitiveDict(
+                        entry.response.headers)
+                    cached.headers.update(response.headers)
+                    entry = CacheEntry(cached, entry.vary, self.ttl)
+                    self.backend.set(key, entry)
+                    return self._cached(entry.response)
+                return self._store(key, response, headers)
+        response = send(parameters)
+        return self._store(key, response, headers)
+
+    def _cached(self, response):
+        response = copy.copy(response)
+        response.from_cache = True
+        return response
+
+    def _store(self, key, response, headers):
+        directives = parse_cache_control(
+            response.headers.get('Cache-Control'))
+        if response.status_code == 200 and \
+                'no-store' not in directives and \
+                'private' not in directives:
+            response.content
+            self.backend.set(
+                key,
+                CacheEntry(response, self._vary(response, headers), self.ttl))
+        else:
+            self.backend.delete(key)
+        response.from_cache = False
+        return response
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(options):
+    """ Return the process wide cache for the given options, so
+        cached responses are shared by all the tests::
+
+            cache:
+              ttl: 60
+              max_entries: 1000
+              max_bytes: 104857600
+              path: /tmp/play_requests_cache
+              credential_headers:
+              - X-Session-Token
+
+        If ``path`` is provided responses are cached on disk.
+    """
+    if not isinstance(options, dict):
+        options = {}
+    key = repr(sorted(options.items()))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            path = options.get('path')
+            max_entries = options.get('max_entries', 1000)
+            if path:
+                backend = DiskBackend(path, max_entries=max_entries)
+            else:
+                backend = MemoryBackend(
+                    max_entries=max_entries,
+                    max_bytes=options.get('max_bytes'))
+            cache = ResponseCache(
+                backend, ttl=options.get('ttl', 0),
+                credential_headers=options.get('credential_headers'))
+            _caches[key] = cache
+        return cache
+
+
+def clear_caches():
+    """ Forget all the process wide caches (entries stored on disk
+        are kept)
+    """
+    with _caches_lock:
+        _caches.clear()
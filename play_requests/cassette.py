@@ -0,0 +1,308 @@
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+INDEX_MAGIC = b'PRCI'
+INDEX_HEADER = struct.Struct('>4sI')
+INDEX_ENTRY = struct.Struct('>QQ')
+RECORD_HEADER = struct.Struct('>II')
+MATCH_ON = ('method', 'url')
+BOUNDARY = re.compile(r'boundary="?([^";]+)"?')
+
+
+class CassetteError(LookupError):
+    """ No recorded response matches the request """
+
+
+def _hash(key):
+    return struct.unpack(
+        '>Q', hashlib.sha1(key.encode('utf-8')).digest()[:8])[0]
+
+
+class Cassette(object):
+    """ Record HTTP exchanges to a compact cassette file and
+        replay them without network.
+
+        The cassette is made of two files:
+
+        * ``path``, the sequence of recorded exchanges (a small JSON
+          header followed by the raw response body)
+        * ``path.idx``, a sorted binary index of (key hash, offset)
+          pairs written when the recording is flushed
+
+        On replay both files are memory-mapped, so even big cassettes
+        load instantly and lookups are binary searches on the index.
+        Identical requests recorded many times are replayed in the
+        same order (the last recorded response is repeated once
+        exhausted).
+
+        Requests are matched on ``match_on`` items: ``method``,
+        ``url`` (including query string), ``body`` and any other
+        item is considered a request header name. Multipart bodies
+        are matched regardless of their random boundary, streamed
+        bodies (eg: ``stream_files``) can not be matched.
+    """
+
+    def __init__(self, path, mode='replay', match_on=MATCH_ON):
+        if mode not in ('record', 'replay'):
+            raise ValueError('Cassette mode not supported', mode)
+        self.path = path
+        self.mode = mode
+        self.match_on = tuple(match_on)
+        self.index_path = path + '.idx'
+        self._lock = threading.Lock()
+        self._counters = {}
+        if mode == 'record':
+            directory = os.path.dirname(os.path.abspath(path))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            self._file = open(path, 'wb')
+            self._entries = []
+            self._dirty = False
+        else:
+            self._open_replay()
+
+    def _open_replay(self):
+        with open(self.path, 'rb') as file_obj:
+            self._data = self._mmap(file_obj)
+        with open(self.index_path, 'rb') as file_obj:
+            self._index = self._mmap(file_obj)
+        magic, self._count = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError('Not a cassette index', self.index_path)
+
+    def _mmap(self, file_obj):
+        if not os.fstat(file_obj.fileno()).st_size:
+            return b''
+        return mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def key(self, method, prepared):
+        """ Matching key of a prepared request """
+        items = []
+        for item in self.match_on:
+            if item == 'method':
+                items.append(method)
+            elif item == 'url':
+                items.append(prepared.url)
+            elif item == 'body':
+                items.append(self._body_hash(prepared))
+            else:
+                items.append('{0}={1}'.format(
+                    item.lower(), prepared.headers.get(item, '')))
+        return ' '.join(items)
+
+    def _body_hash(self, prepared):
+        body = prepared.body or b''
+        if hasattr(body, 'read'):
+            raise ValueError(
+                'Streamed request bodies can not be matched', self.path)
+        if not isinstance(body, bytes):
+            body = str(body).encode('utf-8')
+        content_type = prepared.headers.get('Content-Type', '')
+        match = BOUNDARY.search(content_type)
+        if match and content_type.startswith('multipart/'):
+            # boundaries are random
+            body = body.replace(match.group(1).encode('utf-8'), b'boundary')
+        return hashlib.sha1(body).hexdigest()
+
+    def record(self, key, response):
+        """ Append an exchange to the cassette """
+        header = json.dumps({
+            'key': key,
+            'status': response.status_code,
+            'reason': response.reason,
+            'url': response.url,
+            'encoding': response.encoding,
+            'headers': list(response.headers.items()),
+            'elapsed': response.elapsed.total_seconds(),
+        }).encode('utf-8')
+        body = response.content or b''
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(RECORD_HEADER.pack(len(header), len(body)))
+            self._file.write(header)
+            self._file.write(body)
+            self._entries.append((_hash(key), offset))
+            self._dirty = True
+
+    def flush(self):
+        """ Write recorded data and the index """
+        if self.mode != 'record':
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._file.flush()
+            entries = sorted(self._entries)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'wb') as file_obj:
+                file_obj.write(INDEX_HEADER.pack(INDEX_MAGIC, len(entries)))
+                for entry in entries:
+                    file_obj.write(INDEX_ENTRY.pack(*entry))
+            os.rename(tmp_path, self.index_path)
+            self._dirty = False
+
+    def close(self):
+        """ Flush and close the cassette """
+        self.flush()
+        if self.mode == 'record':
+            self._file.close()
+        else:
+            for data in (self._data, self._index):
+                if data:
+                    data.close()
+
+    def _offsets(self, key_hash):
+        """ Binary search on the memory-mapped index """
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            value = INDEX_ENTRY.unpack_from(
+                self._index, INDEX_HEADER.size + middle * INDEX_ENTRY.size)[0]
+            if value < key_hash:
+                low = middle + 1
+            else:
+                high = middle
+        offsets = []
+        while low < self._count:
+            value, offset = INDEX_ENTRY.unpack_from(
+                self._index, INDEX_HEADER.size + low * INDEX_ENTRY.size)
+            if value != key_hash:
+                break
+            offsets.append(offset)
+            low += 1
+        return offsets
+
+    def _read(self, offset):
+        header_size, body_size = RECORD_HEADER.unpack_from(
+            self._data, offset)
+        start = offset + RECORD_HEADER.size
+        header = json.loads(
+            self._data[start:start + header_size].decode('utf-8'))
+        start += header_size
+        return header, self._data[start:start + body_size]
+
+    def replay(self, key, request=None):
+        """ Return the recorded response for the given key """
+        records = []
+        for offset in self._offsets(_hash(key)):
+            header, body = self._read(offset)
+            if header['key'] == key:
+                records.append((header, body))
+        if not records:
+            raise CassetteError('No recorded response', key, self.path)
+        with self._lock:
+            counter = self._counters.get(key, 0)
+            self._counters[key] = counter + 1
+        header, body = records[min(counter, len(records) - 1)]
+        response = requests.Response()
+        response.status_code = header['status']
+        response.reason = header['reason']
+        response.url = header['url']
+        response.encoding = header['encoding']
+        response.headers = CaseInsensitiveDict(header['headers'])
+        response.elapsed = datetime.timedelta(seconds=header['elapsed'])
+        response._content = body
+        response._content_consumed = True
+        response.request = request
+        response.from_cassette = True
+        return response
+
+    def request(self, send, session, method, url, parameters):
+        """ Record the response returned by ``send(parameters)`` or
+            replay a recorded one
+        """
+        if self.mode == 'record':
+            # the key is computed on the original request like at
+            # replay time (response.request is the last redirect)
+            if parameters.get('files'):
+                # preparing would consume the files to be sent
+                response = send(parameters)
+                prepared = (response.history or [response])[0].request
+            else:
+                prepared = self._prepare(session, method, url, parameters)
+                response = send(parameters)
+            self.record(self.key(method, prepared), response)
+            return response
+        prepared = self._prepare(session, method, url, parameters)
+        return self.replay(self.key(method, prepared), prepared)
+
+    def _prepare(self, session, method, url, parameters):
+        """ Prepare a request like requests would do, without
+            sending it
+        """
+        names = ('headers', 'files', 'data', 'json', 'params',
+                 'auth', 'cookies')
+        request = requests.Request(
+            method, url,
+            **dict((name, parameters[name]) for name in names
+                   if name in parameters))
+        return session.prepare_request(request)
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(options):
+    """ Return the process wide cassette for the given options::
+
+            cassette:
+              path: $base_path/cassettes/catalog.cassette
+              mode: replay
+              match_on:
+              - method
+              - url
+              - body
+
+        A cassette opened in ``record`` mode is recorded from scratch
+        the first time it is used in the process. A cassette file is
+        used with the same ``match_on`` by all the commands and,
+        once recorded, it can only be replayed: other combinations
+        raise a ``ValueError``.
+    """
+    if not isinstance(options, dict):
+        options = {'path': options}
+    path = options['path']
+    mode = options.get('mode', 'replay')
+    match_on = tuple(options.get('match_on', MATCH_ON))
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is not None and \
+                (cassette.mode, cassette.match_on) != (mode, match_on):
+            if cassette.match_on != match_on or mode == 'record':
+                raise ValueError(
+                    'Cassette already used with different options', path,
+                    cassette.mode, cassette.match_on)
+            # replay what has just been recorded
+            cassette.close()
+            cassette = None
+        if cassette is None:
+            cassette = Cassette(path, mode, match_on)
+            _cassettes[path] = cassette
+        return cassette
+
+
+def flush_cassettes():
+    """ Write the index of all the process wide recording cassettes """
+    with _cassettes_lock:
+        cassettes = list(_cassettes.values())
+    for cassette in cassettes:
+        cassette.flush()
+
+
+def close_cassettes():
+    """ Close all the process wide cassettes """
+    with _cassettes_lock:
+        for cassette in _cassettes.values():
+            cassette.close()
+        _cassettes.clear()
@@ -0,0 +1,117 @@
+import zlib
+
+from .multipart import iter_chunks
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+MIN_SIZE = 1024
+
+
+class ZlibCompressor(object):
+    """ gzip and deflate compressor """
+
+    def __init__(self, encoding, level=None):
+        wbits = 31 if encoding == 'gzip' else 15
+        self._compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION if level is None else level,
+            zlib.DEFLATED,
+            wbits)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor(object):
+    """ brotli compressor """
+
+    def __init__(self, encoding, level=None):
+        if brotli is None:
+            raise ImportError(
+                'brotli is required by the br encoding, install '
+                'play_requests[compression]')
+        kwargs = {}
+        if level is not None:
+            kwargs['quality'] = level
+        self._compressor = brotli.Compressor(**kwargs)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor(object):
+    """ zstd compressor """
+
+    def __init__(self, encoding, level=None):
+        if zstandard is None:
+            raise ImportError(
+                'zstandard is required by the zstd encoding, install '
+                'play_requests[compression]')
+        kwargs = {}
+        if level is not None:
+            kwargs['level'] = level
+        self._compressor = zstandard.ZstdCompressor(**kwargs).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+
+COMPRESSORS = {
+    'gzip': ZlibCompressor,
+    'deflate': ZlibCompressor,
+    'br': BrotliCompressor,
+    'zstd': ZstdCompressor,
+}
+
+
+def get_compressor(encoding, level=None):
+    """ Return a compressor (``compress(data)`` and ``flush()``)
+        for the given content encoding
+    """
+    factory = COMPRESSORS.get(encoding)
+    if factory is None:
+        raise ValueError('Encoding not supported', encoding)
+    return factory(encoding, level=level)
+
+
+def compress(body, encoding, level=None):
+    """ Compress a request body (bytes, text or file object read in
+        chunks) returning bytes
+
+        >>> import gzip
+        >>> gzip.decompress(compress('{"a": 1}', 'gzip'))
+        b'{"a": 1}'
+    """
+    compressor = get_compressor(encoding, level=level)
+    if hasattr(body, 'read'):
+        chunks = []
+        for chunk in iter_chunks(body):
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode('utf-8')
+            chunks.append(compressor.compress(chunk))
+    else:
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        chunks = [compressor.compress(body)]
+    chunks.append(compressor.flush())
+    return b''.join(chunks)
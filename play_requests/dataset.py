@@ -0,0 +1,140 @@
+import csv
+import io
+import re
+from string import Template
+
+from .serializers import loads
+
+
+FORMATS = {
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+_placeholder = re.compile(r'^\$(?:(\w+)|\{(\w+)\})$')
+
+
+def iter_rows(path, format=None, delimiter=None, limit=None):
+    """ Lazily iterate over the rows (dictionaries) of a CSV or
+        JSON lines file, never loading the whole file in memory.
+
+        The format is guessed from the file extension (``.csv``,
+        ``.tsv``, ``.jsonl``, ``.ndjson``) unless provided.
+    """
+    if format is None:
+        for extension, name in FORMATS.items():
+            if path.lower().endswith(extension):
+                format = name
+                break
+        else:
+            raise ValueError('Dataset format not supported', path)
+    count = 0
+    if format in ('csv', 'tsv'):
+        if delimiter is None:
+            delimiter = '\t' if format == 'tsv' else ','
+        with io.open(path, newline='', encoding='utf-8') as file_obj:
+            for row in csv.DictReader(file_obj, delimiter=delimiter):
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield row
+    elif format == 'jsonl':
+        with io.open(path, 'rb') as file_obj:
+            for line in file_obj:
+                if not line.strip():
+                    continue
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield loads(line)
+    else:
+        raise ValueError('Dataset format not supported', format)
+
+
+class CommandTemplate(object):
+    """ A command expanded with the values of dataset rows.
+
+        String values of ``keys`` containing ``$field`` or
+        ``${field}`` placeholders are substituted with row values.
+        A string made just of a placeholder is replaced with the row
+        value itself, keeping its type (eg: numbers or objects of
+        JSON lines rows).
+
+        Templated paths are found once, so rendering a row only
+        copies the dictionaries and lists containing placeholders::
+
+            >>> template = CommandTemplate({
+            ...     'type': 'GET',
+            ...     'url': 'http://something/items/$id',
+            ...     'parameters': {'json': {'id': '$id', 'tag': 'a'}}})
+            >>> command = template.render({'id': 3})
+            >>> command['url']
+            'http://something/items/3'
+            >>> command['parameters']['json']
+            {'id': 3, 'tag': 'a'}
+    """
+
+    def __init__(self, command, keys=('url', 'parameters')):
+        self.command = command
+        self.keys = keys
+        self._templated = dict(
+            (key, self._compile(command[key])) for key in keys
+            if key in command)
+
+    def _compile(self, value):
+        """ Return a compiled template or ``None`` if the value
+            does not contain placeholders
+        """
+        if isinstance(value, str):
+            if '$' not in value:
+                return None
+            match = _placeholder.match(value)
+            if match:
+                return ('field', match.group(1) or match.group(2))
+            return ('string', Template(value))
+        if isinstance(value, dict):
+            items = dict(
+                (key, compiled) for key, compiled in (
+                    (key, self._compile(item))
+                    for key, item in value.items())
+                if compiled is not None)
+            return items and ('dict', items) or None
+        if isinstance(value, list):
+            items = dict(
+                (index, compiled) for index, compiled in (
+                    (index, self._compile(item))
+                    for index, item in enumerate(value))
+                if compiled is not None)
+            return items and ('list', items) or None
+        return None
+
+    def _render(self, value, compiled, row):
+        kind, template = compiled
+        if kind == 'field':
+            if template in row:
+                return row[template]
+            return value
+        if kind == 'string':
+            return template.safe_substitute(row)
+        if kind == 'dict':
+            value = dict(value)
+        else:
+            value = list(value)
+        for key, item in template.items():
+            value[key] = self._render(value[key], item, row)
+        return value
+
+    @property
+    def templated(self):
+        """ True if the command contains placeholders """
+        return any(self._templated.values())
+
+    def render(self, row):
+        """ Return the command expanded with the row values """
+        command = dict(self.command)
+        for key, compiled in self._templated.items():
+            if compiled is not None:
+                command[key] = self._render(command[key], compiled, row)
+        return command
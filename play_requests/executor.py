@@ -0,0 +1,317 @@
+import argparse
+import copy
+import io
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed,
+)
+from contextlib import redirect_stdout
+from multiprocessing.util import Finalize
+
+import yaml
+from pytest_play.engine import PlayEngine
+
+from .profiling import dump_profilers
+from .providers import RequestsProvider
+
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = '.play_requests_durations.json'
+
+
+def discover(*paths):
+    """ Return the sorted pytest-play scripts (``test_*.yml`` or
+        ``test_*.yaml`` files) contained in the given directories,
+        files are returned as they are
+    """
+    scripts = []
+    for path in paths:
+        if not os.path.isdir(path):
+            scripts.append(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(
+                name for name in dirnames if not name.startswith('.'))
+            scripts.extend(
+                os.path.join(dirpath, name) for name in sorted(filenames)
+                if name.startswith('test_') and
+                name.endswith(('.yml', '.yaml')))
+    return scripts
+
+
+def make_context(variables, skin='skin1'):
+    """ Return the pytest-play engine variables for the given
+        pytest-variables like ``variables`` (the same of the
+        pytest-play ``play`` fixture)
+    """
+    context = {'test_run_identifier': 'QA-{0}'.format(uuid.uuid1())}
+    context.update(variables.get('pytest-play') or {})
+    skin_settings = (variables.get('skins') or {}).get(skin) or {}
+    if 'base_url' in skin_settings:
+        context['base_url'] = skin_settings['base_url']
+    for name, credentials in (
+            skin_settings.get('credentials') or {}).items():
+        context['{0}_name'.format(name)] = credentials['username']
+        context['{0}_pwd'.format(name)] = credentials['password']
+    return context
+
+
+class DurationHistory(object):
+    """ Scenario durations (seconds) persisted to a JSON file,
+        smoothed with an exponential moving average
+    """
+
+    def __init__(self, path=HISTORY_PATH, alpha=0.5):
+        self.path = path
+        self.alpha = alpha
+        self.durations = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as file_obj:
+                    self.durations = json.load(file_obj)
+            except ValueError:
+                logger.warning('Ignoring corrupted history %s', path)
+
+    def get(self, name):
+        return self.durations.get(name)
+
+    def update(self, name, duration):
+        previous = self.durations.get(name)
+        if previous is not None:
+            duration = self.alpha * duration + (1 - self.alpha) * previous
+        self.durations[name] = duration
+
+    def save(self):
+        """ Atomically write the history """
+        tmp_path = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as file_obj:
+            json.dump(self.durations, file_obj, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def schedule(scripts, history=None):
+    """ Return the scripts ordered by decreasing known duration
+        (longest processing time first), scripts without history
+        come first since they might be the longest ones
+    """
+    if history is None:
+        return list(scripts)
+
+    def key(script):
+        duration = history.get(os.path.normpath(script))
+        return (duration is not None, -(duration or 0))
+    return sorted(scripts, key=key)
+
+
+class ScenarioConfig(object):
+    """ pytest ``config`` stand-in with the pytest-play default
+        options
+    """
+
+    options = {
+        'stats_host': 'localhost',
+        'stats_port': 8125,
+        'stats_prefix': None,
+    }
+
+    def getoption(self, name, default=None):
+        return self.options.get(name, default)
+
+
+class ScenarioRequest(object):
+    """ pytest ``request`` stand-in for engines running outside
+        pytest, properties recorded with ``record_property`` (eg: by
+        the pytest-play metrics provider) are collected in
+        ``properties``
+    """
+
+    def __init__(self):
+        self.config = ScenarioConfig()
+        self.properties = []
+
+    def record_property(self, name, value):
+        self.properties.append((name, value))
+
+    def getfixturevalue(self, name):
+        if name == 'record_property':
+            return self.record_property
+        raise LookupError('Fixture not available outside pytest', name)
+
+
+class ScenarioWorker(object):
+    """ Execute pytest-play scripts in a worker process with a
+        long-lived engine, so play_requests connection pools stay
+        warm across scenarios.
+
+        Variables are reset and play_requests providers forget the
+        per test state (see
+        :meth:`play_requests.providers.RequestsProvider.reset`) before
+        each scenario. Metadata ``test_data`` executes the scenario
+        once for each item.
+    """
+
+    def __init__(self, variables=None, skin='skin1'):
+        self.context = make_context(variables or {}, skin)
+        self.request = ScenarioRequest()
+        self.engine = PlayEngine(
+            self.request, copy.deepcopy(self.context))
+        if self.engine.get_command_provider(RequestsProvider.name) is None:
+            # eg: running from a source checkout not installed
+            self.engine.register_command_provider(
+                RequestsProvider, RequestsProvider.name)
+
+    def run(self, path):
+        """ Execute a script returning a result dictionary with
+            ``path``, ``duration``, ``error`` (the traceback of
+            failed scenarios), ``output`` and recorded ``properties``
+        """
+        start = time.perf_counter()
+        self.request.properties = []
+        error = None
+        output = io.StringIO()
+        try:
+            with redirect_stdout(output):
+                data = self.engine.get_file_contents(path)
+                documents = list(yaml.safe_load_all(data))
+                metadata = len(documents) > 1 and documents[0] or {}
+                for test_data in metadata.get('test_data') or [{}]:
+                    self.reset()
+                    self.engine.execute_raw(
+                        data, extra_variables=test_data)
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            self.reset()
+        return {
+            'path': path,
+            'duration': time.perf_counter() - start,
+            'error': error,
+            'output': output.getvalue(),
+            'properties': self.request.properties,
+            'pid': os.getpid(),
+        }
+
+    def reset(self):
+        self.engine.variables = copy.deepcopy(self.context)
+        for name in (RequestsProvider.name, 'play_requests_async'):
+            provider = self.engine.get_command_provider(name)
+            reset = getattr(provider, 'reset', None)
+            if reset is not None:
+                reset()
+
+    def close(self):
+        self.engine.teardown()
+        # worker processes do not run atexit hooks
+        dump_profilers()
+
+
+_worker = None
+
+
+def _init_worker(variables, skin):
+    global _worker
+    _worker = ScenarioWorker(variables, skin)
+    Finalize(_worker, _worker.close, exitpriority=10)
+
+
+def _run_scenario(path):
+    return _worker.run(path)
+
+
+class ScenarioExecutor(object):
+    """ Execute pytest-play scripts across a pool of ``workers``
+        processes (default: one per CPU), each one holding its own
+        :class:`ScenarioWorker`.
+
+        With a ``history`` path, the longest scenarios according to
+        the durations of the previous runs are scheduled first and
+        the history is updated at the end of the run.
+    """
+
+    def __init__(self, variables=None, workers=None, history=None,
+                 skin='skin1'):
+        self.variables = variables or {}
+        self.workers = workers or os.cpu_count() or 1
+        self.history = history and DurationHistory(history) or None
+        self.skin = skin
+
+    def run(self, scripts):
+        """ Run the scripts returning the results (see
+            :meth:`ScenarioWorker.run`) in completion order
+        """
+        scripts = schedule(scripts, self.history)
+        if not scripts:
+            return []
+        results = []
+        with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(scripts)),
+                initializer=_init_worker,
+                initargs=(self.variables, self.skin)) as executor:
+            futures = [
+                executor.submit(_run_scenario, script)
+                for script in scripts]
+            for future in as_completed(futures):
+                result = future.result()
+                if self.history is not None:
+                    self.history.update(
+                        os.path.normpath(result['path']),
+                        result['duration'])
+                results.append(result)
+        if self.history is not None:
+            self.history.save()
+        return results
+
+
+def main(argv=None):
+    """ Command line entry point::
+
+            play_requests_run tests/ --workers 32 --variables env.yml
+    """
+    parser = argparse.ArgumentParser(
+        description='Execute pytest-play scripts across processes')
+    parser.add_argument(
+        'paths', nargs='+', help='scripts or directories of scripts')
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help='number of worker processes (default: CPU count)')
+    parser.add_argument(
+        '--variables', help='YAML or JSON variables file')
+    parser.add_argument('--skin', default='skin1')
+    parser.add_argument(
+        '--history', default=HISTORY_PATH,
+        help='durations history file (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    variables = {}
+    if args.variables:
+        with open(args.variables) as file_obj:
+            variables = yaml.safe_load(file_obj) or {}
+    executor = ScenarioExecutor(
+        variables=variables, workers=args.workers, history=args.history,
+        skin=args.skin)
+    start = time.perf_counter()
+    results = executor.run(discover(*args.paths))
+    failed = [result for result in results if result['error']]
+    for result in results:
+        print('{0} {1:.2f}s {2}'.format(
+            'FAILED' if result['error'] else 'PASSED',
+            result['duration'], result['path']))
+    for result in failed:
+        print('\n{0}\n{1}{2}'.format(
+            result['path'], result['output'], result['error']))
+    print('{0} passed, {1} failed in {2:.2f}s'.format(
+        len(results) - len(failed), len(failed),
+        time.perf_counter() - start))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import logging
+from collections import ChainMap
+from functools import lru_cache
+
+from RestrictedPython import RestrictionCapableEval
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(expression):
+    """ Compile a restricted python expression once.
+
+        Compiled expressions are cached by expression text in a
+        bounded LRU cache, so the same assertion or variable expression
+        evaluated in loops or load tests is parsed just once.
+    """
+    compiled = RestrictionCapableEval(expression)
+    compiled.prepRestrictedCode()
+    return compiled
+
+
+def evaluate(expression, context, **kwargs):
+    """ Evaluate a restricted python expression against the
+        pytest-play engine ``context`` updated with ``kwargs``
+        (the same semantics of the python provider)
+    """
+    return compile_expression(expression).eval(ChainMap(kwargs, context))
+
+
+def assert_expression(expression, context, log_failures=True, **kwargs):
+    """ Raise an ``AssertionError`` if the expression is false-ish,
+        logging the failure unless ``log_failures`` is false
+    """
+    try:
+        result = evaluate(expression, context, **kwargs)
+    except Exception as e:
+        if log_failures:
+            logger.error(
+                "FAILED expression: '%s' (exception: %r)", expression, e)
+        raise
+    if not result:
+        if log_failures:
+            logger.error("FAILED expression: '%s'", expression)
+        raise AssertionError(expression)
@@ -0,0 +1,196 @@
+import datetime
+import time
+
+import requests
+from requests.compat import cookielib
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+
+from .multipart import (
+    MultipartEncoder,
+    iter_chunks,
+)
+from .timing import current_timing
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class RawStream(object):
+    """ File-like adapter over a streamed httpx response, used as
+        ``raw`` of requests responses (``iter_content``,
+        ``iter_lines``)
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self._iterator = response.iter_bytes()
+        self._buffer = b''
+        self._read = 0
+
+    def read(self, size=-1, **kwargs):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._read += len(data)
+        return data
+
+    def tell(self):
+        return self._read
+
+    def close(self):
+        self._response.close()
+
+
+class Http2Session(object):
+    """ A requests-like session performing HTTP calls with an httpx
+        client speaking HTTP/2, so concurrent calls to the same
+        origin are multiplexed over a single connection.
+
+        HTTP/2 is negotiated with TLS (ALPN), plain ``http://`` calls
+        use HTTP/1.1 unless ``prior_knowledge`` is true.
+
+        Accepts the same parameters of requests calls
+        (``headers``, ``params``, ``json``, ``data``, ``files``,
+        ``auth``, ``cookies``, ``timeout``, ``allow_redirects``,
+        ``stream``) and returns requests responses.
+        ``verify`` and ``cert`` are session options in httpx.
+    """
+
+    def __init__(self, limit=100, verify=True, cert=None,
+                 prior_knowledge=False):
+        if httpx is None:
+            raise ImportError(
+                'httpx is required by the http2 option, install '
+                'play_requests[http2]')
+        if isinstance(cert, list):
+            cert = tuple(cert)
+        self.client = httpx.Client(
+            http1=not prior_knowledge,
+            http2=True,
+            verify=verify,
+            cert=cert,
+            timeout=None,
+            limits=httpx.Limits(
+                max_connections=limit,
+                max_keepalive_connections=limit),
+            # never store cookies, like the provider sessions
+            cookies=cookielib.CookieJar(
+                policy=cookielib.DefaultCookiePolicy(allowed_domains=[])))
+
+    def close(self):
+        self.client.close()
+
+    def prepare_request(self, request):
+        """ Prepare a requests request (used for matching recorded
+            calls, see :mod:`play_requests.cassette`)
+        """
+        return request.prepare()
+
+    def _make_parameters(self, parameters):
+        """ Translate requests parameters to httpx ones """
+        kwargs = {}
+        for key, value in parameters.items():
+            if key == 'headers' and 'headers' in kwargs:
+                continue
+            elif key in ('headers', 'params', 'json', 'cookies'):
+                kwargs[key] = value
+            elif key == 'files':
+                kwargs['files'] = dict(
+                    (name, tuple(item) if isinstance(item, list) else item)
+                    for name, item in value.items())
+            elif key == 'data':
+                if isinstance(value, MultipartEncoder):
+                    kwargs['content'] = iter_chunks(value)
+                    kwargs['headers'] = dict(
+                        parameters.get('headers') or {},
+                        **{'Content-Length': str(len(value))})
+                elif isinstance(value, (bytes, str)) or \
+                        hasattr(value, 'read'):
+                    kwargs['content'] = value
+                else:
+                    kwargs['data'] = value
+            elif key == 'timeout':
+                if isinstance(value, (list, tuple)):
+                    kwargs['timeout'] = httpx.Timeout(
+                        None, connect=value[0], read=value[1])
+                else:
+                    kwargs['timeout'] = value
+            elif key not in ('auth', 'allow_redirects', 'stream',
+                             'verify', 'cert'):
+                raise ValueError('Parameter not supported', key)
+        return kwargs
+
+    def _make_trace(self, timing):
+        """ httpx trace hook feeding the timing record """
+        starts = {}
+
+        def trace(event_name, info):
+            now = time.perf_counter()
+            name, sep, step = event_name.rpartition('.')
+            if step == 'started':
+                starts[name] = now
+            elif step == 'complete':
+                if name == 'connection.connect_tcp':
+                    timing.connect = now - starts[name]
+                elif name == 'connection.start_tls':
+                    timing.tls = now - starts[name]
+                elif name.endswith('.receive_response_headers'):
+                    timing.ttfb = now - timing.start
+        return trace
+
+    def request(self, method, url, **parameters):
+        """ Perform the HTTP call returning a requests response """
+        extensions = {}
+        timing = current_timing()
+        if timing is not None:
+            extensions['trace'] = self._make_trace(timing)
+        request = self.client.build_request(
+            method, url, extensions=extensions,
+            **self._make_parameters(parameters))
+        stream = bool(parameters.get('stream'))
+        start = datetime.datetime.now()
+        resp = self.client.send(
+            request,
+            auth=parameters.get('auth'),
+            follow_redirects=parameters.get('allow_redirects', True),
+            stream=stream)
+        response = requests.Response()
+        response.status_code = resp.status_code
+        response.reason = resp.reason_phrase
+        response.headers = CaseInsensitiveDict(resp.headers.items())
+        response.url = str(resp.url)
+        response.encoding = resp.charset_encoding
+        response.http_version = resp.http_version
+        cookies = RequestsCookieJar()
+        for name, value in resp.cookies.items():
+            cookies.set(name, value)
+        response.cookies = cookies
+        if stream:
+            response.raw = RawStream(resp)
+            response._content = False
+            response._content_consumed = False
+        else:
+            response._content = resp.content
+            response._content_consumed = True
+            resp.close()
+        response.elapsed = datetime.datetime.now() - start
+        response.request = self._make_prepared(resp.request)
+        return response
+
+    def _make_prepared(self, request):
+        """ requests representation of the sent request """
+        prepared = requests.PreparedRequest()
+        prepared.method = request.method
+        prepared.url = str(request.url)
+        prepared.headers = CaseInsensitiveDict(request.headers.items())
+        prepared.body = getattr(request, '_content', None)
+        return prepared
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .dataset import CommandTemplate
+from .stats import LatencyStats
+
+
+logger = logging.getLogger(__name__)
+
+
+class Pacer(object):
+    """ Thread safe pacer spreading calls at a target
+        rate (calls per second)
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = None
+
+    def wait(self):
+        """ Block until the next slot is available """
+        with self._lock:
+            now = time.time()
+            if self._next is None or self._next < now:
+                self._next = now
+            slot = self._next
+            self._next = slot + self.interval
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class LoadRunner(object):
+    """ Replay a list of :class:`play_requests.plan.CommandPlan` with
+        ``concurrency`` workers for a given ``duration`` (seconds) or
+        number of ``iterations`` per worker, optionally limiting the
+        overall request rate to ``rps`` requests per second.
+
+        Each worker is a virtual user executing the commands in
+        order with its own copy of the engine variables, so a
+        functional scenario is replayed as is: variables stored by a
+        command (eg: an authentication ``token``) resolve the
+        ``$token`` placeholders in the ``url`` and ``parameters`` of
+        the following commands of the same virtual user.
+    """
+
+    def __init__(self, provider, plans, duration=None, iterations=None,
+                 concurrency=1, rps=None):
+        self.provider = provider
+        self.plans = plans
+        self.duration = duration
+        self.iterations = iterations
+        if duration is None and iterations is None:
+            self.iterations = 1
+        self.concurrency = concurrency
+        self.pacer = rps and Pacer(rps) or None
+        self.stats = LatencyStats()
+        self.templates = []
+        for plan in plans:
+            template = CommandTemplate(plan.command)
+            self.templates.append(template.templated and template or None)
+
+    def _call(self, plan, template, variables):
+        """ Perform a timed call with the virtual user ``variables``,
+            failures are counted in the report and only logged at
+            debug level
+        """
+        provider = self.provider
+        if self.pacer is not None:
+            self.pacer.wait()
+        start = time.perf_counter()
+        elapsed = None
+        try:
+            command = plan.command
+            if template is not None:
+                command = template.render(variables)
+            cmd, response = provider._send_command(plan.method, command)
+            elapsed = time.perf_counter() - start
+            provider._check_response(
+                cmd, response, log_failures=False, variables=variables)
+        except Exception:
+            if elapsed is None:
+                elapsed = time.perf_counter() - start
+            logger.debug('Load call %r failed', plan.label, exc_info=True)
+            self.stats.add(plan.label, elapsed, error=True)
+        else:
+            self.stats.add(plan.label, elapsed)
+
+    def _worker(self, end_time):
+        variables = dict(self.provider.engine.variables)
+        iteration = 0
+        while True:
+            if self.iterations is not None and \
+                    iteration >= self.iterations:
+                break
+            if end_time is not None and time.time() >= end_time:
+                break
+            for plan, template in zip(self.plans, self.templates):
+                self._call(plan, template, variables)
+            iteration += 1
+
+    def run(self):
+        """ Run the load returning the report (see
+            :meth:`play_requests.stats.LatencyStats.report`)
+        """
+        self.stats.start()
+        end_time = None
+        if self.duration is not None:
+            end_time = self.stats.start_time + self.duration
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [
+                executor.submit(self._worker, end_time)
+                for worker in range(self.concurrency)]
+            for future in futures:
+                future.result()
+        self.stats.stop()
+        return self.stats.report()
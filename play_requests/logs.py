@@ -0,0 +1,192 @@
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import reprlib
+
+
+logger = logging.getLogger('play_requests')
+
+MAX_BODY = 256
+REDACT = ('authorization', 'proxy-authorization', 'cookie', 'set-cookie',
+          'x-api-key', 'password', 'passwd', 'secret', 'token',
+          'access_token', 'refresh_token')
+REDACTED = '***'
+
+
+class BoundedRepr(reprlib.Repr):
+    """ repr with bounded size and cost (big bodies are never fully
+        walked) redacting sensitive dictionary keys
+    """
+
+    def __init__(self, max_size=MAX_BODY, redact=REDACT):
+        super(BoundedRepr, self).__init__()
+        self.maxstring = self.maxother = max_size
+        self.maxdict = self.maxlist = self.maxtuple = 20
+        self.maxlevel = 4
+        self.redact = frozenset(name.lower() for name in redact)
+
+    def repr_dict(self, value, level):
+        if self.redact and any(
+                isinstance(key, str) and key.lower() in self.redact
+                for key in value):
+            value = dict(
+                (key, REDACTED if isinstance(key, str) and
+                 key.lower() in self.redact else item)
+                for key, item in value.items())
+        return super(BoundedRepr, self).repr_dict(value, level)
+
+
+def redact_headers(headers, redact=REDACT):
+    """ Copy of the headers with sensitive values redacted """
+    names = frozenset(name.lower() for name in redact)
+    return dict(
+        (name, REDACTED if name.lower() in names else value)
+        for name, value in (headers or {}).items())
+
+
+def summarize_body(parameters, max_size=MAX_BODY, redact=REDACT):
+    """ Short description of the request body """
+    for key in ('json', 'data'):
+        value = parameters.get(key)
+        if value is None:
+            continue
+        if isinstance(value, (bytes, str)):
+            size = len(value)
+            if isinstance(value, bytes):
+                value = value[:max_size].decode('utf-8', 'replace')
+            else:
+                value = value[:max_size]
+            if size > max_size:
+                value = '{0}...({1} bytes)'.format(value, size)
+            return value
+        if hasattr(value, 'read'):
+            return '<{0}>'.format(type(value).__name__)
+        return BoundedRepr(max_size, redact).repr(value)
+    return None
+
+
+def summarize(method, cmd, response=None, options=None):
+    """ Structured event describing an HTTP call """
+    options = options or {}
+    max_size = options.get('max_body', MAX_BODY)
+    redact = options.get('redact', REDACT)
+    parameters = cmd.get('parameters') or {}
+    event = {
+        'method': method,
+        'url': cmd.get('url'),
+        'headers': redact_headers(parameters.get('headers'), redact),
+    }
+    if parameters.get('params'):
+        event['params'] = BoundedRepr(max_size, redact).repr(
+            parameters['params'])
+    body = summarize_body(parameters, max_size, redact)
+    if body is not None:
+        event['body'] = body
+    if parameters.get('files'):
+        event['files'] = sorted(parameters['files'])
+    if response is not None:
+        event['status'] = response.status_code
+        timing = getattr(response, 'timing', None)
+        if timing is not None:
+            event['total'] = timing.total
+            event['ttfb'] = timing.ttfb
+            event['bytes_sent'] = timing.bytes_sent
+            event['bytes_received'] = timing.bytes_received
+    return event
+
+
+def _options(cmd):
+    """ ``log`` command options, ``log: true`` uses the defaults """
+    options = cmd.get('log')
+    if not isinstance(options, dict):
+        options = {}
+    return options
+
+
+def log_call(log, method, cmd, response=None):
+    """ Log an HTTP call as a structured ``http_call`` event at
+        debug level, according to the ``log`` command option::
+
+            log:
+              sample: 0.1
+              max_body: 256
+              redact: [authorization, password]
+
+        Nothing is computed if debug logging is disabled or the call
+        is not sampled.
+    """
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    options = _options(cmd)
+    sample = options.get('sample', 1)
+    if sample < 1 and random.random() >= sample:
+        return
+    event = summarize(method, cmd, response, options)
+    log.debug(
+        'HTTP call %s %s -> %s', method, cmd.get('url'),
+        event.get('status'),
+        extra={'event': 'http_call', 'play_requests': event})
+
+
+def log_failure(log, cmd):
+    """ Log the failure of a command (always, not sampled) """
+    options = _options(cmd)
+    event = summarize(cmd.get('type'), cmd, options=options)
+    log.exception(
+        'Exception for command %s %s', cmd.get('type'), cmd.get('url'),
+        extra={'event': 'command_failure', 'play_requests': event})
+
+
+class JSONFormatter(logging.Formatter):
+    """ Format records as JSON lines, including the structured
+        play_requests event (if any)
+    """
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'event', None):
+            data['event'] = record.event
+            data.update(record.play_requests)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=repr)
+
+
+def start_queue_logging(*handlers, **kwargs):
+    """ Route the ``play_requests`` log records through a queue, so
+        slow handlers (files, network) never block HTTP calls::
+
+            listener = start_queue_logging(logging.FileHandler('http.log'))
+            ...
+            stop_queue_logging(listener)
+
+        Records are handled by ``handlers`` in a background thread and
+        are not propagated to the root logger handlers, unless
+        ``propagate`` is true. Returns the started ``QueueListener``.
+    """
+    log = kwargs.get('logger', logger)
+    records = queue.Queue(-1)
+    handler = logging.handlers.QueueHandler(records)
+    listener = logging.handlers.QueueListener(
+        records, *handlers, respect_handler_level=True)
+    listener.logger = log
+    listener.queue_handler = handler
+    listener.propagate = log.propagate
+    log.propagate = kwargs.get('propagate', False)
+    log.addHandler(handler)
+    listener.start()
+    return listener
+
+
+def stop_queue_logging(listener):
+    """ Flush the queue and restore the logger configuration """
+    listener.logger.removeHandler(listener.queue_handler)
+    listener.logger.propagate = listener.propagate
+    listener.stop()
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import uuid
+
+
+CHUNK_SIZE = 65536
+
+
+def iter_chunks(file_obj, chunk_size=CHUNK_SIZE):
+    """ Yield the chunks of a file-like object (eg: a
+        :class:`MultipartEncoder`) until it is exhausted::
+
+            >>> import io
+            >>> list(iter_chunks(io.BytesIO(b'abc'), chunk_size=2))
+            [b'ab', b'c']
+    """
+    while True:
+        chunk = file_obj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def aiter_chunks(file_obj, chunk_size=CHUNK_SIZE):
+    """ Asynchronous :func:`iter_chunks`, blocking reads are
+        performed in the default executor of the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, file_obj.read, chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class MultipartEncoder(object):
+    """ Streaming ``multipart/form-data`` encoder.
+
+        A file-like object producing the request body on demand,
+        so file contents are read in chunks while sending and never
+        loaded entirely in memory::
+
+            >>> encoder = MultipartEncoder(
+            ...     {'name': 'value'},
+            ...     {'file': ('report.csv', b'some,data', 'text/csv')},
+            ...     boundary='xxx')
+            >>> encoder.content_type
+            'multipart/form-data; boundary=xxx'
+            >>> body = encoder.read()
+            >>> len(body) == len(MultipartEncoder(
+            ...     {'name': 'value'},
+            ...     {'file': ('report.csv', b'some,data', 'text/csv')},
+            ...     boundary='xxx'))
+            True
+
+        ``files`` accepts the same tuples supported by requests
+        (filename, file object or data, content type, headers).
+    """
+
+    def __init__(self, fields=None, files=None, boundary=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={0}'.format(
+            self.boundary)
+        self._segments = []
+        self._files = []
+        self._remaining = 0
+        for name, value in (fields or {}).items():
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            for item in value:
+                self._add_part(name, item)
+        for name, value in (files or {}).items():
+            filename = value[0]
+            content_type = len(value) > 2 and value[2] or None
+            headers = len(value) > 3 and value[3] or {}
+            self._add_part(
+                name,
+                value[1],
+                filename=filename,
+                content_type=content_type,
+                headers=headers)
+        self._add_bytes('--{0}--\r\n'.format(self.boundary))
+
+    def _add_bytes(self, data):
+        if not isinstance(data, bytes):
+            data = str(data).encode('utf-8')
+        self._segments.append(data)
+        self._remaining += len(data)
+
+    def _add_part(self, name, data, filename=None, content_type=None,
+                  headers=None):
+        disposition = 'form-data; name="{0}"'.format(name)
+        if filename:
+            disposition += '; filename="{0}"'.format(filename)
+        lines = [
+            '--{0}'.format(self.boundary),
+            'Content-Disposition: {0}'.format(disposition)]
+        if content_type:
+            lines.append('Content-Type: {0}'.format(content_type))
+        for header, value in (headers or {}).items():
+            lines.append('{0}: {1}'.format(header, value))
+        self._add_bytes('\r\n'.join(lines) + '\r\n\r\n')
+        if hasattr(data, 'read'):
+            self._segments.append(data)
+            self._files.append(data)
+            self._remaining += self._file_size(data)
+        else:
+            self._add_bytes(data)
+        self._add_bytes('\r\n')
+
+    def _file_size(self, file_obj):
+        """ Bytes left to be read from a file object """
+        try:
+            size = os.fstat(file_obj.fileno()).st_size
+        except (AttributeError, OSError, ValueError):
+            position = file_obj.tell()
+            file_obj.seek(0, 2)
+            size = file_obj.tell()
+            file_obj.seek(position)
+        return size - file_obj.tell()
+
+    def close(self):
+        """ Close the file objects """
+        for file_obj in self._files:
+            file_obj.close()
+        self._files = []
+        self._segments = []
+        self._remaining = 0
+
+    def __len__(self):
+        """ Bytes left to be read """
+        return self._remaining
+
+    def read(self, size=-1):
+        """ Read at most ``size`` bytes of the body
+            (all the remaining body if ``size`` is negative)
+        """
+        chunks = []
+        read = 0
+        while self._segments and (size < 0 or read < size):
+            segment = self._segments[0]
+            wanted = -1 if size < 0 else size - read
+            if isinstance(segment, bytes):
+                if wanted < 0 or wanted >= len(segment):
+                    chunk = segment
+                    self._segments.pop(0)
+                else:
+                    chunk = segment[:wanted]
+                    self._segments[0] = segment[wanted:]
+            else:
+                chunk = segment.read(wanted)
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode('utf-8')
+                if not chunk or wanted < 0:
+                    self._segments.pop(0)
+            chunks.append(chunk)
+            read += len(chunk)
+        self._remaining -= read
+        return b''.join(chunks)
@@ -0,0 +1,130 @@
+import logging
+
+from requests.compat import urljoin
+
+from .expressions import evaluate
+
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('link', 'cursor', 'page', 'offset')
+MAX_PAGES = 10000
+
+
+class Paginator(object):
+    """ Compute the command fetching the next page of a collection.
+
+        Strategies:
+
+        ``link``
+            follow the ``rel`` (default ``next``) URL of the ``Link``
+            response header
+        ``cursor``
+            pass the value of the ``cursor`` expression (eg:
+            ``response.json()['next_cursor']``) as ``param`` query
+            string parameter, stop if it is empty
+        ``page``, ``offset``
+            increment the ``param`` query string parameter (default
+            ``page`` or ``offset``) by ``step`` starting from
+            ``start``
+
+        Pagination stops when the ``stop`` expression is true or after
+        ``max_pages`` pages, logging a warning if more pages are
+        available. Without ``stop``, page and offset pagination stop
+        as soon as the JSON list of the response (or its ``items``
+        key for JSON objects) is empty.
+    """
+
+    def __init__(self, type='link', rel='next', cursor=None, param=None,
+                 start=None, step=1, stop=None, max_pages=MAX_PAGES,
+                 items=None):
+        if type not in STRATEGIES:
+            raise ValueError('Pagination not supported', type)
+        if type == 'cursor' and not cursor:
+            raise ValueError('Cursor pagination requires a cursor expression')
+        self.type = type
+        self.rel = rel
+        self.cursor = cursor
+        self.param = param or {
+            'page': 'page', 'offset': 'offset'}.get(type, 'cursor')
+        self.start = start
+        if start is None:
+            self.start = 1 if type == 'page' else 0
+        self.step = int(step)
+        self.stop = stop
+        self.items = items
+        self.max_pages = int(max_pages)
+
+    @classmethod
+    def from_options(cls, options):
+        """ Build a paginator from the ``paginate`` command option,
+            ``paginate: true`` follows ``Link`` headers and a string
+            is the strategy name
+        """
+        if options is True:
+            options = {}
+        elif isinstance(options, str):
+            options = {'type': options}
+        return cls(**options)
+
+    def first(self, command):
+        """ Return the command fetching the first page """
+        if self.type in ('page', 'offset'):
+            return self._with_param(command, self.start)
+        return command
+
+    def next(self, command, response, page, context):
+        """ Return the command fetching the page following
+            ``response`` (the page number ``page``, starting from 0),
+            None if there are no more pages
+        """
+        if self.stop and evaluate(
+                self.stop, context, response=response, page=page):
+            return None
+        if self.stop is None and self.type in ('page', 'offset') and \
+                not self._items(response):
+            return None
+        next_command = self._next(command, response, page, context)
+        if next_command is not None and page + 1 >= self.max_pages:
+            logger.warning(
+                'Pagination of %s stopped after max_pages (%d) pages '
+                'with more pages available', command['url'], self.max_pages)
+            return None
+        return next_command
+
+    def _items(self, response):
+        """ Return the items of a page """
+        document = response.json()
+        if self.items is not None:
+            return document[self.items]
+        if isinstance(document, dict):
+            raise ValueError(
+                'Page and offset pagination of JSON objects requires '
+                'the items or stop option')
+        return document
+
+    def _next(self, command, response, page, context):
+        if self.type == 'link':
+            url = response.links.get(self.rel, {}).get('url')
+            if not url:
+                return None
+            command = dict(command, url=urljoin(response.url, url))
+            parameters = dict(command.get('parameters') or {})
+            # the next URL already contains the query string
+            parameters.pop('params', None)
+            command['parameters'] = parameters
+            return command
+        if self.type == 'cursor':
+            value = evaluate(
+                self.cursor, context, response=response, page=page)
+            if value is None or value == '':
+                return None
+            return self._with_param(command, value)
+        return self._with_param(
+            command, self.start + (page + 1) * self.step)
+
+    def _with_param(self, command, value):
+        parameters = dict(command.get('parameters') or {})
+        params = parameters.get('params') or {}
+        parameters['params'] = dict(params, **{self.param: value})
+        return dict(command, parameters=parameters)
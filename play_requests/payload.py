@@ -0,0 +1,71 @@
+import copy
+import yaml
+
+
+def merge(default, command):
+    """ Merge a command with a default payload.
+
+        Dictionaries are merged recursively and command values win
+        over default ones. Only the dictionaries along the merged
+        paths are copied: command values (eg: big ``json`` bodies)
+        and untouched default values are shared, never deep copied::
+
+            >>> default = {'parameters': {'headers': {'A': '1'},
+            ...                           'timeout': 2}}
+            >>> merge(default, {'parameters': {'headers': {'B': '2'},
+            ...                                'timeout': 3}}) == {
+            ...     'parameters': {'headers': {'A': '1', 'B': '2'},
+            ...                    'timeout': 3}}
+            True
+            >>> default['parameters']['headers']
+            {'A': '1'}
+    """
+    result = dict(default)
+    for key, value in command.items():
+        current = result.get(key)
+        if isinstance(current, dict) and isinstance(value, dict):
+            result[key] = merge(current, value)
+        else:
+            result[key] = value
+    return result
+
+
+class DefaultPayload(object):
+    """ The default payload of a provider, stored in the engine
+        variable named as the provider (eg: ``play_requests``).
+
+        The parametrized default payload is computed once and
+        recomputed only when the variable changes (or at each merge if
+        it contains templates depending on other variables).
+    """
+
+    def __init__(self, engine, name):
+        self.engine = engine
+        self.name = name
+        self._fingerprint = None
+        self._templated = False
+        self._default = {}
+
+    @property
+    def default(self):
+        """ The parametrized default payload """
+        raw = self.engine.variables.get(self.name) or {}
+        if not raw:
+            return {}
+        fingerprint = repr(raw)
+        if fingerprint != self._fingerprint or self._templated:
+            self._templated = '$' in fingerprint or '{!' in fingerprint
+            if self._templated:
+                self._default = yaml.safe_load(self.engine.parametrize(
+                    yaml.dump(raw, default_flow_style=False)))
+            else:
+                self._default = copy.deepcopy(raw)
+            self._fingerprint = fingerprint
+        return self._default
+
+    def merge(self, command):
+        """ Return the command merged with the default payload """
+        default = self.default
+        if not default:
+            return command
+        return merge(default, command)
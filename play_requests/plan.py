@@ -0,0 +1,156 @@
+import os
+import re
+
+from .expressions import compile_expression
+from .prepared import (
+    REQUEST_PARAMETERS,
+    SEND_PARAMETERS,
+)
+from .profiling import command_label
+
+
+VERBS = ('OPTIONS', 'HEAD', 'GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+_path = re.compile(r'path:([^$]+)')
+
+
+class PlanError(ValueError):
+    """ One or more commands are not valid, ``errors`` contains
+        a message for each problem found
+    """
+
+    def __init__(self, errors):
+        super(PlanError, self).__init__('\n'.join(errors))
+        self.errors = errors
+
+
+class FilePath(object):
+    """ A file to be uploaded, opened at each call """
+
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return 'path:{0}'.format(self.path)
+
+
+def parse_file_data(file_data):
+    """ Return a :class:`FilePath` for ``path:<file path>`` file data,
+        the file data itself otherwise
+
+        >>> parse_file_data('path:/tmp/report.csv')
+        path:/tmp/report.csv
+        >>> parse_file_data('some,data')
+        'some,data'
+    """
+    if isinstance(file_data, str):
+        match = _path.search(file_data)
+        if match:
+            return FilePath(match.group(1))
+    return file_data
+
+
+class CommandPlan(object):
+    """ An immutable, validated play_requests HTTP command ready to
+        be executed many times (eg: by load tests) without
+        inspecting the raw command again.
+
+        ``command`` is shared by all the executions, so it must be
+        treated as read-only. Assertions and variables are evaluated
+        from it like for any other command.
+    """
+
+    __slots__ = ('command', 'method', 'url', 'label')
+
+    def __init__(self, command):
+        set_attribute = super(CommandPlan, self).__setattr__
+        set_attribute('command', command)
+        set_attribute('method', command['type'])
+        set_attribute('url', command['url'])
+        set_attribute('label', command_label(command))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CommandPlan is immutable')
+
+    def __repr__(self):
+        return '<CommandPlan {0}>'.format(self.label)
+
+
+def _validate(command):
+    """ Return the list of the problems of a command """
+    errors = []
+    if command.get('type') not in VERBS:
+        errors.append('command not supported {0!r}'.format(
+            command.get('type')))
+    if not command.get('url') or not isinstance(command['url'], str):
+        errors.append('missing url')
+    parameters = command.get('parameters') or {}
+    if not isinstance(parameters, dict):
+        errors.append('parameters must be a mapping')
+        parameters = {}
+    unknown = set(parameters).difference(
+        REQUEST_PARAMETERS + SEND_PARAMETERS)
+    if unknown:
+        errors.append('unexpected parameters {0}'.format(
+            ', '.join(sorted(unknown))))
+    for key, value in (parameters.get('files') or {}).items():
+        if not isinstance(value, (list, tuple)) or len(value) < 2:
+            errors.append(
+                'file {0!r} must be a [filename, data, ...] list'.format(
+                    key))
+            continue
+        file_data = parse_file_data(value[1])
+        if isinstance(file_data, FilePath) and \
+                not os.path.isfile(file_data.path):
+            errors.append('file {0!r} not found: {1}'.format(
+                key, file_data.path))
+    for name in ('assertion', 'variable_expression'):
+        expression = command.get(name)
+        if expression:
+            try:
+                compile_expression(expression)
+            except SyntaxError as e:
+                errors.append('invalid {0} {1!r}: {2}'.format(
+                    name, expression, e))
+    if command.get('variable_expression') and not command.get('variable'):
+        errors.append('variable_expression without variable')
+    return errors
+
+
+def _compile_files(command):
+    """ Parse ``path:`` file data once """
+    parameters = command.get('parameters') or {}
+    files = parameters.get('files')
+    if not files:
+        return command
+    files = dict(
+        (key, (value[0], parse_file_data(value[1])) + tuple(value[2:]))
+        for key, value in files.items())
+    return dict(command, parameters=dict(parameters, files=files))
+
+
+def compile_commands(commands):
+    """ Validate play_requests HTTP commands (with the default payload
+        already applied) returning a list of :class:`CommandPlan`.
+
+        All the commands are checked before returning, so a
+        :class:`PlanError` reports all the invalid commands at once
+        before any network call.
+    """
+    plans = []
+    errors = []
+    for index, command in enumerate(commands):
+        problems = _validate(command)
+        if problems:
+            errors.extend(
+                'command #{0} ({1} {2}): {3}'.format(
+                    index, command.get('type'), command.get('url'),
+                    problem)
+                for problem in problems)
+            continue
+        plans.append(CommandPlan(_compile_files(command)))
+    if errors:
+        raise PlanError(errors)
+    return plans
@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import requests
+
+from .serializers import compact_dumps
+
+
+REQUEST_PARAMETERS = (
+    'params', 'data', 'headers', 'cookies', 'files', 'auth', 'json',
+    'hooks')
+SEND_PARAMETERS = (
+    'timeout', 'allow_redirects', 'proxies', 'stream', 'verify', 'cert')
+
+
+def command_key(command):
+    """ Return a digest of the resolved command, None if the
+        prepared command can't be reused (eg: file uploads or
+        stateful authentication objects)
+    """
+    parameters = command.get('parameters') or {}
+    if parameters.get('files') or parameters.get('hooks') or \
+            hasattr(parameters.get('data'), 'read'):
+        return None
+    auth = parameters.get('auth')
+    if auth is not None and not isinstance(auth, (list, tuple)):
+        return None
+    try:
+        data = compact_dumps(command)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(data).digest()
+
+
+class PreparedCommands(object):
+    """ LRU cache of prepared commands keyed by :func:`command_key`.
+
+        Cached commands are shared by all the calls with the same
+        resolved command, so they must be treated as read-only
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            cmd = self._entries.get(key)
+            if cmd is not None:
+                self._entries.move_to_end(key)
+            return cmd
+
+    def set(self, key, cmd):
+        with self._lock:
+            self._entries[key] = cmd
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PreparedRequest(object):
+    """ A ``requests`` prepared request plus its send settings
+        (proxies, verify, etc from the environment), computed once
+        and sent many times by :meth:`send`
+    """
+
+    def __init__(self, session, method, url, parameters):
+        unknown = set(parameters).difference(
+            REQUEST_PARAMETERS + SEND_PARAMETERS)
+        if unknown:
+            raise TypeError(
+                'Unexpected request parameters', sorted(unknown))
+        request = requests.Request(
+            method=method.upper(), url=url,
+            **dict((name, parameters.get(name))
+                   for name in REQUEST_PARAMETERS))
+        self.request = session.prepare_request(request)
+        self.settings = {
+            'timeout': parameters.get('timeout'),
+            'allow_redirects': parameters.get('allow_redirects', True),
+        }
+        self.settings.update(session.merge_environment_settings(
+            self.request.url, parameters.get('proxies') or {},
+            parameters.get('stream'), parameters.get('verify'),
+            parameters.get('cert')))
+
+    def send(self, session):
+        return session.send(self.request.copy(), **self.settings)
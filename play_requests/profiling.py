@@ -0,0 +1,264 @@
+import atexit
+import cProfile
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+PHASES = ('prepare', 'files', 'network', 'retry', 'json_decode',
+          'variable', 'assertion')
+
+
+class _NullPhase(object):
+    """ No-op phase used when profiling is off """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_null_phase = _NullPhase()
+
+
+class CommandProfile(object):
+    """ Time spent by a single command in each phase (seconds).
+
+        Phases are exclusive: the time spent in nested phases (eg:
+        ``files`` while in ``prepare``, ``json_decode`` while
+        evaluating a ``variable``) is not counted twice.
+    """
+
+    __slots__ = ('label', 'phases', 'start', 'total', '_stack')
+
+    def __init__(self, label):
+        self.label = label
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.start = time.perf_counter()
+        self.total = None
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name):
+        entry = [name, time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - entry[1]
+            self.phases[name] = self.phases.get(name, 0.0) + \
+                elapsed - entry[2]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def as_dict(self):
+        return {
+            'label': self.label,
+            'total': self.total,
+            'phases': dict(self.phases),
+        }
+
+
+def phase(name):
+    """ Context manager attributing the elapsed time to the
+        ``name`` phase of the command profiled in the current thread
+        (a no-op if profiling is off)
+    """
+    record = getattr(_local, 'record', None)
+    if record is None:
+        return _null_phase
+    return record.phase(name)
+
+
+def command_label(command):
+    """ Label of a command (its ``name`` or verb and url) """
+    return command.get('name') or '{0} {1}'.format(
+        command['type'], command['url'])
+
+
+class Profiler(object):
+    """ Collect per phase timings of profiled commands, keeping
+        aggregated timings by command label and the ``top`` slowest
+        commands (with their cProfile statistics if ``cprofile``
+        is true).
+
+        With a ``path`` directory, :meth:`dump` writes there a
+        ``profile.json`` report and a ``slowest_<rank>.pstats`` file
+        for each of the slowest commands (eg: ``python -m pstats``,
+        snakeviz or flameprof can read them).
+    """
+
+    def __init__(self, top=10, path=None, cprofile=False):
+        self.top = int(top)
+        self.path = path
+        self.cprofile = cprofile
+        self.commands = {}
+        self._slowest = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, label):
+        """ Profile the command executed in the block """
+        record = CommandProfile(label)
+        previous = getattr(_local, 'record', None)
+        profile = None
+        if self.cprofile and previous is None:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiler is already active
+                profile = None
+        _local.record = record
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            _local.record = previous
+            record.total = time.perf_counter() - record.start
+            self.add(record, profile)
+
+    def add(self, record, profile=None):
+        with self._lock:
+            stats = self.commands.get(record.label)
+            if stats is None:
+                stats = self.commands[record.label] = {
+                    'count': 0,
+                    'total': 0.0,
+                    'max': 0.0,
+                    'phases': dict.fromkeys(PHASES, 0.0),
+                }
+            stats['count'] += 1
+            stats['total'] += record.total
+            stats['max'] = max(stats['max'], record.total)
+            for name, value in record.phases.items():
+                stats['phases'][name] = stats['phases'].get(name, 0.0) + \
+                    value
+            item = (record.total, next(self._counter), record, profile)
+            if len(self._slowest) < self.top:
+                heapq.heappush(self._slowest, item)
+            elif self.top and record.total > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    @property
+    def slowest(self):
+        """ (record, cProfile profile) of the slowest commands,
+            slowest first
+        """
+        with self._lock:
+            items = sorted(self._slowest, key=lambda item: -item[0])
+        return [(item[2], item[3]) for item in items]
+
+    def report(self):
+        """ Return the aggregated timings by label and the slowest
+            commands
+        """
+        with self._lock:
+            commands = dict(
+                (label, dict(stats, phases=dict(stats['phases'])))
+                for label, stats in self.commands.items())
+        return {
+            'commands': commands,
+            'slowest': [record.as_dict() for record, profile
+                        in self.slowest],
+        }
+
+    def dump(self):
+        """ Write the report and the cProfile statistics of the
+            slowest commands to ``path``
+        """
+        report = self.report()
+        for rank, item in enumerate(report['slowest'], 1):
+            logger.info(
+                'Slowest command #%d %s: %.3fs %s', rank, item['label'],
+                item['total'], ', '.join(
+                    '{0}={1:.3f}s'.format(name, value)
+                    for name, value in sorted(item['phases'].items())
+                    if value))
+        if not self.path:
+            return report
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(self.path):
+            if re.match(r'^slowest_\d+\.pstats$', name):
+                os.remove(os.path.join(self.path, name))
+        for rank, (record, profile) in enumerate(self.slowest, 1):
+            if profile is not None:
+                profile.dump_stats(os.path.join(
+                    self.path, 'slowest_{0}.pstats'.format(rank)))
+        with open(os.path.join(self.path, 'profile.json'), 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+        return report
+
+
+_profilers = {}
+_profilers_lock = threading.Lock()
+_dump_registered = False
+
+
+def get_profiler(options):
+    """ Return the process wide profiler for the given options, so
+        all the tests contribute to the same report::
+
+            profile:
+              top: 10
+              cprofile: true
+              path: /tmp/play_requests_profile
+
+        ``profile: true`` collects phase timings only.
+
+        Profilers are dumped once, when the process exits (see
+        :func:`dump_profilers`).
+    """
+    global _dump_registered
+    if not isinstance(options, dict):
+        options = {}
+    key = tuple(sorted(options.items()))
+    with _profilers_lock:
+        profiler = _profilers.get(key)
+        if profiler is None:
+            profiler = Profiler(**options)
+            _profilers[key] = profiler
+            if not _dump_registered:
+                atexit.register(dump_profilers)
+                _dump_registered = True
+        return profiler
+
+
+def profile_command(command):
+    """ Context manager profiling the command executed in the block
+        with the profiler of its ``profile`` option (a no-op if the
+        option is missing)
+    """
+    options = command.get('profile')
+    if not options:
+        return _null_phase
+    return get_profiler(options).profile(command_label(command))
+
+
+def clear_profilers():
+    """ Forget all the process wide profilers without dumping them """
+    with _profilers_lock:
+        _profilers.clear()
+
+
+def dump_profilers():
+    """ Dump all the process wide profilers """
+    with _profilers_lock:
+        profilers = list(_profilers.values())
+    for profiler in profilers:
+        profiler.dump()
@@ -1,16 +1,185 @@
-import json
-import logging
-import re
+import tempfile
+import time
 import requests
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from requests.compat import cookielib
 from pytest_play.providers import BaseProvider
 
+from .cache import (
+    CACHEABLE_METHODS,
+    get_cache,
+)
+from .cassette import (
+    flush_cassettes,
+    get_cassette,
+)
+from .compression import (
+    MIN_SIZE,
+    compress,
+)
+from .dataset import (
+    CommandTemplate,
+    iter_rows,
+)
+from .expressions import (
+    assert_expression,
+    evaluate,
+)
+from .load import LoadRunner
+from .multipart import (
+    CHUNK_SIZE,
+    MultipartEncoder,
+)
+from .http2 import Http2Session
+from .logs import (
+    log_call,
+    log_failure,
+    logger,
+)
+from .pagination import Paginator
+from .payload import DefaultPayload
+from .plan import (  # noqa: F401 (VERBS is importable from providers)
+    VERBS,
+    FilePath,
+    compile_commands,
+    parse_file_data,
+)
+from .prepared import (
+    PreparedCommands,
+    PreparedRequest,
+    command_key,
+)
+from .profiling import (
+    phase,
+    profile_command,
+)
+from .ratelimit import get_limiter
+from .response import Response
+from .retry import (
+    RetryPolicy,
+    get_breaker,
+)
+from .serializers import (
+    compact_dumps,
+    dumps,
+)
+from .timing import (
+    Timing,
+    TimingAdapter,
+    track,
+)
+
+
+class BlockCookiesPolicy(cookielib.DefaultCookiePolicy):
+    """ Cookie policy that never stores cookies on the
+        long-lived session, so each call keeps starting with
+        a clean cookie jar as it did with one session per call
+    """
+
+    def set_ok(self, cookie, request):
+        return False
+
 
 class RequestsProvider(BaseProvider):
     """ Requests command provider """
 
+    name = 'play_requests'
+    batch_max_workers = 10
+    prepared_max_entries = 256
+    retry_exceptions = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+    )
+
     def __init__(self, engine):
         super(RequestsProvider, self).__init__(engine)
-        self.logger = logging.getLogger()
+        self.logger = logger
+        self._sessions = {}
+        self._static_bodies = {}
+        self._prepared = PreparedCommands(self.prepared_max_entries)
+        self.json_dumps = dumps
+        self.metrics_sinks = []
+        self.default_payload = DefaultPayload(engine, self.name)
+        self.engine.register_teardown_callback(self.close)
+
+    def reset(self):
+        """ Forget the state collected by a test (static bodies and
+            prepared commands) keeping the pooled sessions warm
+        """
+        self._static_bodies.clear()
+        self._prepared.clear()
+
+    def close(self):
+        """ Close all the pooled sessions (engine teardown) """
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        self.reset()
+        for session in sessions:
+            session.close()
+        flush_cassettes()
+
+    def _get_session(self, command):
+        """ Return a keep-alive session for the given command.
+
+            Sessions are created once per distinct ``pool``
+            configuration and reused by all the following calls::
+
+                pool:
+                  connections: 10
+                  maxsize: 20
+                  block: false
+        """
+        pool = command.get('pool') or {}
+        key = tuple(sorted(pool.items()))
+        session = self._sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(BlockCookiesPolicy())
+            adapter = TimingAdapter(
+                pool_connections=pool.get('connections', 10),
+                pool_maxsize=pool.get('maxsize', 10),
+                pool_block=pool.get('block', False))
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._sessions[key] = session
+        return session
+
+    def _get_http2_session(self, command):
+        """ Return a keep-alive HTTP/2 session for commands with the
+            ``http2`` option::
+
+                http2: true
+
+            or::
+
+                http2:
+                  prior_knowledge: true
+                  limit: 100
+
+            ``verify`` and ``cert`` parameters are bound to the
+            HTTP/2 session, so a session is created for each distinct
+            combination
+        """
+        options = command['http2']
+        if not isinstance(options, dict):
+            options = {}
+        parameters = command.get('parameters') or {}
+        verify = parameters.get('verify', True)
+        cert = parameters.get('cert')
+        key = ('http2', tuple(sorted(options.items())),
+               repr(verify), repr(cert))
+        session = self._sessions.get(key)
+        if session is None:
+            session = Http2Session(verify=verify, cert=cert, **options)
+            self._sessions[key] = session
+        return session
+
+    def _get_transport(self, command):
+        """ Return the session performing the command HTTP calls """
+        if command.get('http2'):
+            return self._get_http2_session(command)
+        return self._get_session(command)
 
     def _make_files(self, command):
         """ Update files on the command
@@ -39,72 +208,666 @@ class RequestsProvider(BaseProvider):
             results = {}
             for key, value in files.items():
                 filename = value[0]
-                file_data = value[1]
-                additional_args = value[2:]
-                match = re.search(r'path:([^$]+)', file_data)
-                if match:
-                    file_path = match.group(1)
-                    file_data = open(file_path, 'rb')
-                if additional_args:
-                    results[key] = (filename, file_data, value[2:])
-                else:
-                    results[key] = (filename, file_data)
+                file_data = parse_file_data(value[1])
+                additional_args = tuple(value[2:])
+                if isinstance(file_data, FilePath):
+                    file_data = open(file_data.path, 'rb')
+                results[key] = (filename, file_data) + additional_args
             command['parameters']['files'] = results
+            if command.get('stream_files'):
+                self._make_multipart(command)
+
+    def _make_multipart(self, command):
+        """ Replace files (and form data) with a streaming multipart
+            body, so big files are sent in chunks with bounded memory
+        """
+        parameters = command['parameters']
+        encoder = MultipartEncoder(
+            parameters.pop('data', None),
+            parameters.pop('files'))
+        headers = dict(parameters.get('headers') or {})
+        headers['Content-Type'] = encoder.content_type
+        parameters['headers'] = headers
+        parameters['data'] = encoder
+
+    def _close_files(self, command):
+        """ Close file objects opened by :meth:`_make_files` """
+        parameters = command.get('parameters', {})
+        for value in (parameters.get('files') or {}).values():
+            close = getattr(value[1], 'close', None)
+            if close is not None:
+                close()
+        close = getattr(parameters.get('data'), 'close', None)
+        if close is not None:
+            close()
 
-    def _make_assertion(self, command, **kwargs):
+    def _make_assertion(self, command, log_failures=True, **kwargs):
         """ Make an assertion based on python
             expression against kwargs
         """
         assertion = command.get('assertion', None)
         if assertion:
-            self.engine.execute_command(
-                {'provider': 'python',
-                 'type': 'assert',
-                 'expression': assertion
-                 },
-                **kwargs,
-            )
+            assert_expression(
+                assertion, self.engine.context,
+                log_failures=log_failures, **kwargs)
 
     def _make_variable(self, command, **kwargs):
         """ Make a variable based on python
-            expression against kwargs
+            expression against kwargs, stored in the ``variables``
+            keyword argument if provided (eg: the variables of
+            a load test virtual user) or in the engine variables
         """
         expression = command.get('variable_expression', None)
         if expression:
-            self.engine.execute_command(
-                {'provider': 'python',
-                 'type': 'store_variable',
-                 'name': command['variable'],
-                 'expression': expression
-                 },
-                **kwargs,
-            )
-
-    def _make_request(self, method, command):
-        """ Make a request plus assertions """
+            variables = kwargs.get('variables', self.engine.variables)
+            variables[command['variable']] = evaluate(
+                expression, self.engine.context, **kwargs)
+
+    def _prepare_request(self, command):
+        """ Return a copy of the command ready to be sent.
+
+            With the ``reuse_prepared`` option the prepared command
+            (and the prepared request, see :meth:`_send_request`) is
+            cached by resolved command and reused by all the following
+            identical commands until the engine teardown, so
+            loops and load tests skip the request preparation. Commands
+            changed by variables are prepared again.
+        """
+        key = None
+        if command.get('reuse_prepared'):
+            key = command_key(command)
+            if key is not None:
+                cmd = self._prepared.get(key)
+                if cmd is not None:
+                    return cmd
+        if command.get('compress') and command.get('stream_files'):
+            raise ValueError(
+                'compress can not be combined with stream_files')
+        if command.get('cassette') and command.get('stream'):
+            raise ValueError('cassette can not be combined with stream')
         cmd = command.copy()
-        url = cmd['url']
-
-        self._make_files(cmd)
-        self.logger.debug('Requests call %r', cmd)
-        if 'parameters' not in cmd:
-            cmd['parameters'] = {}
-
-        self.logger.debug('Effective HTTP call %r', cmd)
-        session = requests.Session()
-        response = session.request(
-            method,
-            url,
-            **cmd['parameters'])
+        cmd['parameters'] = dict(cmd.get('parameters') or {})
+        auth = cmd['parameters'].get('auth')
+        if isinstance(auth, list):
+            # YAML lists, requests expects a (username, password) tuple
+            cmd['parameters']['auth'] = tuple(auth)
+        with phase('files'):
+            self._make_files(cmd)
         try:
-            self._make_variable(cmd, response=response)
-            self._make_assertion(cmd, response=response)
+            self._make_body(cmd)
+        except Exception:
+            self._close_files(cmd)
+            raise
+        if key is not None:
+            cmd['prepared_key'] = key
+            self._prepared.set(key, cmd)
+        return cmd
+
+    def _make_body(self, command):
+        """ Serialize (and compress) the request body.
+
+            With the ``static_body`` option the resulting body is
+            computed once and reused by all the following commands
+            with the same ``static_body`` name until the engine
+            teardown::
+
+                static_body: catalog
+        """
+        name = command.get('static_body')
+        parameters = command['parameters']
+        if name:
+            static = self._static_bodies.get(name)
+            if static is not None:
+                data, headers = static
+                parameters.pop('json', None)
+                parameters['data'] = data
+                parameters['headers'] = dict(
+                    parameters.get('headers') or {}, **headers)
+                return
+        headers = parameters.get('headers') or {}
+        self._serialize_json(command)
+        if command.get('compress'):
+            self._compress_body(command)
+        if name and isinstance(parameters.get('data'), bytes):
+            added = dict(
+                (key, value) for key, value in
+                (parameters.get('headers') or {}).items()
+                if headers.get(key) != value)
+            self._static_bodies[name] = (parameters['data'], added)
+
+    def _serialize_json(self, command):
+        """ Serialize the ``json`` request body with
+            ``self.json_dumps`` (the same output of requests by
+            default) or, with the ``compact_json`` option, in compact
+            form with orjson if installed
+        """
+        parameters = command['parameters']
+        if parameters.get('json') is None or \
+                parameters.get('data') is not None or \
+                parameters.get('files'):
+            return
+        json_dumps = command.get('compact_json') and compact_dumps or \
+            self.json_dumps
+        parameters['data'] = json_dumps(parameters.pop('json'))
+        headers = dict(parameters.get('headers') or {})
+        if not any(key.lower() == 'content-type' for key in headers):
+            headers['Content-Type'] = 'application/json'
+        parameters['headers'] = headers
+
+    def _compress_body(self, command):
+        """ Compress the ``data`` (text, bytes or file object, eg:
+            serialized ``json``) request body according to the ``compress``
+            option::
+
+                compress: gzip
+
+            or::
+
+                compress:
+                  encoding: zstd
+                  level: 3
+                  min_size: 1024
+
+            Supported encodings are ``gzip``, ``deflate``, ``br`` and
+            ``zstd``. Bodies smaller than ``min_size`` bytes (default
+            1024) are sent uncompressed. File object bodies are read
+            and closed.
+        """
+        options = command['compress']
+        if not isinstance(options, dict):
+            options = {'encoding': options}
+        encoding = options.get('encoding', 'gzip')
+        parameters = command['parameters']
+        headers = dict(parameters.get('headers') or {})
+        body = parameters.get('data')
+        if not isinstance(body, (bytes, str)) and \
+                not hasattr(body, 'read'):
+            return
+        if isinstance(body, (bytes, str)) and \
+                len(body) < options.get('min_size', MIN_SIZE):
+            return
+        parameters['data'] = compress(
+            body, encoding, level=options.get('level'))
+        close = getattr(body, 'close', None)
+        if close is not None:
+            close()
+        headers['Content-Encoding'] = encoding
+        parameters['headers'] = headers
+
+    def _send_request(self, method, cmd):
+        """ Perform the HTTP call and return the response.
+
+            A :class:`play_requests.timing.Timing` record is
+            available as ``response.timing``.
+
+            GET, HEAD and OPTIONS calls with the ``cache`` option are
+            served by a :class:`play_requests.cache.ResponseCache`.
+
+            With the ``cassette`` option responses are recorded to
+            (or replayed from) a :class:`play_requests.cassette.Cassette`
+            file instead of hitting the network.
+
+            With the ``rate_limit`` option network calls are throttled
+            per host by a :class:`play_requests.ratelimit.HostLimiter`.
+
+            With the ``http2`` option calls are performed by a
+            :class:`play_requests.http2.Http2Session`.
+
+            Commands prepared with the ``reuse_prepared`` option (see
+            :meth:`_prepare_request`) are sent as a
+            :class:`play_requests.prepared.PreparedRequest` built
+            at the first call (uncached HTTP/1.1 calls only).
+
+            With the ``stream`` option the response body is not
+            downloaded, unless ``max_body_bytes`` is provided: in this
+            case the body is spooled to a temporary file (kept in
+            memory up to ``max_body_bytes``) available as
+            ``response.body``
+        """
+        session = self._get_transport(cmd)
+        parameters = cmd['parameters']
+        stream = cmd.get('stream')
+        if stream:
+            parameters = dict(parameters, stream=True)
+        cache = cmd.get('cache')
+        if method not in CACHEABLE_METHODS or stream:
+            cache = None
+
+        prepared = None
+        if cmd.get('prepared_key') and not cache and \
+                isinstance(session, requests.Session):
+            prepared = cmd.get('prepared_request')
+            if prepared is None:
+                prepared = cmd['prepared_request'] = PreparedRequest(
+                    session, method, cmd['url'], parameters)
+
+        def request(parameters):
+            if prepared is not None:
+                return prepared.send(session)
+            return session.request(method, cmd['url'], **parameters)
+
+        limiter = None
+        if cmd.get('rate_limit'):
+            limiter = get_limiter(cmd['url'], cmd['rate_limit'])
+
+        def send(parameters):
+            if limiter is None:
+                return request(parameters)
+            with limiter:
+                # the time spent waiting for the limiter is not
+                # part of the call
+                timing.start = time.perf_counter()
+                return request(parameters)
+
+        cassette = cmd.get('cassette')
+        if cassette:
+            network_send = send
+
+            def send(parameters):
+                return get_cassette(cassette).request(
+                    network_send, session, method, cmd['url'], parameters)
+
+        timing = Timing()
+        try:
+            with track(timing):
+                if cache:
+                    response = get_cache(cache).request(
+                        send, method, cmd['url'], parameters)
+                else:
+                    response = send(parameters)
+                if stream and cmd.get('max_body_bytes'):
+                    response.body = self._spool_body(
+                        response, int(cmd['max_body_bytes']))
+        finally:
+            self._close_files(cmd)
+        self._make_timing(timing, response)
+        self._record_timing(cmd, timing)
+        log_call(self.logger, method, cmd, response)
+        return response
+
+    def _make_timing(self, timing, response):
+        """ Complete the timing record with body sizes and attach
+            it to the response
+        """
+        body = getattr(response.request, 'body', None)
+        if isinstance(body, (bytes, str)):
+            timing.bytes_sent = len(body)
+        tell = getattr(response.raw, 'tell', None)
+        received = tell() if tell is not None else None
+        if not isinstance(received, int) and \
+                getattr(response, '_content_consumed', True):
+            received = len(response.content or b'')
+        timing.bytes_received = received
+        response.timing = timing
+
+    def _record_timing(self, cmd, timing):
+        """ Send the timing record to the metrics sinks.
+
+            Sinks are callables registered on ``metrics_sinks`` and
+            called with the command and the timing record (they might
+            be called by many threads concurrently).
+
+            If the command provides a ``record_timing`` name, timings
+            are recorded with the pytest-play metrics provider too
+            (``<name>_total``, ``<name>_ttfb``, etc)
+        """
+        for sink in self.metrics_sinks:
+            sink(cmd, timing)
+        name = cmd.get('record_timing')
+        if name:
+            metrics = self.engine.get_command_provider('metrics')
+            for key, value in timing.as_dict().items():
+                if value is None or isinstance(value, bool):
+                    continue
+                metric_name = '{0}_{1}'.format(name, key)
+                if key.startswith('bytes_'):
+                    metrics.record_property(metric_name, value)
+                else:
+                    metrics.record_property(
+                        metric_name, value,
+                        metric_type='timing', meas_unit='s')
+
+    def _spool_body(self, response, max_size):
+        """ Download the response body to a temporary file kept in
+            memory up to ``max_size`` bytes
+        """
+        body = tempfile.SpooledTemporaryFile(max_size=max_size)
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            body.write(chunk)
+        body.seek(0)
+        return body
+
+    def _check_response(self, cmd, response, log_failures=True, close=True,
+                        **kwargs):
+        """ Store variables and make assertions against the response,
+            its timing record, the spooled body (if any) and the
+            extra ``kwargs`` (eg: the dataset ``row``).
+
+            Expressions get a :class:`play_requests.response.Response`
+            wrapper, so the JSON body is decoded just once. Failures
+            are logged unless ``log_failures`` is false (eg: load
+            tests count them instead).
+
+            The response is closed afterwards (unless ``close`` is
+            false), releasing the connection of streamed responses
+        """
+        timing = getattr(response, 'timing', None)
+        body = cmd.get('max_body_bytes') and \
+            getattr(response, 'body', None) or None
+        if not isinstance(response, Response):
+            response = Response(response)
+        try:
+            if body is not None:
+                body.seek(0)
+            with phase('variable'):
+                self._make_variable(
+                    cmd, response=response, timing=timing, body=body,
+                    **kwargs)
+            if body is not None:
+                body.seek(0)
+            with phase('assertion'):
+                self._make_assertion(
+                    cmd, log_failures=log_failures, response=response,
+                    timing=timing, body=body, **kwargs)
         except Exception as e:
-            self.logger.exception(
-                'Exception for command %r',
-                cmd,
-                e)
+            if log_failures:
+                log_failure(self.logger, cmd)
             raise e
+        finally:
+            if body is not None:
+                body.close()
+            if close:
+                response.close()
+
+    def _retry_setup(self, command):
+        """ Return the retry policy and the circuit breaker (if any)
+            of a command
+        """
+        policy = breaker = None
+        if command.get('retry'):
+            policy = RetryPolicy.from_options(
+                command['retry'], exceptions=self.retry_exceptions)
+        if command.get('circuit_breaker'):
+            breaker = get_breaker(
+                command['url'], command['circuit_breaker'])
+        return policy, breaker
+
+    def _before_call(self, breaker, cmd):
+        """ Check the circuit breaker releasing the prepared command
+            files if the call is not allowed
+        """
+        try:
+            breaker.before_call()
+        except Exception:
+            self._close_files(cmd)
+            raise
+
+    def _retry_delay(self, policy, breaker, method, command, attempt,
+                     response=None, exception=None):
+        """ Record the outcome of an attempt returning the seconds to
+            wait before the next one, None if the outcome is final
+        """
+        if breaker:
+            breaker.record(response=response, exception=exception)
+        delay = policy and policy.delay(
+            method, attempt, response=response, exception=exception)
+        if delay is None:
+            return None
+        if exception is not None:
+            self.logger.warning(
+                'Retrying %s %s in %.2fs (attempt %d failed: %r)',
+                method, command['url'], delay, attempt, exception)
+        else:
+            self.logger.warning(
+                'Retrying %s %s in %.2fs (attempt %d status %d)',
+                method, command['url'], delay, attempt,
+                response.status_code)
+            response.close()
+        return delay
+
+    def _send_command(self, method, command):
+        """ Prepare and send a command returning the prepared command
+            and the response.
+
+            Failed calls are retried according to the ``retry``
+            option (see :class:`play_requests.retry.RetryPolicy`)
+            and with the ``circuit_breaker`` option calls to a
+            failing host fail fast (see
+            :class:`play_requests.retry.CircuitBreaker`).
+
+            ``batch``, ``load`` and concurrent ``dataset`` workers
+            send commands through this method too
+        """
+        policy, breaker = self._retry_setup(command)
+        attempt = 0
+        while True:
+            attempt += 1
+            # preparation errors (eg: missing files) are not host
+            # failures, so commands are prepared before taking the
+            # circuit breaker trial call
+            with phase('prepare'):
+                cmd = self._prepare_request(command)
+            if breaker:
+                self._before_call(breaker, cmd)
+            try:
+                with phase('network'):
+                    response = self._send_request(method, cmd)
+            except Exception as e:
+                delay = self._retry_delay(
+                    policy, breaker, method, command, attempt, exception=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(
+                    policy, breaker, method, command, attempt,
+                    response=response)
+                if delay is None:
+                    return cmd, response
+            with phase('retry'):
+                time.sleep(delay)
+
+    def _make_request(self, method, command, **kwargs):
+        """ Make a request plus assertions.
+
+            With the ``profile`` option the time spent in each phase
+            is collected by a :class:`play_requests.profiling.Profiler`,
+            with the ``dataset`` option the command is repeated for
+            each dataset row (see :meth:`_make_dataset_requests`) and
+            with the ``paginate`` option all the pages of a collection
+            are fetched (see :meth:`_make_paginated_requests`)
+        """
+        if command.get('dataset'):
+            self._make_dataset_requests(method, command)
+            return
+        if command.get('paginate'):
+            self._make_paginated_requests(method, command)
+            return
+        with profile_command(command):
+            cmd, response = self._send_command(method, command)
+            self._check_response(cmd, response, **kwargs)
+
+    def _make_dataset_requests(self, method, command):
+        """ Repeat a command for each row of a CSV or JSON lines
+            dataset.
+
+            ``$field`` placeholders in the ``url`` and ``parameters``
+            are replaced with the row values and the row is available
+            to expressions as ``row``::
+
+                - provider: play_requests
+                  type: POST
+                  url: http://something/users/$id
+                  dataset:
+                    path: $base_path/users.csv
+                    concurrency: 10
+                  parameters:
+                    json:
+                      name: $name
+                  assertion: response.status_code == 200
+
+            Rows are read lazily, so big datasets are never loaded in
+            memory. With ``concurrency`` rows are sent in windows of
+            ``window`` rows (default ``concurrency * 10``) over a
+            bounded thread pool, then checked in the dataset order.
+            ``limit`` stops after the given number of rows.
+
+            With the ``profile`` option each row is profiled, unless
+            rows are sent concurrently (not supported).
+        """
+        options = command['dataset']
+        if not isinstance(options, dict):
+            options = {'path': options}
+        concurrency = int(options.get('concurrency', 1))
+        if concurrency > 1 and command.get('profile'):
+            raise ValueError(
+                'profile can not be combined with a concurrent dataset')
+        template = CommandTemplate(dict(
+            (key, value) for key, value in command.items()
+            if key != 'dataset'))
+        rows = iter_rows(
+            options['path'], format=options.get('format'),
+            delimiter=options.get('delimiter'),
+            limit=options.get('limit'))
+        if concurrency <= 1:
+            for row in rows:
+                self._make_request(method, template.render(row), row=row)
+            return
+        window = int(options.get('window', concurrency * 10))
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= window:
+                self._send_rows(method, template, chunk, concurrency)
+                chunk = []
+        if chunk:
+            self._send_rows(method, template, chunk, concurrency)
+
+    def _send_rows(self, method, template, rows, concurrency):
+        """ Send a window of dataset rows concurrently and check
+            the responses in order
+        """
+        commands = []
+        for row in rows:
+            command = template.render(row)
+            # sessions are created in the main thread and then shared
+            self._get_transport(command)
+            commands.append((method, command))
+        results = self._send_batch(commands, concurrency)
+        for row, (cmd, response) in zip(rows, results):
+            self._check_response(cmd, response, row=row)
+
+    def _make_paginated_requests(self, method, command):
+        """ Fetch all the pages of a collection following the
+            pagination strategy of the ``paginate`` option (see
+            :class:`play_requests.pagination.Paginator`)::
+
+                - provider: play_requests
+                  type: GET
+                  url: http://something/items
+                  paginate:
+                    type: cursor
+                    cursor: response.json()['next_cursor']
+                    param: cursor
+                  variable: ids
+                  variable_expression: >-
+                    [item['id'] for item in response.json()['items']]
+                  assertion: response.status_code == 200
+
+            The assertion is evaluated against each page (available
+            to expressions as ``page``, starting from 0) and the
+            variable expression results are accumulated in a list
+            (list results are concatenated) as pages arrive, so
+            pages are released as soon as they are checked. Streamed
+            pages are closed once the next page is known.
+
+            With the ``profile`` option each page is profiled.
+        """
+        paginator = Paginator.from_options(command['paginate'])
+        variable = command.get('variable')
+        expression = command.get('variable_expression')
+        page_command = paginator.first(dict(
+            (key, value) for key, value in command.items()
+            if key not in ('paginate', 'variable', 'variable_expression')))
+        results = []
+        page = 0
+        while page_command is not None:
+            with profile_command(page_command):
+                cmd, response = self._send_command(method, page_command)
+                response = Response(response)
+                try:
+                    self._check_response(
+                        cmd, response, close=False, page=page)
+                    if expression:
+                        with phase('variable'):
+                            value = evaluate(
+                                expression, self.engine.context,
+                                response=response, page=page)
+                        if isinstance(value, (list, tuple)):
+                            results.extend(value)
+                        else:
+                            results.append(value)
+                    page_command = paginator.next(
+                        page_command, response, page, self.engine.context)
+                finally:
+                    response.close()
+            page += 1
+        if variable and expression:
+            self.engine.variables[variable] = results
+
+    def _merge_sub_commands(self, sub_commands):
+        """ Apply the default payload to sub commands, they are
+            validated by :func:`play_requests.plan.compile_commands`
+        """
+        return [
+            self.default_payload.merge(
+                dict(sub_command, provider=self.name))
+            for sub_command in sub_commands]
+
+    def command_batch(self, command, **kwargs):
+        """ Perform many independent requests concurrently.
+
+            HTTP calls are dispatched over a bounded thread pool
+            sharing the provider connection pool, then variables and
+            assertions are evaluated in the same order of
+            ``sub_commands`` once all the responses are available::
+
+                - provider: play_requests
+                  type: batch
+                  max_workers: 10
+                  sub_commands:
+                  - type: GET
+                    url: http://something/1
+                    assertion: response.status_code == 200
+                  - type: GET
+                    url: http://something/2
+        """
+        plans = compile_commands(self._merge_sub_commands(
+            command.get('sub_commands', [])))
+        max_workers = int(
+            command.get('max_workers', self.batch_max_workers))
+        commands = []
+        for plan in plans:
+            # sessions are created in the main thread and then shared
+            self._get_transport(plan.command)
+            commands.append((plan.method, plan.command))
+
+        if not commands:
+            return
+        for cmd, response in self._send_batch(commands, max_workers):
+            self._check_response(cmd, response)
+
+    def _send_batch(self, commands, max_workers):
+        """ Send commands concurrently (see :meth:`_send_command`)
+            yielding the prepared commands and the responses in the
+            same order
+        """
+        with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(commands))) as executor:
+            futures = [
+                executor.submit(self._send_command, method, command)
+                for method, command in commands]
+            for future in futures:
+                yield future.result()
 
     def command_OPTIONS(self, command, **kwargs):
         """ OPTIONS command """
@@ -133,3 +896,61 @@ class RequestsProvider(BaseProvider):
     def command_DELETE(self, command, **kwargs):
         """ DELETE command """
         self._make_request('DELETE', command)
+
+    def command_load(self, command, **kwargs):
+        """ Replay HTTP calls as a load or soak test.
+
+            ``sub_commands`` (or the play_requests commands contained
+            in the pytest-play YAML file ``script``) are executed in
+            order by ``concurrency`` workers for ``duration`` seconds
+            or ``iterations`` times per worker, optionally at a
+            target rate of ``rps`` requests per second::
+
+                - provider: play_requests
+                  type: load
+                  duration: 60
+                  concurrency: 10
+                  rps: 100
+                  script: $base_path/test_catalog.yml
+                  variable: report
+                  variable_expression: report
+                  assertion: report['total']['p95'] < 0.5
+
+            Each worker has its own copy of the variables, updated
+            by the ``variable`` of its commands and used to resolve
+            the placeholders of the following ones.
+            Failed calls and assertions are counted as errors.
+            A report with count, errors, throughput, min/mean/max and
+            p50/p95/p99 latencies, per command and in total, is
+            available as ``report`` for variable expressions and
+            assertions.
+        """
+        sub_commands = command.get('sub_commands', [])
+        script = command.get('script')
+        if script:
+            data = self.engine.get_file_contents(script)
+            sub_commands = [
+                sub_command for sub_command in
+                list(yaml.safe_load_all(
+                    self.engine.parametrize(data)))[-1]
+                if sub_command.get('provider', self.name) == self.name]
+        # sub commands are validated and compiled once, before
+        # any network call
+        plans = compile_commands(self._merge_sub_commands(sub_commands))
+        for plan in plans:
+            # sessions are created in the main thread and then shared
+            self._get_transport(plan.command)
+        duration = command.get('duration')
+        iterations = command.get('iterations')
+        rps = command.get('rps')
+        runner = LoadRunner(
+            self,
+            plans,
+            duration=duration and float(duration),
+            iterations=iterations and int(iterations),
+            concurrency=int(command.get('concurrency', 1)),
+            rps=rps and float(rps))
+        report = runner.run()
+        self.logger.info('Load report %r', report)
+        self._make_variable(command, report=report)
+        self._make_assertion(command, report=report)
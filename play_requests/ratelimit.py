@@ -0,0 +1,220 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+
+from requests.compat import urlparse
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+BUCKET_STATE = struct.Struct('>dd')
+
+
+def _require_fcntl():
+    if fcntl is None:  # pragma: no cover
+        raise ImportError(
+            'Shared rate limits require fcntl (POSIX platforms only)')
+
+
+class TokenBucket(object):
+    """ Thread safe token bucket: ``rate`` tokens per second up to
+        ``burst`` tokens
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """ Take a token returning 0 or the seconds to wait
+            for the next one
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """ Block until a token is available """
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """ Token bucket shared by many processes on the same machine
+        (eg: pytest-xdist workers), its state lives in the file
+        ``path`` protected by an exclusive lock.
+
+        Wall clock time is used since monotonic clocks are not
+        comparable across processes.
+    """
+
+    def __init__(self, path, rate, burst=None):
+        _require_fcntl()
+        super(FileTokenBucket, self).__init__(rate, burst)
+        self.path = path
+
+    def _take(self):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                now = time.time()
+                data = os.read(fd, BUCKET_STATE.size)
+                if len(data) == BUCKET_STATE.size:
+                    tokens, updated = BUCKET_STATE.unpack(data)
+                    tokens = min(
+                        self.burst,
+                        tokens + max(0, now - updated) * self.rate)
+                else:
+                    tokens = self.burst
+                wait = 0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, BUCKET_STATE.pack(tokens, now))
+                return wait
+            finally:
+                os.close(fd)
+
+
+class FileSemaphore(object):
+    """ Semaphore shared by many processes on the same machine made
+        of ``size`` slot files locked while in use.
+
+        Locks are released by the operating system if a process
+        dies, so slots are never leaked.
+    """
+
+    poll_interval = 0.005
+
+    def __init__(self, path, size):
+        _require_fcntl()
+        self.paths = ['{0}.{1}'.format(path, slot) for slot in range(size)]
+        self._local = threading.local()
+
+    def acquire(self):
+        while True:
+            for path in self.paths:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError):
+                    os.close(fd)
+                    continue
+                self._local.__dict__.setdefault('fds', []).append(fd)
+                return
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        fd = self._local.fds.pop()
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class HostLimiter(object):
+    """ Client side limits of a host::
+
+            with limiter:
+                response = session.request(...)
+
+        Calls are delayed to stay under ``rate`` requests per second
+        (with bursts of at most ``burst`` requests) and at most
+        ``max_in_flight`` calls are performed concurrently.
+
+        With a ``shared`` directory limits are shared by all the
+        processes using the same directory.
+    """
+
+    def __init__(self, host, rate=None, burst=None, max_in_flight=None,
+                 shared=None):
+        self.host = host
+        self.bucket = None
+        self.semaphore = None
+        prefix = None
+        if shared:
+            if not os.path.isdir(shared):
+                os.makedirs(shared, exist_ok=True)
+            prefix = os.path.join(
+                shared, hashlib.sha1(host.encode('utf-8')).hexdigest())
+        if rate:
+            if prefix:
+                self.bucket = FileTokenBucket(
+                    prefix + '.bucket', rate, burst)
+            else:
+                self.bucket = TokenBucket(rate, burst)
+        if max_in_flight:
+            if prefix:
+                self.semaphore = FileSemaphore(
+                    prefix + '.slot', int(max_in_flight))
+            else:
+                self.semaphore = threading.BoundedSemaphore(
+                    int(max_in_flight))
+
+    def __enter__(self):
+        if self.semaphore is not None:
+            self.semaphore.acquire()
+        if self.bucket is not None:
+            try:
+                self.bucket.acquire()
+            except BaseException:
+                self.semaphore is not None and self.semaphore.release()
+                raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url, options):
+    """ Return the process wide limiter of the url host::
+
+            rate_limit:
+              rate: 10
+              burst: 20
+              max_in_flight: 4
+              shared: /tmp/play_requests_limits
+
+        ``rate_limit: 10`` is a shortcut for ``rate: 10``.
+    """
+    if not isinstance(options, dict):
+        options = {'rate': options}
+    parsed = urlparse(url)
+    host = '{0}://{1}'.format(parsed.scheme, parsed.netloc)
+    key = (host, repr(sorted(options.items())))
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = HostLimiter(host, **options)
+            _limiters[key] = limiter
+        return limiter
+
+
+def clear_limiters():
+    """ Forget all the process wide limiters """
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,56 @@
+from .profiling import phase
+from .serializers import loads
+
+
+_marker = object()
+
+
+class Response(object):
+    """ A requests response wrapper used by expressions.
+
+        The parsed JSON body is decoded lazily at the first
+        ``json()`` call and then shared by all the following calls
+        (variable expressions and assertions), everything else is
+        delegated to the wrapped response.
+    """
+
+    def __init__(self, response):
+        self.__dict__['_response'] = response
+        self.__dict__['_json'] = _marker
+
+    def json(self, **kwargs):
+        """ Return the parsed JSON body (memoized) """
+        if kwargs:
+            return self._response.json(**kwargs)
+        if self._json is _marker:
+            with phase('json_decode'):
+                self.__dict__['_json'] = self._decode()
+        return self._json
+
+    def _decode(self):
+        response = self._response
+        encoding = (response.encoding or 'utf-8').lower()
+        if encoding in ('utf-8', 'utf8'):
+            try:
+                return loads(response.content)
+            except ValueError:
+                pass
+        # let requests guess the encoding or raise its own error
+        return response.json()
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._response, name, value)
+
+    def __bool__(self):
+        return bool(self._response)
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        return iter(self._response)
+
+    def __repr__(self):
+        return repr(self._response)
@@ -0,0 +1,217 @@
+import importlib
+import logging
+import random
+import threading
+import time
+from email.utils import (
+    parsedate_tz,
+    mktime_tz,
+)
+
+from requests.compat import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = (429, 502, 503, 504)
+FAILURE_STATUS = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ('OPTIONS', 'HEAD', 'GET', 'PUT', 'DELETE')
+
+
+class CircuitOpenError(RuntimeError):
+    """ The circuit breaker of the host is open """
+
+
+def _import(name):
+    """ Return the object named by a dotted path """
+    module_name, sep, attribute = name.rpartition('.')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def parse_retry_after(value):
+    """ Seconds to wait according to a Retry-After header (delay
+        seconds or HTTP date), None if not available
+
+        >>> parse_retry_after('2')
+        2.0
+        >>> parse_retry_after(None) is None
+        True
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, mktime_tz(parsed) - time.time())
+
+
+class RetryPolicy(object):
+    """ Retry policy of a command::
+
+            retry:
+              max_attempts: 3
+              status: [429, 502, 503, 504]
+              exceptions:
+              - requests.exceptions.ConnectionError
+              methods: [GET, PUT, DELETE]
+              backoff: 0.5
+              max_backoff: 30
+              jitter: true
+              retry_after: true
+
+        Failed attempts are retried after an exponential backoff
+        (``backoff * 2 ** (attempt - 1)`` capped at ``max_backoff``,
+        randomized between 0 and that value with ``jitter``). The
+        ``Retry-After`` response header wins over the backoff if
+        longer, but never beyond ``max_backoff``.
+
+        ``retry: 3`` is a shortcut for ``max_attempts: 3``.
+    """
+
+    def __init__(self, max_attempts=3, status=RETRY_STATUS,
+                 exceptions=(), methods=IDEMPOTENT_METHODS,
+                 backoff=0.5, max_backoff=30, jitter=True,
+                 retry_after=True):
+        self.max_attempts = int(max_attempts)
+        self.status = frozenset(int(code) for code in status)
+        self.exceptions = tuple(
+            _import(item) if isinstance(item, str) else item
+            for item in exceptions)
+        self.methods = frozenset(method.upper() for method in methods)
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.jitter = jitter
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_options(cls, options, exceptions=()):
+        """ Build a policy from the ``retry`` command option,
+            ``exceptions`` are retried by default
+        """
+        if not isinstance(options, dict):
+            options = {'max_attempts': options}
+        options = dict(options)
+        options.setdefault('exceptions', exceptions)
+        return cls(**options)
+
+    def _backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def delay(self, method, attempt, response=None, exception=None):
+        """ Seconds to wait before the next attempt, None if the
+            failure must not be retried
+        """
+        if attempt >= self.max_attempts or method not in self.methods:
+            return None
+        if exception is not None:
+            if not isinstance(exception, self.exceptions):
+                return None
+            return self._backoff(attempt)
+        if response.status_code not in self.status:
+            return None
+        delay = self._backoff(attempt)
+        if self.retry_after:
+            retry_after = parse_retry_after(
+                response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = min(self.max_backoff, max(delay, retry_after))
+        return delay
+
+
+class CircuitBreaker(object):
+    """ Per host circuit breaker.
+
+        After ``failure_threshold`` consecutive failures (exceptions
+        or responses with a ``status`` code) the circuit opens and
+        calls fail immediately with :class:`CircuitOpenError` for
+        ``reset_timeout`` seconds. Then a single trial call is let
+        through: if it succeeds the circuit closes again, otherwise
+        it opens for another ``reset_timeout`` seconds.
+    """
+
+    def __init__(self, host, failure_threshold=5, reset_timeout=30,
+                 status=FAILURE_STATUS):
+        self.host = host
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self.status = frozenset(int(code) for code in status)
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        """ Raise :class:`CircuitOpenError` if calls are not allowed """
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return
+            raise CircuitOpenError('Circuit open', self.host)
+
+    def record(self, response=None, exception=None):
+        """ Record the outcome of a call """
+        failed = exception is not None or \
+            response.status_code in self.status
+        with self._lock:
+            self._trial = False
+            if not failed:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or \
+                    self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning('Circuit open for %s', self.host)
+                self.opened_at = time.time()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url, options):
+    """ Return the process wide circuit breaker of the url host::
+
+            circuit_breaker:
+              failure_threshold: 5
+              reset_timeout: 30
+              status: [429, 500, 502, 503, 504]
+
+        ``circuit_breaker: true`` enables the default settings.
+    """
+    if not isinstance(options, dict):
+        options = {}
+    parsed = urlparse(url)
+    host = '{0}://{1}'.format(parsed.scheme, parsed.netloc)
+    key = (host, repr(sorted(options.items())))
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(host, **options)
+            _breakers[key] = breaker
+        return breaker
+
+
+def clear_breakers():
+    """ Forget all the process wide circuit breakers """
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,47 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def loads(data):
+    """ Decode a JSON document (bytes or text) using the fastest
+        available backend (orjson if installed, json otherwise)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def dumps(value):
+    """ Encode a JSON document to bytes exactly like requests does
+        for ``json`` bodies, so the payload sent on the wire does not
+        change::
+
+            >>> dumps({'a': [1, 2]})
+            b'{"a": [1, 2]}'
+    """
+    return json.dumps(value, allow_nan=False).encode('utf-8')
+
+
+def compact_dumps(value):
+    """ Encode a JSON document to bytes using the fastest available
+        backend (orjson if installed, json otherwise).
+
+        The output is compact (no whitespace)::
+
+            >>> compact_dumps({'a': [1, 2]})
+            b'{"a":[1,2]}'
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # eg: integers exceeding 64 bits
+            pass
+    return json.dumps(
+        value, allow_nan=False, separators=(',', ':')).encode('utf-8')
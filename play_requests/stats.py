@@ -0,0 +1,162 @@
+import math
+import threading
+import time
+
+
+class Histogram(object):
+    """ Log-bucket latency histogram with bounded memory.
+
+        Values are counted in buckets growing by ``precision``
+        (default 1%), so percentiles are approximated within that
+        relative error whatever the number of recorded values, while
+        ``count``, ``min``, ``max`` and ``mean`` are exact. Values up
+        to ``lowest`` (default 1 microsecond) share the first bucket.
+
+        >>> histogram = Histogram()
+        >>> for value in range(1, 101):
+        ...     histogram.add(value)
+        >>> histogram.count, histogram.min, histogram.max
+        (100, 1, 100)
+        >>> round(histogram.percentile(95))
+        95
+    """
+
+    def __init__(self, precision=0.01, lowest=1e-06):
+        self.lowest = lowest
+        self._base = math.log(1 + precision)
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value <= self.lowest:
+            return 0
+        return int(math.log(value / self.lowest) / self._base) + 1
+
+    def _value(self, index):
+        """ Geometric middle of the bucket """
+        if index == 0:
+            return self.lowest
+        return self.lowest * math.exp((index - 0.5) * self._base)
+
+    def add(self, value):
+        index = self._index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def update(self, other):
+        """ Add the values of another histogram with the
+            same precision
+        """
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else \
+                    min(self.min, value)
+                self.max = value if self.max is None else \
+                    max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent):
+        """ Nearest-rank percentile, eg: the value greater than or
+            equal to 95% of the values for ``percent=95``
+        """
+        if not self.count:
+            return None
+        rank = max(int(math.ceil(percent / 100.0 * self.count)), 1)
+        if rank == 1:
+            return self.min
+        if rank == self.count:
+            return self.max
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+
+
+class LatencyStats(object):
+    """ Thread safe latency and error collector grouped by label,
+        latencies are kept in a :class:`Histogram` for each label
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._errors = {}
+        self._labels = []
+        self.start_time = None
+        self.end_time = None
+
+    def start(self):
+        """ Start tracking time """
+        self.start_time = time.time()
+
+    def stop(self):
+        """ Stop tracking time """
+        self.end_time = time.time()
+
+    def add(self, label, elapsed, error=False):
+        """ Record a call for the given label """
+        with self._lock:
+            if label not in self._latencies:
+                self._labels.append(label)
+                self._latencies[label] = Histogram()
+                self._errors[label] = 0
+            self._latencies[label].add(elapsed)
+            if error:
+                self._errors[label] += 1
+
+    def _summary(self, latencies, errors, duration):
+        count = latencies.count
+        return {
+            'count': count,
+            'errors': errors,
+            'throughput': duration and count / duration or 0.0,
+            'min': latencies.min,
+            'max': latencies.max,
+            'mean': latencies.mean,
+            'p50': latencies.percentile(50),
+            'p95': latencies.percentile(95),
+            'p99': latencies.percentile(99),
+        }
+
+    def report(self):
+        """ Return a report with a summary for each label
+            and an overall ``total`` summary::
+
+                {'duration': 10.0,
+                 'total': {'count': 1000, 'errors': 0,
+                           'throughput': 100.0,
+                           'min': 0.01, 'max': 0.2, 'mean': 0.05,
+                           'p50': 0.04, 'p95': 0.1, 'p99': 0.15},
+                 'commands': {'GET http://something/1': {...}}}
+        """
+        with self._lock:
+            end_time = self.end_time or time.time()
+            duration = end_time - (self.start_time or end_time)
+            commands = {}
+            total = Histogram()
+            for label in self._labels:
+                commands[label] = self._summary(
+                    self._latencies[label], self._errors[label], duration)
+                total.update(self._latencies[label])
+            return {
+                'duration': duration,
+                'total': self._summary(
+                    total, sum(self._errors.values()), duration),
+                'commands': commands,
+            }
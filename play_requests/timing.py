@@ -0,0 +1,144 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import (
+    HTTPConnection,
+    HTTPSConnection,
+)
+from urllib3.connectionpool import (
+    HTTPConnectionPool,
+    HTTPSConnectionPool,
+)
+
+
+_local = threading.local()
+
+
+class Timing(object):
+    """ Timing record of a single HTTP call.
+
+        All the times are expressed in seconds:
+
+        * ``dns``, name resolution (when available)
+        * ``connect``, TCP connection (including name resolution
+          if ``dns`` is not available)
+        * ``tls``, TLS handshake
+        * ``ttfb``, time to first byte, from the start of the
+          call until the response headers are received
+        * ``total``, the whole call including the response body
+
+        ``bytes_sent`` and ``bytes_received`` are the request and
+        response body sizes (as seen on the wire) and ``reused`` tells
+        if an already established connection was used.
+
+        Phases not happened or not measurable are ``None``.
+    """
+
+    __slots__ = ('start', 'dns', 'connect', 'tls', 'ttfb', 'total',
+                 'bytes_sent', 'bytes_received', 'reused')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.dns = None
+        self.connect = None
+        self.tls = None
+        self.ttfb = None
+        self.total = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.reused = None
+
+    def as_dict(self):
+        """ Return the timing record as a dictionary """
+        return dict(
+            (name, getattr(self, name)) for name in self.__slots__
+            if name != 'start')
+
+    def __repr__(self):
+        return '<Timing {0!r}>'.format(self.as_dict())
+
+
+def current_timing():
+    """ Return the timing record of the call in progress
+        in the current thread, if any
+    """
+    return getattr(_local, 'timing', None)
+
+
+@contextmanager
+def track(timing):
+    """ Track connection events of the current thread into
+        ``timing``
+    """
+    _local.timing = timing
+    try:
+        yield timing
+    finally:
+        _local.timing = None
+        timing.total = time.perf_counter() - timing.start
+        if timing.connect is None and timing.ttfb is not None:
+            timing.reused = True
+        elif timing.connect is not None:
+            timing.reused = False
+
+
+class TimedConnectionMixin(object):
+    """ Record connect, TLS and time to first byte on the
+        timing record of the current thread
+    """
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super(TimedConnectionMixin, self)._new_conn()
+        timing = current_timing()
+        if timing is not None:
+            timing.connect = time.perf_counter() - start
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super(TimedConnectionMixin, self).connect()
+        timing = current_timing()
+        if timing is not None and timing.connect is not None and \
+                isinstance(self, HTTPSConnection):
+            elapsed = time.perf_counter() - start
+            timing.tls = max(elapsed - timing.connect, 0)
+
+    def getresponse(self, *args, **kwargs):
+        response = super(TimedConnectionMixin, self).getresponse(
+            *args, **kwargs)
+        timing = current_timing()
+        if timing is not None:
+            timing.ttfb = time.perf_counter() - timing.start
+        return response
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """ HTTP adapter with connections reporting timings, see
+        :func:`track`
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimingAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
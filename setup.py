@@ -14,6 +14,7 @@ with open('CHANGES.rst') as history_file:
 requirements = [
     'requests',
     'pytest-play>=2.0.0',
+    'RestrictedPython',
 ]
 
 setup_requirements = [
@@ -27,6 +28,27 @@ test_requirements = [
     'pytest-cov',
 ]
 
+aio_requirements = [
+    'aiohttp',
+]
+
+http2_requirements = [
+    'httpx[http2]',
+]
+
+compression_requirements = [
+    'brotli',
+    'zstandard',
+]
+
+fast_requirements = [
+    'orjson',
+]
+
+benchmark_requirements = test_requirements + [
+    'pytest-benchmark',
+]
+
 setup(
     name='play_requests',
     version='0.0.6.dev0',
@@ -40,6 +62,10 @@ setup(
     entry_points={
         'playcommands': [
             'play_requests = play_requests.providers:RequestsProvider',
+            'play_requests_async = play_requests.aio:AsyncRequestsProvider',
+        ],
+        'console_scripts': [
+            'play_requests_run = play_requests.executor:main',
         ],
     },
     include_package_data=True,
@@ -65,5 +91,10 @@ setup(
     setup_requires=setup_requirements,
     extras_require={
         'tests': test_requirements,
+        'aio': aio_requirements,
+        'http2': http2_requirements,
+        'compression': compression_requirements,
+        'fast': fast_requirements,
+        'benchmarks': benchmark_requirements,
     },
 )
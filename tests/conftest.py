@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""Shared fixtures for `play_requests` tests."""
+
+import json
+import threading
+import pytest
+
+try:
+    from http.server import (
+        BaseHTTPRequestHandler,
+        HTTPServer,
+    )
+    from socketserver import ThreadingMixIn
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import (
+        BaseHTTPRequestHandler,
+        HTTPServer,
+    )
+    from SocketServer import ThreadingMixIn
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """ Reply with a JSON document describing the received request """
+
+    protocol_version = 'HTTP/1.1'
+
+    def _echo(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        payload = json.dumps({
+            'method': self.command,
+            'path': self.path,
+            'headers': dict(self.headers.items()),
+            'body': body.decode('utf-8', 'replace'),
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    do_OPTIONS = do_HEAD = do_GET = do_POST = _echo
+    do_PUT = do_PATCH = do_DELETE = _echo
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def http_server():
+    """ A local echo HTTP server, returns its base url """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{0}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='session')
+def variables():
+    return {'skins': {'skin1': {'base_url': 'http://', 'credentials': {}}}}
+
+
+@pytest.fixture
+def provider(play):
+    """ A play_requests provider closed at the end of the test """
+    from play_requests import providers
+    play.variables = {}
+    provider = providers.RequestsProvider(play)
+    yield provider
+    provider.close()
+
+
+def _reset_registries():
+    from play_requests import (
+        cache,
+        cassette,
+        profiling,
+        ratelimit,
+        retry,
+    )
+    cache.clear_caches()
+    cassette.close_cassettes()
+    profiling.clear_profilers()
+    ratelimit.clear_limiters()
+    retry.clear_breakers()
+
+
+@pytest.fixture(autouse=True)
+def reset_registries():
+    """ Forget the process wide caches, cassettes, profilers, rate
+        limiters and circuit breakers before and after each test
+    """
+    _reset_registries()
+    yield
+    _reset_registries()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.aio` module."""
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+
+@pytest.fixture
+def provider(play):
+    from play_requests import aio
+    play.variables = {}
+    provider = aio.AsyncRequestsProvider(play)
+    yield provider
+    provider.close()
+
+
+def test_get(provider, http_server):
+    provider.command_GET({
+        'provider': 'play_requests_async',
+        'type': 'GET',
+        'url': '{0}/1'.format(http_server),
+        'variable': 'myvar',
+        'variable_expression': 'response.json()',
+        'assertion': 'response.status_code == 200',
+        'parameters': {
+            'params': {'foo': ['bar', 'baz']},
+            'headers': {'user-agent': 'my-app/0.0.1'},
+            'timeout': 2.5,
+        },
+    })
+    myvar = provider.engine.variables['myvar']
+    assert myvar['method'] == 'GET'
+    assert myvar['path'] == '/1?foo=bar&foo=baz'
+    assert 'my-app/0.0.1' in myvar['headers'].values()
+
+
+def test_post_json(provider, http_server):
+    provider.command_POST({
+        'provider': 'play_requests_async',
+        'type': 'POST',
+        'url': '{0}/1'.format(http_server),
+        'variable': 'myvar',
+        'variable_expression': 'loads(response.json()["body"])',
+        'assertion': 'variables["myvar"] == {"foo": "bar"}',
+        'parameters': {
+            'json': {'foo': 'bar'},
+        },
+    })
+
+
+def test_post_files(provider, http_server):
+    provider.command_POST({
+        'provider': 'play_requests_async',
+        'type': 'POST',
+        'url': '{0}/1'.format(http_server),
+        'assertion': '"some,data" in response.json()["body"]',
+        'parameters': {
+            'files': {
+                'filecsv': ('report.csv', 'some,data', 'text/csv'),
+            },
+        },
+    })
+
+
+def test_assertion_ko(provider, http_server):
+    with pytest.raises(AssertionError):
+        provider.command_GET({
+            'provider': 'play_requests_async',
+            'type': 'GET',
+            'url': '{0}/1'.format(http_server),
+            'assertion': 'response.status_code == 404',
+        })
+
+
+def test_batch(provider, http_server):
+    provider.command_batch({
+        'provider': 'play_requests_async',
+        'type': 'batch',
+        'sub_commands': [
+            {'type': 'GET',
+             'url': '{0}/{1}'.format(http_server, index),
+             'variable': 'last',
+             'variable_expression': 'response.json()["path"]',
+             'assertion': 'variables["last"] == "/{0}"'.format(index)}
+            for index in range(20)],
+    })
+    assert provider.engine.variables['last'] == '/19'
+    assert len(provider._sessions) == 1
+
+
+def test_batch_retry(provider, http_server):
+    import aiohttp
+    fetch = provider._fetch
+    calls = []
+
+    async def flaky_fetch(method, cmd):
+        calls.append(cmd['url'])
+        if len(calls) == 1:
+            raise aiohttp.ClientConnectionError()
+        return await fetch(method, cmd)
+    provider._fetch = flaky_fetch
+    provider.command_batch({
+        'provider': 'play_requests_async',
+        'type': 'batch',
+        'sub_commands': [
+            {'type': 'GET',
+             'url': '{0}/1'.format(http_server),
+             'retry': {'max_attempts': 2, 'backoff': 0},
+             'assertion': 'response.status_code == 200'}],
+    })
+    assert len(calls) == 2
+
+
+def test_not_supported_parameter(provider):
+    with pytest.raises(ValueError):
+        provider._make_parameters({'proxies': {}})
+
+
+@pytest.mark.parametrize('option', [
+    'cache', 'cassette', 'http2', 'rate_limit', 'reuse_prepared'])
+def test_not_supported_option(provider, http_server, option):
+    command = {
+        'type': 'GET',
+        'url': '{0}/1'.format(http_server),
+        option: True,
+    }
+    with pytest.raises(ValueError) as excinfo:
+        provider.command_GET(dict(command, provider='play_requests_async'))
+    assert option in str(excinfo.value)
+    with pytest.raises(ValueError):
+        provider.command_batch({
+            'provider': 'play_requests_async',
+            'type': 'batch',
+            'sub_commands': [command],
+        })
+    assert not provider._sessions
+
+
+def test_close_other_sessions(provider, http_server):
+    closed = []
+
+    class Session(object):
+        def close(self):
+            closed.append(self)
+    provider.command_GET({
+        'provider': 'play_requests_async',
+        'type': 'GET',
+        'url': '{0}/1'.format(http_server),
+    })
+    provider._sessions['other'] = Session()
+    provider.close()
+    assert len(closed) == 1
+    assert provider._loop is None
+
+
+def test_load(provider, http_server):
+    provider.command_load({
+        'provider': 'play_requests_async',
+        'type': 'load',
+        'iterations': 5,
+        'concurrency': 4,
+        'variable': 'report',
+        'variable_expression': 'report',
+        'assertion': 'report["total"]["errors"] == 0',
+        'sub_commands': [
+            {'type': 'GET',
+             'url': '{0}/1'.format(http_server),
+             'assertion': 'response.status_code == 200'},
+        ],
+    })
+    assert provider.engine.variables['report']['total']['count'] == 20
+
+
+def test_timing(provider, http_server):
+    command = {
+        'provider': 'play_requests_async',
+        'type': 'GET',
+        'url': '{0}/1'.format(http_server),
+        'variable': 'timing',
+        'variable_expression': 'timing',
+        'assertion': 'timing.ttfb <= timing.total',
+    }
+    provider.command_GET(command)
+    timing = provider.engine.variables['timing']
+    assert timing.reused is False
+    assert timing.connect is not None
+    assert timing.bytes_received > 0
+    provider.command_GET(command)
+    assert provider.engine.variables['timing'].reused is True
+
+
+def test_post_files_stream(provider, http_server):
+    import os
+    file_path = os.path.join(os.path.dirname(__file__), 'file.csv')
+    provider.command_POST({
+        'provider': 'play_requests_async',
+        'type': 'POST',
+        'url': '{0}/1'.format(http_server),
+        'stream_files': True,
+        'assertion': '"filename=\\"file.csv\\"" in response.json()["body"]',
+        'parameters': {
+            'files': {
+                'filecsv': ('file.csv', 'path:{0}'.format(file_path)),
+            },
+        },
+    })
+
+
+def test_batch_blocking_io(provider, http_server):
+    import os
+    import threading
+    import mock
+    from play_requests.multipart import MultipartEncoder
+    file_path = os.path.join(os.path.dirname(__file__), 'file.csv')
+    threads = set()
+    prepare_request = provider._prepare_request
+    read = MultipartEncoder.read
+
+    def track_prepare(command):
+        threads.add(threading.current_thread())
+        return prepare_request(command)
+
+    def track_read(self, *args):
+        threads.add(threading.current_thread())
+        return read(self, *args)
+
+    with mock.patch.object(provider, '_prepare_request', track_prepare), \
+            mock.patch.object(MultipartEncoder, 'read', track_read):
+        provider.command_batch({
+            'provider': 'play_requests_async',
+            'type': 'batch',
+            'sub_commands': [
+                {'type': 'POST',
+                 'url': '{0}/{1}'.format(http_server, index),
+                 'stream_files': True,
+                 'assertion': '"filename=\\"file.csv\\"" in '
+                              'response.json()["body"]',
+                 'parameters': {
+                     'files': {
+                         'filecsv': ('file.csv', 'path:{0}'.format(
+                             file_path)),
+                     },
+                 }}
+                for index in range(3)],
+        })
+    # file reads and body serialization never block the event loop
+    assert threads
+    assert provider._thread not in threads
+
+
+def test_stream(provider, http_server):
+    provider.command_GET({
+        'provider': 'play_requests_async',
+        'type': 'GET',
+        'url': '{0}/1'.format(http_server),
+        'stream': True,
+        'max_body_bytes': 10,
+        'variable': 'body',
+        'variable_expression': 'loads(body.read())',
+        'assertion': 'loads(b"".join(response.iter_content(5)))["path"] '
+                     '== "/1"',
+    })
+    assert provider.engine.variables['body']['path'] == '/1'
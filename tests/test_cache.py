@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.cache` module."""
+
+import pytest
+
+
+def _get(provider, cache=True, method='GET', **kwargs):
+    command = {
+        'provider': 'play_requests',
+        'type': method,
+        'url': 'http://something/1',
+        'cache': cache,
+        'variable': 'from_cache',
+        'variable_expression': 'response.from_cache',
+        'assertion': 'response.text == "OK"',
+    }
+    command.update(kwargs)
+    getattr(provider, 'command_{0}'.format(method))(command)
+    return provider.engine.variables.get('from_cache')
+
+
+def test_max_age(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK',
+                  headers={'Cache-Control': 'max-age=60'})
+        assert _get(provider) is False
+        assert _get(provider) is True
+        assert _get(provider) is True
+        assert len(m.request_history) == 1
+
+
+def test_ttl(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK')
+        assert _get(provider, cache={'ttl': 60}) is False
+        assert _get(provider, cache={'ttl': 60}) is True
+        assert len(m.request_history) == 1
+
+
+@pytest.mark.parametrize('headers', [
+    {'Cache-Control': 'no-store'},
+    {'Cache-Control': 'private, max-age=60'},
+    {'Cache-Control': 'max-age=0'},
+    {},
+])
+def test_not_fresh(provider, headers):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK',
+                  headers=headers)
+        assert _get(provider) is False
+        assert _get(provider) is False
+        assert len(m.request_history) == 2
+
+
+def test_not_cacheable_method(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('POST',
+                  'http://something/1',
+                  text='OK',
+                  headers={'Cache-Control': 'max-age=60'})
+        provider.engine.variables = {}
+        _get(provider, method='POST', variable_expression='1')
+        _get(provider, method='POST', variable_expression='1')
+        assert len(m.request_history) == 2
+
+
+def test_etag_revalidation(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  [{'text': 'OK', 'headers': {'ETag': '"v1"'}},
+                   {'status_code': 304, 'headers': {'ETag': '"v1"'}}])
+        assert _get(provider) is False
+        assert _get(provider) is True
+        history = m.request_history
+        assert len(history) == 2
+        assert 'If-None-Match' not in history[0].headers
+        assert history[1].headers['If-None-Match'] == '"v1"'
+
+
+def test_revalidation_new_entry():
+    import requests
+    from play_requests.cache import (
+        MemoryBackend,
+        ResponseCache,
+    )
+
+    def response(status_code, headers):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        response._content = b'OK' if status_code == 200 else b''
+        return response
+
+    responses = [
+        response(200, {'ETag': '"v1"'}),
+        response(304, {'ETag': '"v1"', 'Cache-Control': 'max-age=60'})]
+    cache = ResponseCache(MemoryBackend())
+    cache.request(lambda parameters: responses.pop(0), 'GET',
+                  'http://something/1', {})
+    key = cache._key('GET', 'http://something/1', {})
+    entry = cache.backend.get(key)
+    revalidated = cache.request(lambda parameters: responses.pop(0), 'GET',
+                                'http://something/1', {})
+    assert revalidated.from_cache
+    assert revalidated.headers['Cache-Control'] == 'max-age=60'
+    assert revalidated.text == 'OK'
+    # the shared entry read by concurrent calls is never modified
+    assert 'Cache-Control' not in entry.response.headers
+    assert not entry.fresh
+    assert cache.backend.get(key) is not entry
+    assert cache.backend.get(key).fresh
+
+
+def test_last_modified_changed(provider):
+    import requests_mock
+    date = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  [{'text': 'OK', 'headers': {'Last-Modified': date}},
+                   {'text': 'OK', 'headers': {'Cache-Control': 'max-age=60'}}])
+        assert _get(provider) is False
+        assert _get(provider) is False
+        assert m.request_history[1].headers['If-Modified-Since'] == date
+        assert _get(provider) is True
+
+
+def test_vary(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK',
+                  headers={'Cache-Control': 'max-age=60',
+                           'Vary': 'Accept-Language'})
+        assert _get(provider, parameters={
+            'headers': {'Accept-Language': 'it'}}) is False
+        assert _get(provider, parameters={
+            'headers': {'Accept-Language': 'it'}}) is True
+        assert _get(provider, parameters={
+            'headers': {'Accept-Language': 'en'}}) is False
+        assert len(m.request_history) == 2
+
+
+def test_params_and_auth_in_key(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK',
+                  headers={'Cache-Control': 'max-age=60'})
+        assert _get(provider, parameters={'params': {'a': 1}}) is False
+        assert _get(provider, parameters={'params': {'a': 1}}) is True
+        assert _get(provider, parameters={'params': {'a': 2}}) is False
+        assert _get(provider, parameters={'auth': ['a', 'b']}) is False
+        assert _get(provider, parameters={'auth': ['a', 'c']}) is False
+        assert _get(provider, parameters={'auth': ['a', 'b']}) is True
+
+
+@pytest.mark.parametrize('header, options', [
+    ('Authorization', True),
+    ('Proxy-Authorization', True),
+    ('Cookie', True),
+    ('X-Api-Key', True),
+    ('X-Session-Token', {'credential_headers': ['X-Session-Token']}),
+])
+def test_authorization_header_in_key(provider, header, options):
+    import requests_mock
+
+    def me(request, context):
+        return request.headers[header].split()[-1]
+
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/me',
+                  text=me,
+                  headers={'Cache-Control': 'max-age=60'})
+        for token, from_cache in (
+                ('alice', False), ('bob', False), ('alice', True)):
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/me',
+                'cache': options,
+                'parameters': {
+                    'headers': {header: 'Bearer {0}'.format(token)}},
+                'variable': 'from_cache',
+                'variable_expression': 'response.from_cache',
+                'assertion': 'response.text == "{0}"'.format(token),
+            })
+            assert provider.engine.variables['from_cache'] is from_cache
+        assert len(m.request_history) == 2
+
+
+def test_cookies_in_key(provider):
+    import requests_mock
+
+    def me(request, context):
+        return request.headers['Cookie']
+
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/me',
+                  text=me,
+                  headers={'Cache-Control': 'max-age=60'})
+        for user, from_cache in (
+                ('alice', False), ('bob', False), ('alice', True)):
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/me',
+                'cache': True,
+                'parameters': {'cookies': {'sessionid': user}},
+                'variable': 'from_cache',
+                'variable_expression': 'response.from_cache',
+                'assertion': 'response.text == "sessionid={0}"'.format(
+                    user),
+            })
+            assert provider.engine.variables['from_cache'] is from_cache
+        assert len(m.request_history) == 2
+
+
+def test_disk_cache(provider, tmpdir):
+    import requests_mock
+    from play_requests import cache
+    options = {'path': tmpdir.strpath}
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK',
+                  headers={'Cache-Control': 'max-age=60'})
+        assert _get(provider, cache=options) is False
+        # a new process
+        cache.clear_caches()
+        assert _get(provider, cache=options) is True
+        assert len(m.request_history) == 1
+        assert len(tmpdir.listdir()) == 1
+
+
+def _entry(size):
+    import requests
+    from play_requests.cache import CacheEntry
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'x' * size
+    return CacheEntry(response, {}, 60)
+
+
+def test_memory_backend_eviction():
+    from play_requests.cache import MemoryBackend
+    backend = MemoryBackend(max_entries=2, max_bytes=25)
+    backend.set('a', _entry(10))
+    backend.set('b', _entry(10))
+    assert backend.get('a') is not None
+    backend.set('c', _entry(1))
+    assert len(backend) == 2
+    assert backend.get('b') is None
+    backend.set('d', _entry(25))
+    assert len(backend) == 1
+    assert backend.get('d') is not None
+
+
+def test_disk_backend_eviction(tmpdir):
+    import os
+    import time
+    from play_requests.cache import DiskBackend
+    backend = DiskBackend(tmpdir.join('cache').strpath, max_entries=2)
+    backend.set('a', _entry(1))
+    backend.set('b', _entry(1))
+    past = time.time() - 60
+    os.utime(backend._file_path('a'), (past, past))
+    backend.set('c', _entry(1))
+    assert len(backend) == 2
+    assert backend.get('a') is None
+    assert backend.get('b').response.content == b'x'
+    backend.delete('b')
+    assert backend.get('b') is None
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.cassette` module."""
+
+import pytest
+
+
+def _command(path, mode, method='GET', url='http://something/1', **kwargs):
+    command = {
+        'provider': 'play_requests',
+        'type': method,
+        'url': url,
+        'parameters': {},
+        'cassette': {'path': path, 'mode': mode},
+    }
+    command['cassette'].update(kwargs)
+    return command
+
+
+def test_record_replay(provider, tmpdir):
+    import requests_mock
+    from play_requests import cassette
+    path = str(tmpdir.join('cassettes', 'test.cassette'))
+    with requests_mock.mock() as m:
+        m.get('http://something/1', [
+            {'text': 'first', 'headers': {'X-Id': '1'}},
+            {'text': 'second', 'headers': {'X-Id': '2'}}])
+        m.get('http://something/2', text='other', status_code=404)
+        provider.command_GET(_command(path, 'record'))
+        provider.command_GET(_command(path, 'record'))
+        provider.command_GET(_command(
+            path, 'record', url='http://something/2'))
+        assert m.call_count == 3
+    provider.close()
+    cassette.close_cassettes()
+
+    with requests_mock.mock() as m:
+        replayed = [
+            provider._send_request('GET', _command(path, 'replay'))
+            for i in range(3)]
+        other = provider._send_request(
+            'GET', _command(path, 'replay', url='http://something/2'))
+        assert m.called is False
+    assert [response.text for response in replayed] == [
+        'first', 'second', 'second']
+    assert replayed[0].headers['x-id'] == '1'
+    assert replayed[0].from_cassette is True
+    assert replayed[0].timing.total is not None
+    assert other.status_code == 404
+    assert other.text == 'other'
+
+
+def test_record_replay_redirect(provider, tmpdir):
+    import requests_mock
+    from play_requests import cassette
+    path = str(tmpdir.join('test.cassette'))
+    with requests_mock.mock() as m:
+        m.get('http://something/old', status_code=302,
+              headers={'Location': 'http://something/new'})
+        m.get('http://something/new', text='new')
+        provider.command_GET(_command(
+            path, 'record', url='http://something/old'))
+        assert m.call_count == 2
+    provider.close()
+    cassette.close_cassettes()
+
+    with requests_mock.mock() as m:
+        response = provider._send_request('GET', _command(
+            path, 'replay', url='http://something/old'))
+        assert m.called is False
+    assert response.status_code == 200
+    assert response.url == 'http://something/new'
+    assert response.text == 'new'
+
+
+def test_replay_miss(provider, tmpdir):
+    import requests_mock
+    from play_requests import cassette
+    path = str(tmpdir.join('test.cassette'))
+    with requests_mock.mock() as m:
+        m.get('http://something/1', text='OK')
+        provider.command_GET(_command(path, 'record'))
+    provider.close()
+
+    with pytest.raises(cassette.CassetteError):
+        provider.command_GET(_command(
+            path, 'replay', url='http://something/1?page=2'))
+
+
+def test_match_on_body(provider, tmpdir):
+    import requests_mock
+    from play_requests import cassette
+    path = str(tmpdir.join('test.cassette'))
+    match_on = ['method', 'url', 'body', 'X-Tenant']
+
+    def post(mode, value, tenant='a'):
+        command = _command(
+            path, mode, method='POST', match_on=match_on)
+        command['parameters'] = {
+            'json': {'value': value},
+            'headers': {'X-Tenant': tenant}}
+        return provider._send_request('POST', command)
+
+    with requests_mock.mock() as m:
+        m.post('http://something/1', [{'text': 'one'}, {'text': 'two'}])
+        post('record', 1)
+        post('record', 2)
+    provider.close()
+    cassette.close_cassettes()
+
+    assert post('replay', 2).text == 'two'
+    assert post('replay', 1).text == 'one'
+    with pytest.raises(cassette.CassetteError):
+        post('replay', 1, tenant='b')
+
+
+def test_match_on_multipart_body(provider, tmpdir):
+    import requests_mock
+    from play_requests import cassette
+    path = str(tmpdir.join('test.cassette'))
+    upload = tmpdir.join('report.csv')
+
+    def post(mode, content):
+        upload.write(content)
+        command = _command(
+            path, mode, method='POST', match_on=['method', 'url', 'body'])
+        command['parameters'] = {'files': {
+            'file': ['report.csv', 'path:{0}'.format(upload)]}}
+        provider.command_POST(dict(
+            command, variable='text', variable_expression='response.text'))
+        return provider.engine.variables['text']
+
+    with requests_mock.mock() as m:
+        m.post('http://something/1', [{'text': 'one'}, {'text': 'two'}])
+        post('record', 'a,b\n')
+        post('record', 'c,d\n')
+    provider.close()
+    cassette.close_cassettes()
+
+    # multipart boundaries are random
+    assert post('replay', 'c,d\n') == 'two'
+    assert post('replay', 'a,b\n') == 'one'
+    with pytest.raises(cassette.CassetteError):
+        post('replay', 'e,f\n')
+
+
+def test_cassette_options_conflict(provider, tmpdir):
+    import requests_mock
+    from play_requests import cassette
+    path = str(tmpdir.join('test.cassette'))
+    with requests_mock.mock() as m:
+        m.get('http://something/1', text='OK')
+        provider.command_GET(_command(path, 'record'))
+        with pytest.raises(ValueError):
+            provider.command_GET(_command(
+                path, 'record', match_on=['method', 'url', 'body']))
+        with pytest.raises(ValueError):
+            provider.command_GET(dict(_command(path, 'record'), stream=True))
+        assert m.call_count == 1
+    assert len(cassette._cassettes) == 1
+
+
+def test_index_lookup(tmpdir):
+    import requests
+    from play_requests import cassette
+    path = str(tmpdir.join('test.cassette'))
+    recorder = cassette.Cassette(path, mode='record')
+    for i in range(200):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = 'http://something/{0}'.format(i)
+        response._content = str(i).encode('utf-8')
+        recorder.record('GET {0}'.format(response.url), response)
+    recorder.close()
+
+    player = cassette.Cassette(path)
+    for i in (0, 57, 199):
+        assert player.replay(
+            'GET http://something/{0}'.format(i)).text == str(i)
+    player.close()
+
+
+def test_mode_not_supported(tmpdir):
+    from play_requests import cassette
+    with pytest.raises(ValueError):
+        cassette.Cassette(str(tmpdir.join('test.cassette')), mode='other')
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.compression` module."""
+
+import gzip
+import io
+import json
+import zlib
+
+import pytest
+
+
+def _post(provider, compress, **parameters):
+    import requests_mock
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': 'http://something/1',
+        'compress': compress,
+        'parameters': parameters,
+    }
+    with requests_mock.mock() as m:
+        m.post('http://something/1', text='OK')
+        provider.command_POST(command)
+        return m.request_history[0]
+
+
+def test_compress_json(provider):
+    document = {'items': [{'id': index} for index in range(1000)]}
+    request = _post(provider, 'gzip', json=document)
+    assert request.headers['Content-Encoding'] == 'gzip'
+    assert request.headers['Content-Type'] == 'application/json'
+    assert json.loads(gzip.decompress(request.body)) == document
+
+
+def test_compress_data(provider):
+    data = 'x' * 10000
+    request = _post(
+        provider, {'encoding': 'deflate', 'level': 9}, data=data,
+        headers={'Content-Type': 'text/plain'})
+    assert request.headers['Content-Encoding'] == 'deflate'
+    assert request.headers['Content-Type'] == 'text/plain'
+    assert zlib.decompress(request.body) == data.encode('utf-8')
+    assert len(request.body) < 100
+
+
+def test_compress_min_size(provider):
+    request = _post(provider, 'gzip', json={'small': True})
+    assert 'Content-Encoding' not in request.headers
+    assert json.loads(request.body) == {'small': True}
+
+    request = _post(
+        provider, {'encoding': 'gzip', 'min_size': 0}, json={'small': True})
+    assert request.headers['Content-Encoding'] == 'gzip'
+
+
+def test_compress_form_not_compressed(provider):
+    request = _post(provider, 'gzip', data={'name': 'value'})
+    assert 'Content-Encoding' not in request.headers
+    assert request.body == 'name=value'
+
+
+@pytest.mark.filterwarnings('error::ResourceWarning')
+@pytest.mark.filterwarnings('error::pytest.PytestUnraisableExceptionWarning')
+def test_compress_stream_files(provider, tmpdir):
+    import gc
+    path = tmpdir.join('report.csv')
+    path.write('a,b,c\n' * 1000)
+    with pytest.raises(ValueError):
+        provider.command_POST({
+            'provider': 'play_requests',
+            'type': 'POST',
+            'url': 'http://something/1',
+            'compress': 'gzip',
+            'stream_files': True,
+            'parameters': {'files': {
+                'file': ['report.csv', 'path:{0}'.format(path)]}},
+        })
+    # file object bodies are closed once compressed
+    body = open(str(path), 'rb')
+    request = _post(provider, 'gzip', data=body)
+    assert body.closed
+    assert gzip.decompress(request.body) == b'a,b,c\n' * 1000
+    gc.collect()
+
+
+def test_compress_file():
+    from play_requests.compression import compress
+    data = b'a,b,c\n' * 100000
+    assert gzip.decompress(compress(io.BytesIO(data), 'gzip')) == data
+    assert gzip.decompress(
+        compress(io.StringIO(data.decode('utf-8')), 'gzip')) == data
+
+
+def test_encoding_not_supported():
+    from play_requests.compression import get_compressor
+    with pytest.raises(ValueError):
+        get_compressor('lzma')
+
+
+@pytest.mark.parametrize('encoding, module', [
+    ('br', 'brotli'),
+    ('zstd', 'zstandard'),
+])
+def test_optional_encodings(encoding, module):
+    from play_requests import compression
+    if getattr(compression, module) is None:
+        with pytest.raises(ImportError):
+            compression.get_compressor(encoding)
+    else:
+        assert compression.compress(b'data', encoding)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.dataset` module."""
+
+import json
+
+import mock
+import pytest
+
+
+@pytest.fixture
+def csv_path(tmpdir):
+    path = tmpdir.join('users.csv')
+    path.write('id,name\n1,foo\n2,bar\n3,baz\n')
+    return str(path)
+
+
+@pytest.fixture
+def jsonl_path(tmpdir):
+    path = tmpdir.join('users.jsonl')
+    path.write('\n'.join(json.dumps(row) for row in [
+        {'id': 1, 'tags': ['a']},
+        {'id': 2, 'tags': []},
+    ]) + '\n\n')
+    return str(path)
+
+
+def test_iter_rows_csv(csv_path):
+    from play_requests.dataset import iter_rows
+    rows = iter_rows(csv_path)
+    assert next(rows) == {'id': '1', 'name': 'foo'}
+    assert list(rows) == [
+        {'id': '2', 'name': 'bar'}, {'id': '3', 'name': 'baz'}]
+    assert list(iter_rows(csv_path, limit=1)) == [
+        {'id': '1', 'name': 'foo'}]
+
+
+def test_iter_rows_jsonl(jsonl_path):
+    from play_requests.dataset import iter_rows
+    assert list(iter_rows(jsonl_path)) == [
+        {'id': 1, 'tags': ['a']}, {'id': 2, 'tags': []}]
+
+
+def test_iter_rows_format(tmpdir):
+    from play_requests.dataset import iter_rows
+    path = tmpdir.join('users.txt')
+    path.write('id;name\n1;foo\n')
+    with pytest.raises(ValueError):
+        list(iter_rows(str(path)))
+    assert list(iter_rows(str(path), format='csv', delimiter=';')) == [
+        {'id': '1', 'name': 'foo'}]
+
+
+def test_command_template():
+    from play_requests.dataset import CommandTemplate
+    command = {
+        'type': 'POST',
+        'url': 'http://something/items/${id}/$missing',
+        'parameters': {
+            'headers': {'X-Static': 'yes'},
+            'json': {'id': '$id', 'tags': ['$tags', 'static']},
+        },
+    }
+    template = CommandTemplate(command)
+    rendered = template.render({'id': 1, 'tags': ['a']})
+    assert rendered == {
+        'type': 'POST',
+        'url': 'http://something/items/1/$missing',
+        'parameters': {
+            'headers': {'X-Static': 'yes'},
+            'json': {'id': 1, 'tags': [['a'], 'static']},
+        },
+    }
+    # the original command is left untouched and untemplated
+    # values are shared
+    assert command['parameters']['json']['id'] == '$id'
+    assert rendered['parameters']['headers'] is \
+        command['parameters']['headers']
+
+
+def test_dataset(provider, csv_path):
+    import requests_mock
+    provider.engine.variables['names'] = []
+    with requests_mock.mock() as m:
+        for index in range(1, 4):
+            m.request(
+                'POST', 'http://something/users/{0}'.format(index),
+                json={'id': index})
+        provider.command_POST({
+            'provider': 'play_requests',
+            'type': 'POST',
+            'url': 'http://something/users/$id',
+            'dataset': csv_path,
+            'parameters': {'json': {'name': '$name'}},
+            'variable': 'last',
+            'variable_expression': 'row["name"]',
+            'assertion': 'response.json()["id"] == int(row["id"])',
+        })
+        assert [json.loads(request.body) for request in m.request_history] \
+            == [{'name': 'foo'}, {'name': 'bar'}, {'name': 'baz'}]
+    assert provider.engine.variables['last'] == 'baz'
+
+
+@pytest.mark.parametrize('window', [1, 2, 10])
+def test_dataset_concurrency(provider, jsonl_path, window):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET', 'http://something/users/1', json={'tags': ['a']})
+        m.request('GET', 'http://something/users/2', json={'tags': []})
+        with mock.patch.object(
+                provider, '_send_batch',
+                wraps=provider._send_batch) as send_batch:
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/users/$id',
+                'dataset': {
+                    'path': jsonl_path,
+                    'concurrency': 2,
+                    'window': window,
+                },
+                'assertion': 'response.json()["tags"] == row["tags"]',
+            })
+        assert m.call_count == 2
+    assert send_batch.call_count == (2 if window == 1 else 1)
+
+
+def test_dataset_assertion_error(provider, csv_path):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET', requests_mock.ANY, status_code=200)
+        m.request('GET', 'http://something/users/2', status_code=404)
+        with pytest.raises(AssertionError):
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/users/$id',
+                'dataset': {'path': csv_path},
+                'assertion': 'response.status_code == 200',
+            })
+        # rows following the failing one are not sent
+        assert m.call_count == 2
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.executor` module."""
+
+import json
+import os
+
+import pytest
+
+
+SCRIPT = """
+- provider: play_requests
+  type: GET
+  url: $base_url/{name}
+  variable: path
+  variable_expression: response.json()['path']
+  assertion: response.status_code == 200
+- provider: python
+  type: assert
+  expression: variables['path'] == '/{name}' and 'other' not in variables
+- provider: python
+  type: store_variable
+  name: other
+  expression: "1"
+"""
+
+
+@pytest.fixture
+def scripts(tmpdir):
+    directory = tmpdir.mkdir('scenarios')
+    for name in ('test_a', 'test_b'):
+        directory.join(name + '.yml').write(SCRIPT.format(name=name))
+    directory.mkdir('nested').join('test_c.yaml').write(
+        SCRIPT.format(name='test_c'))
+    directory.join('test_fail.yml').write(
+        SCRIPT.format(name='test_fail').replace('== 200', '== 404'))
+    directory.join('test_data.yml').write(
+        '---\ntest_data:\n- name: x\n- name: y\n---\n' +
+        SCRIPT.format(name='$name'))
+    directory.join('other.yml').write('')
+    directory.mkdir('.hidden').join('test_hidden.yml').write('')
+    return directory
+
+
+def test_discover(scripts):
+    from play_requests.executor import discover
+    names = [os.path.relpath(path, str(scripts))
+             for path in discover(str(scripts))]
+    assert names == [
+        'test_a.yml', 'test_b.yml', 'test_data.yml', 'test_fail.yml',
+        os.path.join('nested', 'test_c.yaml')]
+    assert discover(str(scripts.join('other.yml'))) == [
+        str(scripts.join('other.yml'))]
+
+
+def test_make_context():
+    from play_requests.executor import make_context
+    context = make_context({
+        'pytest-play': {'foo': 'bar'},
+        'skins': {'skin1': {
+            'base_url': 'http://something',
+            'credentials': {
+                'admin': {'username': 'admin', 'password': 'secret'}},
+        }},
+    })
+    assert context['test_run_identifier'].startswith('QA-')
+    assert context['foo'] == 'bar'
+    assert context['base_url'] == 'http://something'
+    assert (context['admin_name'], context['admin_pwd']) == \
+        ('admin', 'secret')
+
+
+def test_history_schedule(tmpdir):
+    from play_requests.executor import (
+        DurationHistory,
+        schedule,
+    )
+    path = str(tmpdir.join('history.json'))
+    history = DurationHistory(path)
+    history.update('short.yml', 1.0)
+    history.update('long.yml', 10.0)
+    history.update('long.yml', 20.0)
+    history.save()
+    history = DurationHistory(path)
+    assert history.get('long.yml') == 15.0
+    assert schedule(['short.yml', 'new.yml', 'long.yml'], history) == \
+        ['new.yml', 'long.yml', 'short.yml']
+    assert schedule(['b.yml', 'a.yml']) == ['b.yml', 'a.yml']
+
+    tmpdir.join('corrupted.json').write('{')
+    assert DurationHistory(str(tmpdir.join('corrupted.json'))).durations \
+        == {}
+
+
+def test_executor(scripts, tmpdir, http_server):
+    from play_requests.executor import (
+        ScenarioExecutor,
+        discover,
+    )
+    history = str(tmpdir.join('history.json'))
+    executor = ScenarioExecutor(
+        variables={'skins': {'skin1': {
+            'base_url': http_server, 'credentials': {}}}},
+        workers=2, history=history)
+    results = executor.run(discover(str(scripts)))
+    results = dict(
+        (os.path.basename(result['path']), result) for result in results)
+    assert sorted(results) == [
+        'test_a.yml', 'test_b.yml', 'test_c.yaml', 'test_data.yml',
+        'test_fail.yml']
+    for name, result in results.items():
+        if name == 'test_fail.yml':
+            assert 'AssertionError' in result['error']
+            assert result['output']
+        else:
+            assert result['error'] is None, result['error']
+    assert len(set(result['pid'] for result in results.values())) <= 2
+    with open(history) as file_obj:
+        durations = json.load(file_obj)
+    assert sorted(durations) == sorted(
+        os.path.normpath(path) for path in discover(str(scripts)))
+
+
+def test_main(scripts, tmpdir, http_server, capsys):
+    from play_requests.executor import main
+    variables = tmpdir.join('variables.yml')
+    variables.write(
+        'skins:\n  skin1:\n    base_url: {0}\n'.format(http_server))
+    history = str(tmpdir.join('history.json'))
+    scripts.join('test_fail.yml').remove()
+    assert main([
+        str(scripts), '--workers', '2', '--variables', str(variables),
+        '--history', history]) == 0
+    assert '4 passed, 0 failed' in capsys.readouterr().out
+    assert main([
+        str(scripts.join('test_a.yml')), '--history', history]) == 1
+    assert '0 passed, 1 failed' in capsys.readouterr().out
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.expressions` module."""
+
+import pytest
+
+
+def test_evaluate():
+    from play_requests.expressions import evaluate
+    assert evaluate('len(foo) + bar', {'len': len, 'bar': 1},
+                    foo=[1, 2]) == 3
+
+
+def test_evaluate_kwargs_override():
+    from play_requests.expressions import evaluate
+    context = {'foo': 1}
+    assert evaluate('foo', context, foo=2) == 2
+    assert context == {'foo': 1}
+
+
+@pytest.mark.parametrize('expression', [
+    'open',
+    '__file__',
+    'import os',
+    'prova = lambda: 1',
+])
+def test_evaluate_bad(expression):
+    from play_requests.expressions import evaluate
+    with pytest.raises(Exception):
+        evaluate(expression, {})
+
+
+def test_assert_expression():
+    from play_requests.expressions import assert_expression
+    assert_expression('foo == 1', {}, foo=1)
+    with pytest.raises(AssertionError):
+        assert_expression('foo == 1', {}, foo=2)
+
+
+def test_compile_once(play):
+    import requests_mock
+    from play_requests.expressions import compile_expression
+    compile_expression.cache_clear()
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  json={'status': 'ok'})
+        play.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(play)
+        for index in range(10):
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/1',
+                'variable': 'status',
+                'variable_expression': 'response.json()["status"]',
+                'assertion': 'variables["status"] == "ok"',
+            })
+    info = compile_expression.cache_info()
+    assert info.misses == 2
+    assert info.hits == 18
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.http2` module."""
+
+import json
+import socket
+import threading
+
+import pytest
+
+h2 = pytest.importorskip('h2')
+pytest.importorskip('httpx')
+
+
+class H2Server(object):
+    """ Cleartext HTTP/2 (prior knowledge) echo server counting
+        connections
+    """
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(50)
+        self.connections = 0
+        self.url = 'http://127.0.0.1:{0}'.format(self.sock.getsockname()[1])
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                client, address = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            thread = threading.Thread(
+                target=self._handle, args=(client, self.connections))
+            thread.daemon = True
+            thread.start()
+
+    def _handle(self, client, connection_id):
+        import h2.config
+        import h2.connection
+        import h2.events
+        conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        client.sendall(conn.data_to_send())
+        requests = {}
+        while True:
+            data = client.recv(65536)
+            if not data:
+                break
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    requests[event.stream_id] = {
+                        'headers': dict(
+                            (name.decode('utf-8'), value.decode('utf-8'))
+                            for name, value in event.headers),
+                        'body': b''}
+                elif isinstance(event, h2.events.DataReceived):
+                    requests[event.stream_id]['body'] += event.data
+                    conn.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded):
+                    request = requests.pop(event.stream_id)
+                    headers = request['headers']
+                    payload = json.dumps({
+                        'method': headers[':method'],
+                        'path': headers[':path'],
+                        'headers': headers,
+                        'body': request['body'].decode('utf-8', 'replace'),
+                        'connection': connection_id,
+                    }).encode('utf-8')
+                    conn.send_headers(event.stream_id, [
+                        (':status', '200'),
+                        ('content-type', 'application/json'),
+                        ('content-length', str(len(payload))),
+                        ('set-cookie', 'session=1'),
+                    ])
+                    conn.send_data(event.stream_id, payload, end_stream=True)
+            client.sendall(conn.data_to_send())
+        client.close()
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def h2_server():
+    server = H2Server()
+    yield server
+    server.close()
+
+
+def test_http2_batch_multiplexed(provider, h2_server):
+    provider.command_batch({
+        'provider': 'play_requests',
+        'type': 'batch',
+        'max_workers': 10,
+        'sub_commands': [
+            {'type': 'GET',
+             'url': '{0}/items/{1}'.format(h2_server.url, index),
+             'http2': {'prior_knowledge': True},
+             'assertion': 'response.http_version == "HTTP/2" and '
+                          'response.json()["path"] == "/items/{0}"'.format(
+                              index)}
+            for index in range(20)],
+    })
+    assert h2_server.connections == 1
+
+
+def test_http2_load(provider, h2_server):
+    from play_requests.http2 import Http2Session
+    provider.command_load({
+        'provider': 'play_requests',
+        'type': 'load',
+        'iterations': 5,
+        'concurrency': 4,
+        'variable': 'report',
+        'variable_expression': 'report',
+        'assertion': 'report["total"]["errors"] == 0',
+        'sub_commands': [
+            {'type': 'GET',
+             'url': '{0}/items/1'.format(h2_server.url),
+             'http2': {'prior_knowledge': True},
+             'assertion': 'response.http_version == "HTTP/2"'}],
+    })
+    # a single HTTP/2 session, created before the workers start
+    assert [type(session) for session in provider._sessions.values()] == \
+        [Http2Session]
+    assert h2_server.connections == 1
+
+
+def test_http2_parameters(provider, h2_server, tmpdir):
+    path = tmpdir.join('file.csv')
+    path.write('a,b')
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': '{0}/upload'.format(h2_server.url),
+        'http2': {'prior_knowledge': True},
+        'parameters': {
+            'headers': {'X-Test': 'yes'},
+            'params': {'q': 'search'},
+            'auth': ['user', 'pwd'],
+            'timeout': [5, 10],
+            'files': {'file': ['file.csv', 'path:{0}'.format(path)]},
+            'data': {'name': 'value'},
+        },
+        'variable': 'echo',
+        'variable_expression': 'response.json()',
+        'assertion': 'timing.ttfb is not None and '
+                     'response.cookies["session"] == "1"',
+    }
+    provider.command_POST(command)
+    echo = provider.engine.variables['echo']
+    assert echo['path'] == '/upload?q=search'
+    assert echo['headers']['x-test'] == 'yes'
+    assert echo['headers']['authorization'].startswith('Basic ')
+    assert 'a,b' in echo['body']
+    assert 'name="name"' in echo['body']
+
+    command['stream_files'] = True
+    provider.command_POST(command)
+    echo = provider.engine.variables['echo']
+    assert 'a,b' in echo['body']
+    assert echo['headers']['content-type'].startswith('multipart/form-data')
+    # cookies are never stored
+    assert 'cookie' not in echo['headers']
+
+
+def test_http2_stream(provider, h2_server):
+    command = {
+        'provider': 'play_requests',
+        'type': 'PUT',
+        'url': '{0}/stream'.format(h2_server.url),
+        'http2': {'prior_knowledge': True},
+        'stream': True,
+        'max_body_bytes': 1024,
+        'parameters': {'json': {'value': 1}},
+        'assertion': 'json.loads(body.read())["body"] == \'{"value": 1}\'',
+    }
+    provider.engine.context['json'] = json
+    provider.command_PUT(command)
+
+
+def test_http2_fallback_http11(provider, http_server):
+    provider.command_GET({
+        'provider': 'play_requests',
+        'type': 'GET',
+        'url': '{0}/items'.format(http_server),
+        'http2': True,
+        'parameters': {'allow_redirects': False},
+        'assertion': 'response.http_version == "HTTP/1.1" and '
+                     'response.json()["method"] == "GET"',
+    })
+
+
+def test_http2_parameter_not_supported(provider):
+    from play_requests.http2 import Http2Session
+    session = Http2Session()
+    with pytest.raises(ValueError):
+        session._make_parameters({'proxies': {}})
+    session.close()
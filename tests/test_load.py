@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests` load command."""
+
+import pytest
+
+
+def test_latency_stats():
+    from play_requests.stats import LatencyStats
+    stats = LatencyStats()
+    stats.start()
+    stats.add('GET 1', 0.1)
+    stats.add('GET 1', 0.3, error=True)
+    stats.add('GET 2', 0.2)
+    stats.stop()
+    report = stats.report()
+    assert report['total']['count'] == 3
+    assert report['total']['errors'] == 1
+    assert report['total']['max'] == 0.3
+    assert report['commands']['GET 1']['count'] == 2
+    assert report['commands']['GET 1']['errors'] == 1
+    assert report['commands']['GET 1']['p50'] == 0.1
+    assert report['commands']['GET 2']['mean'] == 0.2
+
+
+def test_histogram():
+    import random
+    import math
+    from play_requests.stats import Histogram
+    values = [random.expovariate(10) for i in range(10000)]
+    histogram = Histogram()
+    for value in values:
+        histogram.add(value)
+    # memory is bounded by the number of buckets, not of values
+    assert len(histogram.buckets) < 2000
+    values.sort()
+    assert histogram.count == 10000
+    assert (histogram.min, histogram.max) == (values[0], values[-1])
+    assert histogram.mean == pytest.approx(sum(values) / 10000)
+    for percent in (50, 95, 99):
+        # nearest-rank percentile
+        expected = values[int(math.ceil(percent / 100.0 * 10000)) - 1]
+        assert histogram.percentile(percent) == pytest.approx(
+            expected, rel=0.01)
+
+    other = Histogram()
+    other.add(100)
+    histogram.update(other)
+    assert (histogram.count, histogram.max) == (10001, 100)
+    assert Histogram().percentile(50) is None
+
+
+def test_pacer():
+    import time
+    from play_requests.load import Pacer
+    pacer = Pacer(100)
+    start = time.time()
+    for index in range(11):
+        pacer.wait()
+    assert time.time() - start >= 0.09
+
+
+def test_load_iterations(play):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  json={'status': 'ok'})
+        m.request('POST',
+                  'http://something/2',
+                  status_code=500)
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        provider.command_load({
+            'provider': 'play_requests',
+            'type': 'load',
+            'iterations': 5,
+            'concurrency': 2,
+            'variable': 'report',
+            'variable_expression': 'report',
+            'assertion': 'report["total"]["count"] == 20',
+            'sub_commands': [
+                {'type': 'GET',
+                 'url': 'http://something/1',
+                 'assertion': 'response.json()["status"] == "ok"'},
+                {'type': 'POST',
+                 'name': 'post',
+                 'url': 'http://something/2',
+                 'assertion': 'response.status_code == 200'},
+            ],
+        })
+        assert len(m.request_history) == 20
+        report = mock_engine.variables['report']
+        assert report['commands']['GET http://something/1']['errors'] == 0
+        assert report['commands']['post']['count'] == 10
+        assert report['commands']['post']['errors'] == 10
+
+
+def test_load_duration_script(play, tmpdir):
+    import requests_mock
+    script = tmpdir.join('test_script.yml')
+    script.write("""
+- provider: python
+  type: store_variable
+  name: foo
+  expression: 1
+- provider: play_requests
+  type: GET
+  url: $base_url/1
+""")
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK')
+        mock_engine = play
+        mock_engine.variables = {'base_url': 'http://something'}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        provider.command_load({
+            'provider': 'play_requests',
+            'type': 'load',
+            'duration': 0.2,
+            'rps': 50,
+            'script': script.strpath,
+            'variable': 'report',
+            'variable_expression': 'report',
+        })
+        report = mock_engine.variables['report']
+        assert list(report['commands']) == ['GET http://something/1']
+        assert 5 <= report['total']['count'] <= 12
+
+
+def test_load_assertion_ko(play):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  status_code=503)
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        with pytest.raises(AssertionError):
+            provider.command_load({
+                'provider': 'play_requests',
+                'type': 'load',
+                'assertion': 'report["total"]["errors"] == 0',
+                'sub_commands': [
+                    {'type': 'GET',
+                     'url': 'http://something/1',
+                     'assertion': 'response.status_code == 200'},
+                ],
+            })
+
+
+def test_load_script_variables(play, tmpdir):
+    import requests_mock
+    script = tmpdir.join('test_script.yml')
+    script.write("""
+- provider: play_requests
+  type: POST
+  url: $base_url/login
+  variable: token
+  variable_expression: response.json()['token']
+- provider: play_requests
+  type: GET
+  url: $base_url/items
+  parameters:
+    headers:
+      Authorization: Bearer $token
+  assertion: variables['token'] == 'abc'
+""")
+    with requests_mock.mock() as m:
+        m.request('POST',
+                  'http://something/login',
+                  json={'token': 'abc'})
+        m.request('GET',
+                  'http://something/items',
+                  request_headers={'Authorization': 'Bearer abc'},
+                  text='OK')
+        mock_engine = play
+        mock_engine.variables = {'base_url': 'http://something'}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        provider.command_load({
+            'provider': 'play_requests',
+            'type': 'load',
+            'iterations': 2,
+            'concurrency': 2,
+            'script': script.strpath,
+            'variable': 'report',
+            'variable_expression': 'report',
+            'assertion': 'report["total"]["errors"] == 0',
+        })
+        assert mock_engine.variables['report']['total']['count'] == 8
+        # each virtual user has its own variables
+        assert 'token' not in mock_engine.variables
+
+
+def test_load_failures_not_logged(play, caplog):
+    import logging
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  status_code=503)
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        with caplog.at_level(logging.INFO):
+            provider.command_load({
+                'provider': 'play_requests',
+                'type': 'load',
+                'iterations': 10,
+                'variable': 'report',
+                'variable_expression': 'report',
+                'sub_commands': [
+                    {'type': 'GET',
+                     'url': 'http://something/1',
+                     'assertion': 'response.status_code == 200'},
+                ],
+            })
+        assert mock_engine.variables['report']['total']['errors'] == 10
+        assert not [record for record in caplog.records
+                    if record.levelno >= logging.WARNING]
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.logs` module."""
+
+import json
+import logging
+
+import mock
+import pytest
+
+
+def _command(**kwargs):
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': 'http://something/1',
+        'parameters': {
+            'headers': {'Authorization': 'Bearer secret', 'X-Test': 'yes'},
+            'json': {'password': 'secret',
+                     'items': list(range(1000)),
+                     'text': 'x' * 10000},
+        },
+    }
+    command.update(kwargs)
+    return command
+
+
+def _events(caplog, event):
+    return [record for record in caplog.records
+            if getattr(record, 'event', None) == event]
+
+
+def test_log_call(provider, caplog):
+    import requests_mock
+    caplog.set_level(logging.DEBUG, logger='play_requests')
+    with requests_mock.mock() as m:
+        m.post('http://something/1', status_code=201)
+        provider.command_POST(_command())
+    records = _events(caplog, 'http_call')
+    assert len(records) == 1
+    record = records[0]
+    assert record.name == 'play_requests'
+    assert record.getMessage() == 'HTTP call POST http://something/1 -> 201'
+    event = record.play_requests
+    assert event['status'] == 201
+    assert event['headers'] == {
+        'Authorization': '***', 'X-Test': 'yes',
+        'Content-Type': 'application/json'}
+    assert event['total'] is not None
+    # the serialized body is truncated
+    assert len(event['body']) < 300
+    assert event['body'].endswith('bytes)')
+
+
+def test_log_call_disabled(provider, caplog):
+    import requests_mock
+    from play_requests import logs
+    caplog.set_level(logging.INFO, logger='play_requests')
+    with requests_mock.mock() as m:
+        m.post('http://something/1')
+        with mock.patch.object(logs, 'summarize') as summarize:
+            provider.command_POST(_command())
+    assert summarize.called is False
+    assert not _events(caplog, 'http_call')
+
+
+def test_log_call_sampling(provider, caplog):
+    import requests_mock
+    caplog.set_level(logging.DEBUG, logger='play_requests')
+    with requests_mock.mock() as m:
+        m.post('http://something/1')
+        for index in range(5):
+            provider.command_POST(_command(log={'sample': 0}))
+        provider.command_POST(_command(log={'sample': 1}))
+    assert len(_events(caplog, 'http_call')) == 1
+
+
+def test_log_true(provider, caplog):
+    import requests_mock
+    caplog.set_level(logging.DEBUG, logger='play_requests')
+    with requests_mock.mock() as m:
+        m.post('http://something/1', status_code=500)
+        provider.command_POST(_command(log=True))
+        with pytest.raises(AssertionError):
+            provider.command_POST(_command(
+                log=True, assertion='response.status_code == 200'))
+    assert len(_events(caplog, 'http_call')) == 2
+    assert len(_events(caplog, 'command_failure')) == 1
+
+
+def test_log_failure(provider, caplog):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.post('http://something/1', status_code=500)
+        with pytest.raises(AssertionError):
+            provider.command_POST(_command(
+                assertion='response.status_code == 200',
+                log={'redact': ['x-test']}))
+    records = _events(caplog, 'command_failure')
+    assert len(records) == 1
+    assert records[0].exc_info
+    assert records[0].play_requests['headers']['X-Test'] == '***'
+
+
+def test_summarize_redact_body():
+    from play_requests.logs import summarize
+    event = summarize('POST', {
+        'url': 'http://something/1',
+        'parameters': {
+            'json': {'user': 'me', 'nested': {'Token': 'abc'},
+                     'password': 'secret'},
+            'params': {'q': 'search'},
+            'files': {'b': None, 'a': None}}})
+    assert 'secret' not in event['body']
+    assert 'abc' not in event['body']
+    assert "'user': 'me'" in event['body']
+    assert event['params'] == "{'q': 'search'}"
+    assert event['files'] == ['a', 'b']
+
+
+def test_queue_logging(provider):
+    import requests_mock
+    from play_requests import logs
+    records = []
+
+    class ListHandler(logging.Handler):
+        def emit(self, record):
+            records.append(self.format(record))
+
+    handler = ListHandler()
+    handler.setFormatter(logs.JSONFormatter())
+    logs.logger.setLevel(logging.DEBUG)
+    listener = logs.start_queue_logging(handler)
+    try:
+        assert logs.logger.propagate is False
+        with requests_mock.mock() as m:
+            m.post('http://something/1')
+            provider.command_POST(_command())
+    finally:
+        logs.stop_queue_logging(listener)
+        logs.logger.setLevel(logging.NOTSET)
+    assert logs.logger.propagate is True
+    events = [json.loads(record) for record in records]
+    assert events[-1]['event'] == 'http_call'
+    assert events[-1]['headers']['Authorization'] == '***'
+    assert events[-1]['logger'] == 'play_requests'
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.multipart` module."""
+
+import io
+import os
+import pytest
+
+
+EXPECTED = (
+    b'--xxx\r\n'
+    b'Content-Disposition: form-data; name="name"\r\n\r\n'
+    b'value\r\n'
+    b'--xxx\r\n'
+    b'Content-Disposition: form-data; name="file"; filename="report.csv"\r\n'
+    b'Content-Type: text/csv\r\n'
+    b'Expires: 0\r\n\r\n'
+    b'some,data\r\n'
+    b'--xxx--\r\n')
+
+
+@pytest.mark.parametrize('data', [
+    'some,data',
+    b'some,data',
+    io.BytesIO(b'some,data'),
+])
+@pytest.mark.parametrize('chunk_size', [-1, 1, 7, 4096])
+def test_encoder(data, chunk_size):
+    from play_requests.multipart import MultipartEncoder
+    if hasattr(data, 'seek'):
+        data.seek(0)
+    encoder = MultipartEncoder(
+        {'name': 'value'},
+        {'file': ('report.csv', data, 'text/csv', {'Expires': '0'})},
+        boundary='xxx')
+    assert len(encoder) == len(EXPECTED)
+    chunks = []
+    while True:
+        chunk = encoder.read(chunk_size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    assert b''.join(chunks) == EXPECTED
+    assert len(encoder) == 0
+
+
+def test_encoder_close():
+    from play_requests.multipart import MultipartEncoder
+    data = io.BytesIO(b'some,data')
+    encoder = MultipartEncoder(files={'file': ('report.csv', data)})
+    encoder.read()
+    encoder.close()
+    assert data.closed
+
+
+@pytest.mark.parametrize('stream_files', [False, True])
+def test_post_files_closed(stream_files, play, http_server):
+    import mock
+    file_path = os.path.join(os.path.dirname(__file__), 'file.csv')
+    with open(file_path, 'rb') as file_obj:
+        contents = file_obj.read().decode('utf-8')
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': '{0}/1'.format(http_server),
+        'stream_files': stream_files,
+        'variable': 'body',
+        'variable_expression': 'response.json()["body"]',
+        'parameters': {
+            'data': {'foo': 'bar'},
+            'files': {
+                'filecsv': (
+                    'file.csv',
+                    'path:{0}'.format(file_path),
+                    'text/csv',
+                ),
+            },
+        },
+    }
+    play.variables = {}
+    from play_requests import providers
+    provider = providers.RequestsProvider(play)
+    opened = []
+
+    def _open(*args):
+        opened.append(open(*args))
+        return opened[-1]
+    with mock.patch('play_requests.providers.open', side_effect=_open):
+        provider.command_POST(command)
+    assert len(opened) == 1
+    assert opened[0].closed
+    body = play.variables['body']
+    assert contents in body
+    assert 'filename="file.csv"' in body
+    assert 'Content-Type: text/csv' in body
+    assert 'name="foo"' in body
+    # the original command is not updated
+    assert command['parameters']['files']['filecsv'][1].startswith('path:')
+    provider.close()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.pagination` module."""
+
+import pytest
+
+
+def test_paginator_options():
+    from play_requests.pagination import Paginator
+    assert Paginator.from_options(True).type == 'link'
+    paginator = Paginator.from_options('page')
+    assert (paginator.param, paginator.start, paginator.stop) == \
+        ('page', 1, None)
+    paginator = Paginator.from_options({'type': 'offset', 'step': 50})
+    assert (paginator.param, paginator.start, paginator.step) == \
+        ('offset', 0, 50)
+    with pytest.raises(ValueError):
+        Paginator.from_options('unknown')
+    with pytest.raises(ValueError):
+        Paginator.from_options('cursor')
+
+
+def test_link(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request(
+            'GET', 'http://something/items?page=1',
+            complete_qs=True, json=[1, 2],
+            headers={'Link': '</items?page=2>; rel="next"'})
+        m.request(
+            'GET', 'http://something/items?page=2',
+            complete_qs=True, json=[3],
+            headers={'Link': '<http://something/items?page=1>; rel="prev"'})
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/items',
+            'parameters': {'params': {'page': 1}},
+            'paginate': True,
+            'variable': 'items',
+            'variable_expression': 'response.json()',
+            'assertion': 'len(response.json()) == 2 - page',
+        })
+        assert m.call_count == 2
+    assert provider.engine.variables['items'] == [1, 2, 3]
+
+
+def test_cursor(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET', 'http://something/items', complete_qs=True,
+                  json={'items': [{'id': 1}], 'next': 'abc'})
+        m.request('GET', 'http://something/items?cursor=abc',
+                  complete_qs=True,
+                  json={'items': [{'id': 2}], 'next': None})
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/items',
+            'paginate': {
+                'type': 'cursor',
+                'cursor': 'response.json()["next"]',
+            },
+            'variable': 'count',
+            'variable_expression': 'len(response.json()["items"])',
+        })
+        assert m.call_count == 2
+    assert provider.engine.variables['count'] == [1, 1]
+
+
+def test_cursor_stream(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET', 'http://something/items', complete_qs=True,
+                  json={'items': [{'id': 1}], 'next': 'abc'})
+        m.request('GET', 'http://something/items?cursor=abc',
+                  complete_qs=True,
+                  json={'items': [{'id': 2}], 'next': None})
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/items',
+            'stream': True,
+            'paginate': {
+                'type': 'cursor',
+                'cursor': 'response.json()["next"]',
+            },
+            'variable': 'ids',
+            'variable_expression': '[item["id"] for item in '
+                                   'response.json()["items"]]',
+            'assertion': 'response.status_code == 200',
+        })
+        assert m.call_count == 2
+    assert provider.engine.variables['ids'] == [1, 2]
+
+
+@pytest.mark.parametrize('options, queries', [
+    ('page', ['page=1', 'page=2', 'page=3']),
+    ({'type': 'offset', 'step': 2, 'param': 'skip'},
+     ['skip=0', 'skip=2', 'skip=4']),
+    ({'type': 'page', 'max_pages': 2}, ['page=1', 'page=2']),
+    ({'type': 'page', 'stop': '4 in response.json()'},
+     ['page=1', 'page=2']),
+])
+def test_page_offset(provider, options, queries):
+    import requests_mock
+    pages = [[1, 2], [3, 4], []]
+    with requests_mock.mock() as m:
+        m.request('GET', 'http://something/items',
+                  [{'json': page} for page in pages])
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/items',
+            'parameters': {'params': {'size': 2}},
+            'paginate': options,
+        })
+        assert [request.query for request in m.request_history] == [
+            'size=2&' + query for query in queries]
+
+
+def test_page_items(provider):
+    import requests_mock
+    pages = [[1, 2], [3, 4], []]
+    with requests_mock.mock() as m:
+        m.request('GET', 'http://something/items', [
+            {'json': {'items': page, 'total': 4}} for page in pages])
+        command = {
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/items',
+            'paginate': {'type': 'page', 'items': 'items'},
+            'variable': 'items',
+            'variable_expression': 'response.json()["items"]',
+        }
+        provider.command_GET(dict(command))
+        assert m.call_count == 3
+        assert provider.engine.variables['items'] == [1, 2, 3, 4]
+
+        # JSON objects without items or stop are ambiguous
+        with pytest.raises(ValueError):
+            provider.command_GET(dict(command, paginate='page'))
+
+
+def test_max_pages_warning(provider, caplog):
+    import requests_mock
+    with requests_mock.mock() as m:
+        for max_pages in (1, 2):
+            m.request('GET', 'http://something/items', [
+                {'json': [1]}, {'json': []}])
+            m.reset_mock()
+            caplog.clear()
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/items',
+                'paginate': {'type': 'page', 'max_pages': max_pages},
+            })
+            assert m.call_count == max_pages
+            warnings = [
+                record for record in caplog.records
+                if 'max_pages' in record.getMessage()]
+            assert len(warnings) == (1 if max_pages == 1 else 0)
+
+
+def test_page_assertion_error(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET', 'http://something/items', [
+            {'json': [1]}, {'json': [2], 'status_code': 500}, {'json': []}])
+        with pytest.raises(AssertionError):
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/items',
+                'paginate': 'page',
+                'variable': 'items',
+                'variable_expression': 'response.json()',
+                'assertion': 'response.status_code == 200',
+            })
+        assert m.call_count == 2
+    assert 'items' not in provider.engine.variables
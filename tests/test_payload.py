@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.payload` module."""
+
+
+def test_merge():
+    from play_requests.payload import merge
+    body = {'foo': ['bar'] * 100}
+    default = {
+        'pool': {'maxsize': 20},
+        'parameters': {
+            'headers': {'Authorization': 'BEARER', 'Host': 'something'},
+            'timeout': 2.5,
+        },
+    }
+    command = {
+        'type': 'POST',
+        'parameters': {
+            'headers': {'Host': 'other'},
+            'json': body,
+        },
+    }
+    merged = merge(default, command)
+    assert merged == {
+        'type': 'POST',
+        'pool': {'maxsize': 20},
+        'parameters': {
+            'headers': {'Authorization': 'BEARER', 'Host': 'other'},
+            'timeout': 2.5,
+            'json': body,
+        },
+    }
+    # command values are not copied
+    assert merged['parameters']['json'] is body
+    # untouched defaults are shared, merged ones are not modified
+    assert merged['pool'] is default['pool']
+    assert default['parameters']['headers']['Host'] == 'something'
+
+
+def test_default_payload_cached(play):
+    import mock
+    from play_requests.payload import DefaultPayload
+    play.variables = {
+        'play_requests': {'parameters': {'headers': {'Host': 'something'}}}}
+    payload = DefaultPayload(play, 'play_requests')
+    with mock.patch.object(play, 'parametrize') as parametrize:
+        for index in range(3):
+            assert payload.merge({'type': 'GET'}) == {
+                'type': 'GET',
+                'parameters': {'headers': {'Host': 'something'}}}
+        assert parametrize.call_count == 0
+
+    # the default payload changes
+    play.variables['play_requests']['parameters']['timeout'] = 2
+    assert payload.merge({'type': 'GET'})['parameters']['timeout'] == 2
+
+
+def test_default_payload_templated(play):
+    from play_requests.payload import DefaultPayload
+    play.variables = {
+        'bearer': 'BEARER1',
+        'play_requests': {
+            'parameters': {'headers': {'Authorization': '$bearer'}}}}
+    payload = DefaultPayload(play, 'play_requests')
+    merged = payload.merge({'type': 'GET'})
+    assert merged['parameters']['headers']['Authorization'] == 'BEARER1'
+    play.variables['bearer'] = 'BEARER2'
+    merged = payload.merge({'type': 'GET'})
+    assert merged['parameters']['headers']['Authorization'] == 'BEARER2'
+
+
+def test_default_payload_empty(play):
+    from play_requests.payload import DefaultPayload
+    play.variables = {}
+    payload = DefaultPayload(play, 'play_requests')
+    command = {'type': 'GET'}
+    assert payload.merge(command) is command
+
+
+def test_batch_default_payload(play):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  request_headers={'Authorization': 'BEARER',
+                                   'Host': 'something'},
+                  text='OK')
+        play.variables = {
+            'play_requests': {
+                'parameters': {'headers': {'Authorization': 'BEARER'}}}}
+        from play_requests import providers
+        provider = providers.RequestsProvider(play)
+        provider.command_batch({
+            'provider': 'play_requests',
+            'type': 'batch',
+            'sub_commands': [
+                {'type': 'GET',
+                 'url': 'http://something/1',
+                 'parameters': {'headers': {'Host': 'something'}}}] * 2,
+        })
+        assert len(m.request_history) == 2
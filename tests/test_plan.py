@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.plan` module."""
+
+import pytest
+
+
+def test_compile_commands(tmpdir):
+    from play_requests.plan import (
+        FilePath,
+        compile_commands,
+    )
+    path = tmpdir.join('report.csv')
+    path.write('a,b\n')
+    command = {
+        'type': 'POST',
+        'url': 'http://something/upload',
+        'name': 'upload',
+        'parameters': {
+            'files': {'file': ['report.csv', 'path:{0}'.format(path)]},
+        },
+        'variable': 'status',
+        'variable_expression': 'response.status_code',
+        'assertion': 'response.status_code == 200',
+    }
+    plans = compile_commands([command, {'type': 'GET', 'url': 'http://x'}])
+    plan = plans[0]
+    assert (plan.method, plan.url, plan.label) == \
+        ('POST', 'http://something/upload', 'upload')
+    assert plans[1].label == 'GET http://x'
+    file_data = plan.command['parameters']['files']['file'][1]
+    assert isinstance(file_data, FilePath)
+    assert file_data.path == str(path)
+    # the original command is not modified
+    assert command['parameters']['files']['file'][1].startswith('path:')
+    with pytest.raises(AttributeError):
+        plan.url = 'http://another'
+    with pytest.raises(AttributeError):
+        plan.foo = 'bar'
+
+
+def test_verbs():
+    from play_requests import plan, providers
+    assert providers.VERBS is plan.VERBS
+
+
+def test_compile_commands_errors(tmpdir):
+    from play_requests.plan import (
+        PlanError,
+        compile_commands,
+    )
+    with pytest.raises(PlanError) as excinfo:
+        compile_commands([
+            {'type': 'GET', 'url': 'http://something/1'},
+            {'type': 'FOO', 'url': 'http://something/2'},
+            {'type': 'GET', 'parameters': {'foo': 1, 'timeout': 2}},
+            {'type': 'POST', 'url': 'http://something/3', 'parameters': {
+                'files': {
+                    'a': ['a.csv'],
+                    'b': ['b.csv', 'path:{0}'.format(tmpdir.join('b'))],
+                }}},
+            {'type': 'GET', 'url': 'http://something/4',
+             'assertion': 'response.status_code ==',
+             'variable_expression': 'response.json()'},
+        ])
+    errors = excinfo.value.errors
+    # syntax error messages depend on the python version
+    assert errors[5].startswith(
+        "command #4 (GET http://something/4): invalid assertion "
+        "'response.status_code ==': ")
+    assert errors[:5] + errors[6:] == [
+        "command #1 (FOO http://something/2): command not supported 'FOO'",
+        'command #2 (GET None): missing url',
+        'command #2 (GET None): unexpected parameters foo',
+        "command #3 (POST http://something/3): file 'a' must be a "
+        "[filename, data, ...] list",
+        "command #3 (POST http://something/3): file 'b' not found: "
+        "{0}".format(tmpdir.join('b')),
+        'command #4 (GET http://something/4): variable_expression '
+        'without variable',
+    ]
+
+
+def test_load_invalid_sub_commands(provider):
+    import requests_mock
+    from play_requests.plan import PlanError
+    with requests_mock.mock() as m:
+        m.request('GET', requests_mock.ANY)
+        with pytest.raises(PlanError):
+            provider.command_load({
+                'provider': 'play_requests',
+                'type': 'load',
+                'iterations': 2,
+                'sub_commands': [
+                    {'type': 'GET', 'url': 'http://something/1'},
+                    {'type': 'GET', 'url': 'http://something/2',
+                     'assertion': 'response.status_code = 200'},
+                ],
+            })
+        with pytest.raises(PlanError):
+            provider.command_batch({
+                'provider': 'play_requests',
+                'type': 'batch',
+                'sub_commands': [
+                    {'type': 'GET', 'url': 'http://something/1'},
+                    {'type': 'GET', 'url': 'http://something/2',
+                     'parameters': {'header': {}}},
+                ],
+            })
+        with pytest.raises(PlanError) as excinfo:
+            provider.command_batch({
+                'provider': 'play_requests',
+                'type': 'batch',
+                'sub_commands': [
+                    {'type': 'batch', 'url': 'http://something/1'},
+                    {'url': 'http://something/2'},
+                    {'type': 'GET'},
+                ],
+            })
+        assert excinfo.value.errors == [
+            "command #0 (batch http://something/1): command not "
+            "supported 'batch'",
+            "command #1 (None http://something/2): command not "
+            "supported None",
+            'command #2 (GET None): missing url',
+        ]
+        assert m.call_count == 0
+
+
+def test_load_files(provider, tmpdir):
+    import requests_mock
+    path = tmpdir.join('report.csv')
+    path.write('a,b\n')
+    with requests_mock.mock() as m:
+        m.request('POST', 'http://something/upload')
+        provider.command_load({
+            'provider': 'play_requests',
+            'type': 'load',
+            'iterations': 3,
+            'sub_commands': [{
+                'type': 'POST',
+                'url': 'http://something/upload',
+                'parameters': {
+                    'files': {'file': ['report.csv',
+                                       'path:{0}'.format(path)]},
+                },
+            }],
+            'variable': 'report',
+            'variable_expression': 'report',
+        })
+        assert m.call_count == 3
+        for request in m.request_history:
+            assert b'a,b\n' in request.body
+    assert provider.engine.variables['report']['total']['errors'] == 0
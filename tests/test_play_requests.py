@@ -566,3 +566,197 @@ def test_other_verbs(verb, play):
     command = {'provider': 'play_requests', 'type': verb}
     getattr(provider, 'command_{0}'.format(verb))(command, foo='bar')
     assert _make_request.assert_called_once_with(verb, command) is None
+
+
+def test_session_reuse(play):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK')
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        command = {
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/1',
+        }
+        provider.command_GET(command)
+        provider.command_GET(command)
+        assert len(m.request_history) == 2
+        assert len(provider._sessions) == 1
+
+        provider.command_GET(dict(command, pool={'maxsize': 20}))
+        assert len(provider._sessions) == 2
+        adapter = provider._get_session(
+            {'pool': {'maxsize': 20}}).get_adapter('http://something/1')
+        assert adapter._pool_maxsize == 20
+
+
+def test_session_cookies_not_shared(play):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/login',
+                  text='OK',
+                  cookies={'sessionid': '123'})
+        m.request('GET',
+                  'http://something/1',
+                  text='OK')
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/login',
+            'variable': 'cookies',
+            'variable_expression': 'response.cookies.get("sessionid")',
+        })
+        assert mock_engine.variables['cookies'] == '123'
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/1',
+        })
+        assert 'Cookie' not in m.request_history[1].headers
+
+
+def test_session_close_on_teardown(play):
+    import mock
+    with mock.patch('play_requests.providers.requests') \
+            as mock_requests:
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/1',
+        })
+        assert mock_requests.Session.call_count == 1
+        mock_engine.teardown()
+        assert mock_requests.Session.return_value.close.called
+        assert provider._sessions == {}
+
+
+def test_batch(play):
+    import requests_mock
+    with requests_mock.mock() as m:
+        for index in range(3):
+            m.request('GET',
+                      'http://something/{0}'.format(index),
+                      json={'index': index})
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        provider.command_batch({
+            'provider': 'play_requests',
+            'type': 'batch',
+            'max_workers': 2,
+            'sub_commands': [
+                {'type': 'GET',
+                 'url': 'http://something/{0}'.format(index),
+                 'variable': 'last',
+                 'variable_expression': 'response.json()["index"]',
+                 'assertion': 'variables["last"] == {0}'.format(index)}
+                for index in range(3)],
+        })
+        assert len(m.request_history) == 3
+        assert mock_engine.variables['last'] == 2
+        assert len(provider._sessions) == 1
+
+
+def test_batch_assertion_ko(play):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  status_code=503)
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        with pytest.raises(AssertionError):
+            provider.command_batch({
+                'provider': 'play_requests',
+                'type': 'batch',
+                'sub_commands': [
+                    {'type': 'GET',
+                     'url': 'http://something/1',
+                     'assertion': 'response.status_code == 200'}],
+            })
+
+
+def test_batch_not_supported(play):
+    from play_requests import providers
+    from play_requests.plan import PlanError
+    provider = providers.RequestsProvider(play)
+    with pytest.raises(PlanError):
+        provider.command_batch({
+            'provider': 'play_requests',
+            'type': 'batch',
+            'sub_commands': [
+                {'type': 'batch',
+                 'url': 'http://something/1'}],
+        })
+
+
+NDJSON = b'{"id": 1}\n{"id": 2}\n{"id": 3}\n'
+
+
+def test_stream(play):
+    import io
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  body=io.BytesIO(NDJSON))
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/1',
+            'stream': True,
+            'variable': 'response',
+            'variable_expression': 'response',
+            'assertion': 'len(list(response.iter_lines())) == 3',
+        })
+        response = mock_engine.variables['response']
+        # the body was never buffered
+        assert response._content is False
+        assert m.request_history[0].stream is True
+
+
+def test_stream_spooled_body(play):
+    import io
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  body=io.BytesIO(NDJSON))
+        mock_engine = play
+        mock_engine.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(mock_engine)
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/1',
+            'stream': True,
+            'max_body_bytes': 10,
+            'variable': 'body',
+            'variable_expression': 'body',
+            'assertion': 'len(body.readlines()) == 3',
+        })
+        body = mock_engine.variables['body']
+        assert body.closed
+        assert body._rolled is True
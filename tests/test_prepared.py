@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.prepared` module."""
+
+import io
+
+import mock
+import pytest
+import requests
+
+
+def _command(**parameters):
+    return {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': 'http://something/items',
+        'reuse_prepared': True,
+        'parameters': dict({'json': {'b': 1, 'a': [2]}}, **parameters),
+        'assertion': 'response.status_code == 200',
+    }
+
+
+def test_command_key():
+    from play_requests.prepared import command_key
+    key = command_key(_command())
+    assert key is not None
+    assert command_key(_command()) == key
+    assert command_key(_command(headers={'X-Id': '1'})) != key
+    assert command_key(_command(auth=['user', 'pwd'])) is not None
+    assert command_key(_command(auth=requests.auth.HTTPDigestAuth(
+        'user', 'pwd'))) is None
+    assert command_key(_command(data=io.BytesIO(b'data'))) is None
+    assert command_key(_command(files={'a': ('a.txt', 'a')})) is None
+
+
+def test_prepared_commands_lru():
+    from play_requests.prepared import PreparedCommands
+    prepared = PreparedCommands(max_entries=2)
+    prepared.set('a', {'a': 1})
+    prepared.set('b', {'b': 1})
+    assert prepared.get('a') == {'a': 1}
+    prepared.set('c', {'c': 1})
+    assert prepared.get('b') is None
+    assert len(prepared) == 2
+    prepared.clear()
+    assert prepared.get('a') is None
+
+
+def test_prepared_request_parameters():
+    from play_requests.prepared import PreparedRequest
+    with pytest.raises(TypeError):
+        PreparedRequest(
+            requests.Session(), 'GET', 'http://something', {'foo': 1})
+
+
+def test_reuse_prepared(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('POST', 'http://something/items', json={})
+        with mock.patch.object(
+                provider, '_make_body',
+                wraps=provider._make_body) as make_body, \
+                mock.patch.object(
+                    requests.Session, 'prepare_request', autospec=True,
+                    side_effect=requests.Session.prepare_request) as prepare:
+            for index in range(3):
+                provider.command_POST(_command(
+                    auth=['user', 'pwd'], timeout=5))
+            provider.command_POST(_command(headers={'X-Id': '1'}))
+        assert make_body.call_count == 2
+        assert prepare.call_count == 2
+        assert m.call_count == 4
+        for request in m.request_history:
+            assert request.json() == {'b': 1, 'a': [2]}
+            assert request.headers['Content-Type'] == 'application/json'
+        assert [request.timeout for request in m.request_history] == \
+            [5, 5, 5, None]
+        assert 'Authorization' in m.request_history[2].headers
+        assert m.request_history[3].headers['X-Id'] == '1'
+    provider.close()
+    assert len(provider._prepared) == 0
+
+
+def test_reuse_prepared_cache(provider):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET', 'http://something/items', json={},
+                  headers={'Cache-Control': 'no-cache', 'ETag': '"1"'})
+        command = dict(
+            _command(), type='GET', cache=True, parameters={})
+        provider.command_GET(command)
+        provider.command_GET(command)
+        # cached calls are never sent as prepared requests
+        assert m.request_history[1].headers['If-None-Match'] == '"1"'
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.profiling` module."""
+
+import json
+import os
+import pstats
+import time
+
+
+def test_phases():
+    from play_requests.profiling import (
+        Profiler,
+        phase,
+    )
+    profiler = Profiler(top=2)
+    with profiler.profile('command') as record:
+        with phase('prepare'):
+            time.sleep(0.01)
+            with phase('files'):
+                time.sleep(0.02)
+        with phase('variable'):
+            with phase('json_decode'):
+                time.sleep(0.01)
+    assert 0.01 <= record.phases['prepare'] < 0.02
+    assert record.phases['files'] >= 0.02
+    assert record.phases['variable'] < 0.005
+    assert record.phases['json_decode'] >= 0.01
+    assert record.total >= 0.04
+    # profiling is off outside the block
+    with phase('prepare'):
+        pass
+    assert profiler.commands['command']['count'] == 1
+
+
+def test_slowest():
+    from play_requests.profiling import Profiler, CommandProfile
+    profiler = Profiler(top=2)
+    for index, total in enumerate([3, 1, 5, 2]):
+        record = CommandProfile('command {0}'.format(index))
+        record.total = total
+        profiler.add(record)
+    report = profiler.report()
+    assert [item['total'] for item in report['slowest']] == [5, 3]
+    assert len(report['commands']) == 4
+
+
+def test_profile_command(provider, tmpdir):
+    import requests_mock
+    from play_requests import profiling
+    path = str(tmpdir.join('profile'))
+    command = {
+        'provider': 'play_requests',
+        'type': 'GET',
+        'name': 'catalog',
+        'url': 'http://something/1',
+        'profile': {'top': 1, 'cprofile': True, 'path': path},
+        'variable': 'items',
+        'variable_expression': 'response.json()',
+        'assertion': 'len(variables["items"]) == 3',
+    }
+    with requests_mock.mock() as m:
+        m.get('http://something/1', json=[1, 2, 3])
+        provider.command_GET(dict(command))
+        provider.command_GET(dict(command))
+
+    profiler = profiling.get_profiler(command['profile'])
+    stats = profiler.commands['catalog']
+    assert stats['count'] == 2
+    for name in ('prepare', 'network', 'json_decode', 'variable',
+                 'assertion'):
+        assert stats['phases'][name] > 0
+
+    # dumped once per process, not at each engine teardown
+    provider.close()
+    assert not os.path.exists(path)
+    profiling.dump_profilers()
+    assert sorted(os.listdir(path)) == ['profile.json', 'slowest_1.pstats']
+    with open(os.path.join(path, 'profile.json')) as fh:
+        report = json.load(fh)
+    assert report['slowest'][0]['label'] == 'catalog'
+    assert pstats.Stats(os.path.join(path, 'slowest_1.pstats')).total_calls
+
+
+def test_profile_paginate_dataset(provider, tmpdir):
+    import pytest
+    import requests_mock
+    from play_requests import profiling
+    dataset = tmpdir.join('users.csv')
+    dataset.write('id\n1\n2\n')
+    options = {'top': 5}
+    with requests_mock.mock() as m:
+        m.get('http://something/items?page=1', complete_qs=True,
+              json=[1, 2])
+        m.get('http://something/items?page=2', complete_qs=True,
+              json=[])
+        m.get('http://something/users/1', json={})
+        m.get('http://something/users/2', json={})
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'name': 'paginated items',
+            'url': 'http://something/items',
+            'paginate': {'type': 'page', 'stop': 'not response.json()'},
+            'profile': options,
+        })
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'name': 'dataset users',
+            'url': 'http://something/users/$id',
+            'dataset': {'path': str(dataset)},
+            'profile': options,
+        })
+        with pytest.raises(ValueError):
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/users/$id',
+                'dataset': {'path': str(dataset), 'concurrency': 2},
+                'profile': options,
+            })
+        assert m.call_count == 4
+
+    profiler = profiling.get_profiler(options)
+    assert profiler.commands['paginated items']['count'] == 2
+    assert profiler.commands['dataset users']['count'] == 2
+
+
+def test_dump_at_exit(monkeypatch):
+    from play_requests import profiling
+    registered = []
+    monkeypatch.setattr(profiling, '_dump_registered', False)
+    monkeypatch.setattr(profiling.atexit, 'register', registered.append)
+    profiling.get_profiler(True)
+    profiling.get_profiler({'top': 1})
+    assert registered == [profiling.dump_profilers]
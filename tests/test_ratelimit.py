@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.ratelimit` module."""
+
+import threading
+import time
+
+import pytest
+
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_token_bucket(tmpdir, shared):
+    from play_requests import ratelimit
+    if shared:
+        bucket = ratelimit.FileTokenBucket(
+            str(tmpdir.join('bucket')), rate=50, burst=5)
+    else:
+        bucket = ratelimit.TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    for i in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.05
+    for i in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.08
+
+
+def test_shared_bucket(tmpdir):
+    from play_requests import ratelimit
+    path = str(tmpdir.join('bucket'))
+    first = ratelimit.FileTokenBucket(path, rate=1, burst=2)
+    second = ratelimit.FileTokenBucket(path, rate=1, burst=2)
+    assert first._take() == 0
+    assert second._take() == 0
+    assert first._take() > 0.9
+
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_max_in_flight(tmpdir, shared):
+    from play_requests import ratelimit
+    limiter = ratelimit.HostLimiter(
+        'http://something', max_in_flight=2,
+        shared=shared and str(tmpdir.join('limits')) or None)
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def call():
+        with limiter:
+            with lock:
+                in_flight.append(1)
+                peak.append(len(in_flight))
+            time.sleep(0.02)
+            with lock:
+                in_flight.pop()
+
+    threads = [threading.Thread(target=call) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    assert len(peak) == 6
+
+
+def test_rate_limit_command(provider):
+    import requests_mock
+    from play_requests import ratelimit
+    command = {
+        'provider': 'play_requests',
+        'type': 'GET',
+        'url': 'http://something/1',
+        'rate_limit': {'rate': 100, 'burst': 1, 'max_in_flight': 1},
+    }
+    with requests_mock.mock() as m:
+        m.get('http://something/1', text='OK')
+        start = time.monotonic()
+        for i in range(4):
+            provider.command_GET(dict(command))
+        assert time.monotonic() - start >= 0.025
+        assert m.call_count == 4
+    limiter = ratelimit.get_limiter(
+        'http://something/2', command['rate_limit'])
+    assert limiter.host == 'http://something'
+    assert limiter is ratelimit.get_limiter(
+        'http://something/1', command['rate_limit'])
+    assert ratelimit.get_limiter('http://something/1', 5).bucket.rate == 5
+
+
+def test_rate_limit_timing(provider):
+    import requests_mock
+    command = {
+        'provider': 'play_requests',
+        'type': 'GET',
+        'url': 'http://something/1',
+        'rate_limit': {'rate': 5, 'burst': 1},
+        'variable': 'total',
+        'variable_expression': 'response.timing.total',
+    }
+    with requests_mock.mock() as m:
+        m.get('http://something/1', text='OK')
+        start = time.monotonic()
+        for i in range(2):
+            provider.command_GET(dict(command))
+        assert time.monotonic() - start >= 0.15
+    # the limiter wait is not counted in the call timing
+    assert provider.engine.variables['total'] < 0.1
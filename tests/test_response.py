@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.response` module."""
+
+import pytest
+
+
+def _response(content, status_code=200, encoding='utf-8'):
+    import requests
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.encoding = encoding
+    return response
+
+
+def test_json_memoized():
+    import mock
+    from play_requests import response as response_module
+    response = response_module.Response(_response(b'{"status": "ok"}'))
+    with mock.patch.object(response_module, 'loads',
+                           wraps=response_module.loads) as loads:
+        assert response.json() == {'status': 'ok'}
+        assert response.json() is response.json()
+    assert loads.call_count == 1
+
+
+def test_json_other_encoding():
+    from play_requests.response import Response
+    response = Response(_response(
+        u'{"status": "ok"}'.encode('utf-16'), encoding='utf-16'))
+    assert response.json() == {'status': 'ok'}
+
+
+def test_json_invalid():
+    import requests
+    from play_requests.response import Response
+    response = Response(_response(b'OK'))
+    with pytest.raises(requests.exceptions.JSONDecodeError):
+        response.json()
+
+
+def test_delegation():
+    from play_requests.response import Response
+    wrapped = _response(b'OK', status_code=404)
+    response = Response(wrapped)
+    assert response.status_code == 404
+    assert response.text == 'OK'
+    assert not response
+    response.foo = 'bar'
+    assert wrapped.foo == 'bar'
+    assert list(response) == [b'OK']
+
+
+def test_json_decoded_once_per_call(play):
+    import mock
+    import requests_mock
+    from play_requests import response as response_module
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  json={'status': 'ok'})
+        play.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(play)
+        with mock.patch.object(response_module, 'loads',
+                               wraps=response_module.loads) as loads:
+            provider.command_GET({
+                'provider': 'play_requests',
+                'type': 'GET',
+                'url': 'http://something/1',
+                'variable': 'status',
+                'variable_expression': 'response.json()["status"]',
+                'assertion': 'response.json()["status"] == "ok" and '
+                             '"status" in response.json()',
+            })
+        assert loads.call_count == 1
+        assert play.variables['status'] == 'ok'
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.retry` module."""
+
+import pytest
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    from play_requests import providers
+    sleeps = []
+    monkeypatch.setattr(providers.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def _command(method='GET', **kwargs):
+    command = {
+        'provider': 'play_requests',
+        'type': method,
+        'url': 'http://something/1',
+        'assertion': 'response.status_code == 200',
+    }
+    command.update(kwargs)
+    return command
+
+
+def test_retry_status(provider, sleeps):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.get('http://something/1', [
+            {'status_code': 503},
+            {'status_code': 429, 'headers': {'Retry-After': '2'}},
+            {'status_code': 200, 'text': 'OK'}])
+        provider.command_GET(_command(
+            retry={'max_attempts': 3, 'backoff': 0.1, 'jitter': False}))
+        assert m.call_count == 3
+    assert sleeps == [0.1, 2.0]
+
+
+def test_retry_exhausted(provider, sleeps):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.get('http://something/1', status_code=503)
+        with pytest.raises(AssertionError):
+            provider.command_GET(_command(retry=2))
+        assert m.call_count == 2
+    assert len(sleeps) == 1
+    assert 0 <= sleeps[0] <= 0.5
+
+
+def test_retry_exception(provider, sleeps):
+    import requests
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.get('http://something/1', [
+            {'exc': requests.exceptions.ConnectTimeout},
+            {'status_code': 200}])
+        provider.command_GET(_command(retry=3))
+        assert m.call_count == 2
+
+    with requests_mock.mock() as m:
+        m.get('http://something/1', exc=ValueError)
+        with pytest.raises(ValueError):
+            provider.command_GET(_command(retry=3))
+        assert m.call_count == 1
+
+
+def test_retry_not_idempotent(provider, sleeps):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.post('http://something/1', status_code=503)
+        with pytest.raises(AssertionError):
+            provider.command_POST(_command('POST', retry=3))
+        assert m.call_count == 1
+
+    with requests_mock.mock() as m:
+        m.post('http://something/1', [
+            {'status_code': 503}, {'status_code': 200}])
+        provider.command_POST(_command(
+            'POST', retry={'max_attempts': 3, 'methods': ['POST']}))
+        assert m.call_count == 2
+
+
+def test_retry_files_reopened(provider, sleeps, tmpdir):
+    import requests_mock
+    path = tmpdir.join('file.csv')
+    path.write('a,b')
+    with requests_mock.mock() as m:
+        m.post('http://something/1', [
+            {'status_code': 502}, {'status_code': 200}])
+        provider.command_POST(_command(
+            'POST',
+            retry={'max_attempts': 2, 'methods': ['POST']},
+            parameters={'files': {'file': ['file.csv', 'path:' + str(path)]}}))
+        assert m.call_count == 2
+        assert b'a,b' in m.request_history[1].body
+
+
+def test_circuit_breaker(provider, sleeps, monkeypatch):
+    import requests_mock
+    from play_requests import retry
+    now = [1000.0]
+    monkeypatch.setattr(retry.time, 'time', lambda: now[0])
+    breaker = {'failure_threshold': 2, 'reset_timeout': 10}
+    with requests_mock.mock() as m:
+        m.get('http://something/1', status_code=500)
+        for i in range(2):
+            with pytest.raises(AssertionError):
+                provider.command_GET(_command(circuit_breaker=breaker))
+        with pytest.raises(retry.CircuitOpenError):
+            provider.command_GET(_command(circuit_breaker=breaker))
+        assert m.call_count == 2
+
+        # half open: a single trial call, failing again
+        now[0] += 10
+        with pytest.raises(AssertionError):
+            provider.command_GET(_command(circuit_breaker=breaker))
+        with pytest.raises(retry.CircuitOpenError):
+            provider.command_GET(_command(circuit_breaker=breaker))
+        assert m.call_count == 3
+
+        now[0] += 10
+        m.get('http://something/1', status_code=200)
+        provider.command_GET(_command(circuit_breaker=breaker))
+        provider.command_GET(_command(circuit_breaker=breaker))
+        assert m.call_count == 5
+    assert retry.get_breaker(
+        'http://something/2', breaker).state == 'closed'
+
+
+def test_circuit_breaker_prepare_error(provider, monkeypatch, tmpdir):
+    import requests_mock
+    from play_requests import retry
+    now = [1000.0]
+    monkeypatch.setattr(retry.time, 'time', lambda: now[0])
+    breaker = {'failure_threshold': 1, 'reset_timeout': 10}
+    with requests_mock.mock() as m:
+        m.post('http://something/1', status_code=500)
+        with pytest.raises(AssertionError):
+            provider.command_POST(_command('POST', circuit_breaker=breaker))
+        now[0] += 10
+        # a missing upload file fails before the half open trial call
+        with pytest.raises(IOError):
+            provider.command_POST(_command(
+                'POST', circuit_breaker=breaker, parameters={'files': {
+                    'file': ['a.csv', 'path:{0}'.format(
+                        tmpdir.join('missing.csv'))]}}))
+        assert retry.get_breaker(
+            'http://something/1', breaker).state == 'half-open'
+        m.post('http://something/1', status_code=200)
+        provider.command_POST(_command('POST', circuit_breaker=breaker))
+        assert m.call_count == 2
+    assert retry.get_breaker(
+        'http://something/1', breaker).state == 'closed'
+
+
+def test_retry_batch_load_dataset(provider, sleeps, tmpdir):
+    import requests_mock
+    path = tmpdir.join('rows.jsonl')
+    path.write('{"id": 1}\n{"id": 2}\n')
+    retry = {'max_attempts': 3, 'backoff': 0, 'jitter': False}
+    with requests_mock.mock() as m:
+        m.get(requests_mock.ANY, [
+            {'status_code': 503}, {'status_code': 200}])
+        provider.command_batch({
+            'provider': 'play_requests',
+            'type': 'batch',
+            'sub_commands': [_command(retry=retry)],
+        })
+        assert m.call_count == 2
+
+        m.reset_mock()
+        m.get(requests_mock.ANY, [
+            {'status_code': 503}, {'status_code': 200}])
+        provider.command_load({
+            'provider': 'play_requests',
+            'type': 'load',
+            'iterations': 1,
+            'sub_commands': [_command(retry=retry)],
+            'variable': 'report',
+            'variable_expression': 'report',
+        })
+        assert m.call_count == 2
+        assert provider.engine.variables['report']['total']['errors'] == 0
+
+        m.get('http://something/1', [
+            {'status_code': 503}, {'status_code': 200}, {'status_code': 200}])
+        provider.command_GET(_command(
+            retry=retry, dataset={'path': str(path), 'concurrency': 1}))
+        assert m.call_count == 5
+
+
+def test_parse_retry_after():
+    from email.utils import formatdate
+    import time
+    from play_requests.retry import parse_retry_after
+    assert parse_retry_after('3') == 3
+    assert parse_retry_after('-3') == 0
+    assert parse_retry_after('invalid') is None
+    assert 50 < parse_retry_after(formatdate(time.time() + 60)) <= 60
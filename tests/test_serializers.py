@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.serializers` module."""
+
+import json
+
+import mock
+import pytest
+
+
+def test_dumps():
+    import requests
+    from play_requests.serializers import dumps
+    document = {'a': [1, 2.5, None, True], 'text': 'àè'}
+    # the same payload sent by requests
+    assert dumps(document) == requests.Request(
+        'POST', 'http://something/1', json=document).prepare().body
+
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_compact_dumps(fast):
+    from play_requests import serializers
+    document = {'a': [1, 2.5, None, True], 1: 'int key', 'big': 2 ** 70}
+    orjson = serializers.orjson if fast else None
+    with mock.patch.object(serializers, 'orjson', orjson):
+        data = serializers.compact_dumps(document)
+    assert isinstance(data, bytes)
+    assert json.loads(data) == {
+        'a': [1, 2.5, None, True], '1': 'int key', 'big': 2 ** 70}
+
+
+@pytest.mark.parametrize('compact_json, body', [
+    (None, b'{"value": 1}'),
+    (True, b'{"value":1}'),
+])
+def test_json_body(provider, compact_json, body):
+    import requests_mock
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': 'http://something/1',
+        'parameters': {'json': {'value': 1}},
+    }
+    if compact_json:
+        command['compact_json'] = compact_json
+    with requests_mock.mock() as m:
+        m.post('http://something/1', text='OK')
+        provider.command_POST(command)
+        request = m.request_history[0]
+    assert request.body == body
+    assert request.headers['Content-Type'] == 'application/json'
+
+
+def test_json_body_custom_serializer(provider):
+    import requests_mock
+    provider.json_dumps = lambda value: b'custom'
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': 'http://something/1',
+        'parameters': {
+            'json': {'value': 1},
+            'headers': {'content-type': 'application/vnd.api+json'}},
+    }
+    with requests_mock.mock() as m:
+        m.post('http://something/1', text='OK')
+        provider.command_POST(command)
+        request = m.request_history[0]
+    assert request.body == b'custom'
+    assert request.headers['Content-Type'] == 'application/vnd.api+json'
+
+
+def test_static_body(provider):
+    import requests_mock
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': 'http://something/1',
+        'static_body': 'document',
+        'compress': {'encoding': 'gzip', 'min_size': 0},
+        'parameters': {
+            'json': {'items': list(range(100))},
+            'headers': {'X-Test': 'yes'}},
+    }
+    provider.json_dumps = mock.Mock(wraps=provider.json_dumps)
+    with requests_mock.mock() as m:
+        m.post('http://something/1', text='OK')
+        for index in range(3):
+            provider.command_POST(dict(command))
+        bodies = [request.body for request in m.request_history]
+        headers = m.request_history[-1].headers
+    assert provider.json_dumps.call_count == 1
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Content-Type'] == 'application/json'
+    assert headers['X-Test'] == 'yes'
+
+    # static bodies are computed once per scenario
+    provider.close()
+    with requests_mock.mock() as m:
+        m.post('http://something/1', text='OK')
+        provider.command_POST(dict(command))
+    assert provider.json_dumps.call_count == 2
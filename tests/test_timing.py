@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `play_requests.timing` module."""
+
+
+def test_timing_connection_reuse(play, http_server):
+    play.variables = {}
+    from play_requests import providers
+    provider = providers.RequestsProvider(play)
+    command = {
+        'provider': 'play_requests',
+        'type': 'POST',
+        'url': '{0}/1'.format(http_server),
+        'variable': 'timing',
+        'variable_expression': 'timing',
+        'assertion': 'timing.ttfb <= timing.total',
+        'parameters': {
+            'data': 'some,data',
+        },
+    }
+    provider.command_POST(command)
+    timing = play.variables['timing']
+    assert timing.reused is False
+    assert timing.connect is not None
+    assert timing.tls is None
+    assert timing.bytes_sent == 9
+    assert timing.bytes_received > 0
+
+    provider.command_POST(command)
+    timing = play.variables['timing']
+    assert timing.reused is True
+    assert timing.connect is None
+    assert timing.ttfb is not None
+    provider.close()
+
+
+def test_timing_mock(play):
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK')
+        play.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(play)
+        provider.command_GET({
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/1',
+            'variable': 'timing',
+            'variable_expression': 'timing.as_dict()',
+        })
+        timing = play.variables['timing']
+        assert timing['total'] > 0
+        assert timing['bytes_received'] == 2
+        assert timing['reused'] is None
+
+
+def test_timing_sinks(play):
+    import mock
+    import requests_mock
+    with requests_mock.mock() as m:
+        m.request('GET',
+                  'http://something/1',
+                  text='OK')
+        play.variables = {}
+        from play_requests import providers
+        provider = providers.RequestsProvider(play)
+        sink = mock.MagicMock()
+        provider.metrics_sinks.append(sink)
+        metrics = mock.MagicMock()
+        command = {
+            'provider': 'play_requests',
+            'type': 'GET',
+            'url': 'http://something/1',
+            'record_timing': 'home',
+        }
+        with mock.patch.object(play, 'get_command_provider',
+                               return_value=metrics):
+            provider.command_GET(command)
+        assert sink.call_count == 1
+        assert sink.call_args[0][0]['url'] == 'http://something/1'
+        assert sink.call_args[0][1].total > 0
+        names = [args[0][0] for args in
+                 metrics.record_property.call_args_list]
+        assert 'home_total' in names
+        assert 'home_bytes_received' in names
+        assert 'home_ttfb' not in names
+        metrics.record_property.assert_any_call(
+            'home_total', mock.ANY, metric_type='timing', meas_unit='s')